@@ -29,7 +29,7 @@ def get_logger_config():
 
         "filters": {
             "request_id": {
-                "()": "request_id.logging.RequestIdFilter"
+                "()": "travel_planner.request_context.RequestIdFilter"
             },
         },
 
@@ -1,5 +1,29 @@
-from services.api.base_client import BaseAPIClient, APIError, NotFoundError
-from services.api.aic import aic_client, AICClient
-from services.api.models import AICArtwork
+from services.api.base_client import (
+    AsyncBaseAPIClient,
+    BaseAPIClient,
+    APIError,
+    CircuitOpenError,
+    DeadlineExceededError,
+    NotFoundError,
+    PoolSaturatedError,
+    RateLimitedError,
+)
+from services.api.aic import aic_client, async_aic_client, AICClient, AsyncAICClient
+from services.api.models import AICArtwork, AICArtworkPage
 
-__all__ = ("BaseAPIClient", "APIError", "NotFoundError", "aic_client", "AICClient", "AICArtwork")
+__all__ = (
+    "BaseAPIClient",
+    "AsyncBaseAPIClient",
+    "APIError",
+    "NotFoundError",
+    "CircuitOpenError",
+    "RateLimitedError",
+    "PoolSaturatedError",
+    "DeadlineExceededError",
+    "aic_client",
+    "async_aic_client",
+    "AICClient",
+    "AsyncAICClient",
+    "AICArtwork",
+    "AICArtworkPage",
+)
@@ -1,26 +1,77 @@
-from services.api.base_client import BaseAPIClient
-from services.api.models import AICArtwork
+import asyncio
+import json
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from services.api.base_client import AsyncBaseAPIClient, BaseAPIClient, Conditional, Validators
+from services.api.models import AICArtwork, AICArtworkPage
+from services.executor import outbound_pool
 from utility.collections import filtered_dict
 
+ARTWORK_FIELDS = AICArtwork.api_fields
+SYNC_FIELDS = f"{ARTWORK_FIELDS},updated_at"
+# the collection endpoint accepts at most this many ids (and page size) per call
+MAX_PAGE_SIZE = 100
+
+
+def _search_params(query: str, page: int, limit: int) -> dict:
+    return filtered_dict(
+        {
+            "q": query,
+            "page": page,
+            "limit": max(1, min(limit, MAX_PAGE_SIZE)),
+            "fields": ARTWORK_FIELDS,
+        }
+    )
+
+
+def _ids_chunks(ids: list[str | int]) -> list[dict]:
+    unique = list(dict.fromkeys(str(i) for i in ids))
+    return [
+        {"ids": ",".join(unique[i : i + MAX_PAGE_SIZE]), "limit": MAX_PAGE_SIZE, "fields": ARTWORK_FIELDS}
+        for i in range(0, len(unique), MAX_PAGE_SIZE)
+    ]
+
 
 class AICClient(BaseAPIClient):
     base_url = "https://api.artic.edu/api/v1"
+    # AIC allows 60 requests per minute per client; burst + rate * 60s stays under it
+    rate_limit = 0.8
+    rate_limit_burst = 10
 
     def get_artwork(self, external_id: str, **kwargs) -> AICArtwork:
+        kwargs.setdefault("params", {"fields": ARTWORK_FIELDS})
         data = self.request(
             self.client.get,
             f"{self.base_url}/artworks/{external_id}",
+            route="/artworks/{id}",
             **kwargs,
         )
-        raw = data["data"]
-        return AICArtwork(
-            id=raw["id"],
-            title=raw.get("title", ""),
-            artist_display=raw.get("artist_display", ""),
-            date_display=raw.get("date_display", ""),
-            thumbnail=raw.get("thumbnail"),
-            image_id=raw.get("image_id"),
+        return AICArtwork.from_api(data["data"])
+
+    def get_artwork_if_modified(self, external_id: str, validators: Validators | None = None) -> Conditional:
+        result = self.conditional_request(
+            self.client.get,
+            f"{self.base_url}/artworks/{external_id}",
+            validators,
+            params={"fields": ARTWORK_FIELDS},
+            route="/artworks/{id}",
         )
+        if result.not_modified:
+            return result
+        return result._replace(data=AICArtwork.from_api(result.data["data"]))
+
+    def get_artworks(self, ids: list[str | int], *, timeout: float | None = None, **kwargs) -> list[AICArtwork]:
+        # unknown ids are simply absent from the response, there is no per-id 404
+        def fetch(params):
+            data = self.request(
+                self.client.get, f"{self.base_url}/artworks", params=params, route="/artworks", **kwargs
+            )
+            return [AICArtwork.from_api(item) for item in data.get("data", [])]
+
+        # chunks go out in parallel, within the process-wide cap on outbound calls and one deadline
+        return [artwork for chunk in outbound_pool.map(fetch, _ids_chunks(ids), timeout=timeout) for artwork in chunk]
 
     def get_all_artwork(self, *, page: int = 1, limit: int | None = None, **kwargs) -> list[AICArtwork]:
         # this api caps the limit at 100
@@ -29,36 +80,152 @@ class AICClient(BaseAPIClient):
         data = self.request(
             self.client.get,
             f"{self.base_url}/artworks",
-            params=filtered_dict({"page": page, "limit": limit}),
+            route="/artworks",
+            params=filtered_dict({"page": page, "limit": limit, "fields": ARTWORK_FIELDS}),
             **kwargs,
         )
-        return data["data"]
+        return [AICArtwork.from_api(item) for item in data["data"]]
+
+    def get_artwork_page(self, page: int, *, limit: int = MAX_PAGE_SIZE, fields: str = ARTWORK_FIELDS) -> AICArtworkPage:
+        data = self.request(
+            self.client.get,
+            f"{self.base_url}/artworks",
+            route="/artworks",
+            params={"page": page, "limit": limit, "fields": fields},
+        )
+        return AICArtworkPage(
+            page,
+            data.get("pagination", {}).get("total_pages", page),
+            [AICArtwork.from_api(item) for item in data.get("data", [])],
+        )
+
+    def iter_artwork_pages(
+        self, *, fields: str = ARTWORK_FIELDS, page_size: int = MAX_PAGE_SIZE, prefetch: int = 1, start_page: int = 1
+    ) -> Iterator[AICArtworkPage]:
+        """Yield the collection page by page, keeping up to ``prefetch`` further pages in flight.
+
+        At most ``prefetch + 1`` pages are held at once, however large the collection is; with ``prefetch=0``
+        each page is only requested once the previous one has been consumed.
+        """
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+        if prefetch < 0:
+            raise ValueError("prefetch must not be negative")
+        pool = ThreadPoolExecutor(max_workers=max(1, prefetch), thread_name_prefix="aic-prefetch")
+        try:
+            # the page count is only known from the first response, so prefetching starts after it
+            pending = deque([pool.submit(self.get_artwork_page, start_page, limit=page_size, fields=fields)])
+            next_page = start_page + 1
+            while pending:
+                page = pending.popleft().result()
+                while len(pending) < prefetch and next_page <= page.total_pages:
+                    pending.append(pool.submit(self.get_artwork_page, next_page, limit=page_size, fields=fields))
+                    next_page += 1
+                yield page
+                if not pending and next_page <= page.total_pages:
+                    pending.append(pool.submit(self.get_artwork_page, next_page, limit=page_size, fields=fields))
+                    next_page += 1
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def iter_artworks(
+        self,
+        *,
+        fields: str = ARTWORK_FIELDS,
+        page_size: int = MAX_PAGE_SIZE,
+        prefetch: int = 1,
+        start_page: int = 1,
+        checkpoint: Callable[[int], None] | None = None,
+    ) -> Iterator[AICArtwork]:
+        """Yield every artwork in the collection.
+
+        ``checkpoint`` is called with the page to resume from (pass it back as ``start_page``) once all
+        artworks of the previous page have been consumed.
+        """
+        for page in self.iter_artwork_pages(
+            fields=fields, page_size=page_size, prefetch=prefetch, start_page=start_page
+        ):
+            yield from page.artworks
+            if checkpoint is not None:
+                checkpoint(page.number + 1)
 
     def search_artworks(self, query: str, *, page: int = 1, limit: int = 10) -> list[AICArtwork]:
-        limit = max(1, min(limit, 100))
         data = self.request(
             self.client.get,
             f"{self.base_url}/artworks/search",
-            params=filtered_dict(
-                {
-                    "q": query,
-                    "page": page,
-                    "limit": limit,
-                    "fields": "id,title,artist_display,date_display,thumbnail,image_id",
-                }
-            ),
+            route="/artworks/search",
+            params=_search_params(query, page, limit),
+        )
+        return [AICArtwork.from_api(item) for item in data.get("data", [])]
+
+    def search_artwork_page(self, query: str, *, page: int = 1, limit: int = MAX_PAGE_SIZE) -> AICArtworkPage:
+        data = self.request(
+            self.client.get,
+            f"{self.base_url}/artworks/search",
+            route="/artworks/search",
+            params=_search_params(query, page, limit),
+        )
+        return AICArtworkPage(
+            page,
+            data.get("pagination", {}).get("total_pages", page),
+            [AICArtwork.from_api(item) for item in data.get("data", [])],
+        )
+
+    def get_artworks_updated_since(
+        self, since: str | None, *, offset: int = 0, limit: int = MAX_PAGE_SIZE
+    ) -> list[dict]:
+        # raw records (with updated_at) in (updated_at, id) order; from + size is capped at 10000 upstream,
+        # so callers page by moving ``since`` forward and keep ``offset`` for ties on the boundary timestamp
+        search = {
+            "sort": [{"updated_at": "asc"}, {"id": "asc"}],
+            "from": offset,
+            "size": max(1, min(limit, MAX_PAGE_SIZE)),
+            "fields": SYNC_FIELDS.split(","),
+        }
+        if since:
+            search["query"] = {"range": {"updated_at": {"gte": since}}}
+        data = self.request(
+            self.client.get,
+            f"{self.base_url}/artworks/search",
+            params={"params": json.dumps(search)},
+            route="/artworks/search",
         )
-        return [
-            AICArtwork(
-                id=item["id"],
-                title=item.get("title", ""),
-                artist_display=item.get("artist_display", ""),
-                date_display=item.get("date_display", ""),
-                thumbnail=item.get("thumbnail"),
-                image_id=item.get("image_id"),
+        return data.get("data", [])
+
+
+class AsyncAICClient(AsyncBaseAPIClient):
+    base_url = AICClient.base_url
+    rate_limit = AICClient.rate_limit
+    rate_limit_burst = AICClient.rate_limit_burst
+
+    async def get_artwork(self, external_id: str, **kwargs) -> AICArtwork:
+        kwargs.setdefault("params", {"fields": ARTWORK_FIELDS})
+        data = await self.request(
+            self.client.get,
+            f"{self.base_url}/artworks/{external_id}",
+            route="/artworks/{id}",
+            **kwargs,
+        )
+        return AICArtwork.from_api(data["data"])
+
+    async def get_artworks(self, ids: list[str | int], **kwargs) -> list[AICArtwork]:
+        pages = await asyncio.gather(
+            *(
+                self.request(self.client.get, f"{self.base_url}/artworks", params=params, route="/artworks", **kwargs)
+                for params in _ids_chunks(ids)
             )
-            for item in data.get("data", [])
-        ]
+        )
+        return [AICArtwork.from_api(item) for data in pages for item in data.get("data", [])]
+
+    async def search_artworks(self, query: str, *, page: int = 1, limit: int = 10) -> list[AICArtwork]:
+        data = await self.request(
+            self.client.get,
+            f"{self.base_url}/artworks/search",
+            route="/artworks/search",
+            params=_search_params(query, page, limit),
+        )
+        return [AICArtwork.from_api(item) for item in data.get("data", [])]
 
 
 aic_client = AICClient()
+async_aic_client = AsyncAICClient()
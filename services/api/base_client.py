@@ -1,15 +1,160 @@
+import asyncio
+import email.utils
 import logging
+import random
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+
 import httpx
+from asgiref.sync import sync_to_async
+
+from services import deadline
+from services.api.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from services.api.instrumentation import UNLABELLED_ROUTE, outbound_call, outbound_retries
+from services.api.rate_limit import get_token_bucket
 
 logger = logging.getLogger("travel_planner.api")
 
+IDEMPOTENT_METHODS = frozenset({"get", "head", "options", "put", "delete"})
+
+
+def _parse_retry_after(response: httpx.Response) -> float | None:
+    raw = response.headers.get("Retry-After")
+    if not raw:
+        return None
+    if raw.isdigit():
+        return float(raw)
+    try:
+        parsed = email.utils.parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+@contextmanager
+def _translate_errors():
+    try:
+        yield
+    except httpx.TimeoutException:
+        raise APIError("Request timed out", retryable=True)
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
+        if status_code == 404:
+            raise NotFoundError()
+        raise APIError(
+            f"API returned {status_code}",
+            status_code=status_code,
+            retryable=status_code == 429 or status_code >= 500,
+            retry_after=_parse_retry_after(e.response),
+        )
+    except httpx.RequestError as e:
+        raise APIError(f"Could not reach API: {e}", retryable=True)
+
+
+class _ResiliencePolicy:
+    # retries apply to idempotent methods only, unless a call opts in or out with ``retry=``
+    max_retries: int = 2
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+    # a Retry-After longer than this is not waited out, the error is raised instead
+    retry_after_max: float = 10.0
+
+    circuit_failure_threshold: int = 5
+    circuit_failure_window: int = 60
+    circuit_recovery_timeout: float = 30.0
+
+    # outbound requests per second shared by all workers, None disables the limiter
+    rate_limit: float | None = None
+    rate_limit_burst: int = 1
+    # how long a request may queue for a token before failing with RateLimitedError
+    rate_limit_max_wait: float = 5.0
+
+    def _circuit_breaker(self, url) -> CircuitBreaker:
+        # clients of one host share a breaker only when they agree on when it trips; keyed by host alone, the
+        # first client to ask would impose its thresholds on every other one
+        name = (
+            f"{httpx.URL(url).host}:{self.circuit_failure_threshold}/{self.circuit_failure_window}"
+            f"/{self.circuit_recovery_timeout:g}"
+        )
+        return get_circuit_breaker(
+            name,
+            failure_threshold=self.circuit_failure_threshold,
+            failure_window=self.circuit_failure_window,
+            recovery_timeout=self.circuit_recovery_timeout,
+        )
+
+    def _allowed_retries(self, method, retry: bool | None) -> int:
+        if retry is None:
+            retry = method.__name__.lower() in IDEMPOTENT_METHODS
+        return self.max_retries if retry else 0
+
+    def _retry_delay(self, attempt: int, error: "APIError") -> float | None:
+        if not error.retryable:
+            return None
+        if error.retry_after is not None:
+            return error.retry_after if error.retry_after <= self.retry_after_max else None
+        # "full jitter": spreads retries from many workers instead of having them hit the host in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _rate_limit_wait(self, url) -> float:
+        if self.rate_limit is None:
+            return 0.0
+        # like breakers, a bucket is only shared by clients that agree on its rate and burst
+        name = f"{httpx.URL(url).host}:{self.rate_limit:g}/{self.rate_limit_burst}"
+        bucket = get_token_bucket(name, rate=self.rate_limit, capacity=self.rate_limit_burst)
+        if (wait := bucket.reserve(self.rate_limit_max_wait)) is None:
+            raise RateLimitedError(f"Outbound rate limit for {bucket.name} exceeded, try again later")
+        return wait
+
+    def _within_deadline(self, kwargs: dict) -> dict:
+        # no attempt may outlive the request's deadline, so its timeout shrinks to what is left of it
+        if (left := deadline.remaining()) is None:
+            return kwargs
+        if left <= 0:
+            raise DeadlineExceededError("Request deadline passed before the API was called")
+        return kwargs if "timeout" in kwargs else {**kwargs, "timeout": min(self.timeout, left)}
+
+    def _check_wait(self, wait: float, error: "APIError | None" = None) -> None:
+        # rather than sleeping through the deadline only to give up afterwards
+        if (left := deadline.remaining()) is not None and wait >= left:
+            raise DeadlineExceededError(f"Request deadline passes within the next {wait:.2f}s wait") from error
+
+    def _outbound_call(self, method, url, route, attempt: int, log: bool, log_parameters: bool, kwargs: dict):
+        return outbound_call(
+            type(self).__name__,
+            method.__name__.upper(),
+            url,
+            route=route,
+            attempt=attempt,
+            log=log,
+            params=kwargs if log_parameters else None,
+        )
 
-class BaseAPIClient:
+    def _check_circuit(self, breaker: CircuitBreaker) -> None:
+        if breaker.is_open():
+            raise CircuitOpenError(f"Circuit for {breaker.name} is open, failing fast")
+
+    def _check_deadline_passed(self, error: "APIError") -> None:
+        # an attempt whose timeout was cut down to the deadline failed for want of our time, not the host's
+        if (left := deadline.remaining()) is not None and left <= 0 and not isinstance(error, DeadlineExceededError):
+            raise DeadlineExceededError("Request deadline passed while waiting for the API") from error
+
+    def _record_failure(self, breaker: CircuitBreaker, error: "APIError") -> None:
+        # 429 means "slow down", not "host is broken"; neither does running out of our own deadline or pool room
+        if isinstance(error, DeadlineExceededError | PoolSaturatedError):
+            return
+        if error.retryable and error.status_code != 429:
+            breaker.record_failure()
+
+
+class BaseAPIClient(_ResiliencePolicy):
     timeout: float = 5.0
     base_url: str = ""
 
-    def __init__(self):
-        self.client = httpx.Client(timeout=self.timeout)
+    def __init__(self, transport: httpx.BaseTransport | None = None):
+        self.client = httpx.Client(timeout=self.timeout, transport=transport)
 
     def request(
         self,
@@ -20,32 +165,218 @@ class BaseAPIClient:
         log_parameters: bool = True,
         headers: dict | None = None,
         log: bool = True,
+        retry: bool | None = None,
+        raw_response: bool = False,
+        route: str | None = None,
+        **kwargs,
+    ):
+        headers = headers or {}
+
+        breaker = self._circuit_breaker(url)
+        retries = self._allowed_retries(method, retry)
+        attempt = 0
+        while True:
+            self._check_circuit(breaker)
+            call_kwargs = self._within_deadline(kwargs)
+            if wait := self._rate_limit_wait(url):
+                self._check_wait(wait)
+                time.sleep(wait)
+            try:
+                with _translate_errors():
+                    with self._outbound_call(method, url, route, attempt, log, log_parameters, kwargs) as call:
+                        response = call.response = method(url, *args, headers=headers, **call_kwargs)
+                    if raise_on_error_code and response.status_code != httpx.codes.NOT_MODIFIED:
+                        response.raise_for_status()
+                    data = response if raw_response else response.json()
+            except APIError as e:
+                self._check_deadline_passed(e)
+                self._record_failure(breaker, e)
+                delay = self._retry_delay(attempt, e) if attempt < retries else None
+                if delay is None:
+                    raise
+                self._check_wait(delay, e)
+                outbound_retries.inc(client=type(self).__name__, route=route or UNLABELLED_ROUTE)
+                attempt += 1
+                logger.info("Retrying %s in %.2fs after: %s", url, delay, e)
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return data
+
+    def conditional_request(self, method, url, validators: "Validators | None" = None, **kwargs) -> "Conditional":
+        # the validators of a 304 are the ones we sent, unless the server bothered to repeat them
+        headers = {**(kwargs.pop("headers", None) or {}), **(validators.headers() if validators else {})}
+        response = self.request(method, url, headers=headers, raw_response=True, **kwargs)
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return Conditional(None, Validators.from_response(response) or validators or Validators())
+        return Conditional(response.json(), Validators.from_response(response))
+
+
+class AsyncBaseAPIClient(_ResiliencePolicy):
+    timeout: float = 5.0
+    base_url: str = ""
+    http2: bool = True
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    # upper bound on in-flight requests per event loop, independent of the pool size
+    max_concurrency: int = 10
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.transport = transport
+        # httpx.AsyncClient and asyncio.Semaphore are bound to the loop they were first used on, so one pool is
+        # kept per loop. That is the server's single loop under uvicorn; sync code goes through BaseAPIClient
+        # instead, as async_to_sync would start a loop, and with it a pool that is never reused, per call
+        self._pools: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Semaphore]]
+        self._pools = weakref.WeakKeyDictionary()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            http2=self.http2,
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+
+    def _pool(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None or pool[0].is_closed:
+            pool = self._pools[loop] = (self._build_client(), asyncio.Semaphore(self.max_concurrency))
+        return pool
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._pool()[0]
+
+    async def request(
+        self,
+        method,
+        url,
+        *args,
+        raise_on_error_code: bool = True,
+        log_parameters: bool = True,
+        headers: dict | None = None,
+        log: bool = True,
+        retry: bool | None = None,
+        route: str | None = None,
         **kwargs,
     ):
         headers = headers or {}
-        if log:
-            logging.info(
-                f'Start request {method.__name__.upper()}: "{url}" {kwargs if log_parameters else dict()}',
-            )
-
-        try:
-            response = method(url, *args, headers=headers, **kwargs)
-            if raise_on_error_code:
-                response.raise_for_status()
-            return response.json()
-        except httpx.TimeoutException:
-            raise APIError("Request timed out")
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                raise NotFoundError()
-            raise APIError(f"API returned {e.response.status_code}")
-        except httpx.RequestError as e:
-            raise APIError(f"Could not reach API: {e}")
+
+        _, semaphore = self._pool()
+        breaker = self._circuit_breaker(url)
+        retries = self._allowed_retries(method, retry)
+        attempt = 0
+        while True:
+            # the breaker's state lives in the shared cache, whose calls block
+            await sync_to_async(self._check_circuit, thread_sensitive=False)(breaker)
+            call_kwargs = self._within_deadline(kwargs)
+            # and the token bucket may be a Redis round trip too
+            if self.rate_limit is not None and (
+                wait := await sync_to_async(self._rate_limit_wait, thread_sensitive=False)(url)
+            ):
+                self._check_wait(wait)
+                await asyncio.sleep(wait)
+            try:
+                with _translate_errors():
+                    async with semaphore:
+                        with self._outbound_call(method, url, route, attempt, log, log_parameters, kwargs) as call:
+                            response = call.response = await method(url, *args, headers=headers, **call_kwargs)
+                    if raise_on_error_code:
+                        response.raise_for_status()
+                    data = response.json()
+            except APIError as e:
+                self._check_deadline_passed(e)
+                await sync_to_async(self._record_failure, thread_sensitive=False)(breaker, e)
+                delay = self._retry_delay(attempt, e) if attempt < retries else None
+                if delay is None:
+                    raise
+                self._check_wait(delay, e)
+                outbound_retries.inc(client=type(self).__name__, route=route or UNLABELLED_ROUTE)
+                attempt += 1
+                logger.info("Retrying %s in %.2fs after: %s", url, delay, e)
+                await asyncio.sleep(delay)
+                continue
+            await sync_to_async(breaker.record_success, thread_sensitive=False)()
+            return data
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.pop(loop, None)
+        if pool is not None:
+            await pool[0].aclose()
+
+
+class Validators(NamedTuple):
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "Validators":
+        return cls(response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def __bool__(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class Conditional(NamedTuple):
+    # ``data`` is None when the server answered 304 Not Modified
+    data: Any
+    validators: Validators
+
+    @property
+    def not_modified(self) -> bool:
+        return self.data is None
 
 
 class APIError(Exception):
-    pass
+    def __init__(
+        self,
+        message: str = "",
+        *,
+        status_code: int | None = None,
+        retryable: bool = False,
+        retry_after: float | None = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
 
 
 class NotFoundError(APIError):
+    def __init__(self, message: str = ""):
+        super().__init__(message, status_code=404)
+
+
+class CircuitOpenError(APIError):
     pass
+
+
+class RateLimitedError(APIError):
+    pass
+
+
+class PoolSaturatedError(APIError):
+    """The outbound pool had no room left; raised instead of queueing without bound."""
+
+    def __init__(self, message: str = ""):
+        super().__init__(message, retryable=True)
+
+
+class DeadlineExceededError(APIError):
+    def __init__(self, message: str = ""):
+        super().__init__(message, retryable=True)
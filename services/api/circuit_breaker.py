@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+
+logger = logging.getLogger("travel_planner.api")
+
+
+class CircuitBreaker:
+    """Per-host breaker whose state lives in the shared cache, so every worker opens and closes together.
+
+    ``failure_threshold`` failures within ``failure_window`` seconds open the circuit for ``recovery_timeout``
+    seconds, during which requests fail fast. Once it expires requests flow again; if the host is still down
+    the next failures reopen it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        failure_window: int = 60,
+        recovery_timeout: float = 30.0,
+        alias: str = "default",
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.recovery_timeout = recovery_timeout
+        self.alias = alias
+        # local memo of the shared state, so an open circuit costs no cache round trip and a healthy one
+        # only touches the failure counter after this process has seen a failure
+        self._open_until = 0.0
+        self._saw_failures = False
+        # fallback failure count for while the shared cache is unreachable
+        self._local_failures = 0
+        self._local_window_start = 0.0
+        self._local_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _key(self, suffix: str) -> str:
+        return f"circuit:{self.name}:{suffix}"
+
+    def is_open(self) -> bool:
+        now = time.time()
+        if now < self._open_until:
+            return True
+        open_until = self.backend.get(self._key("open_until"))
+        if open_until is not None and now < open_until:
+            self._open_until = open_until
+            return True
+        return False
+
+    def record_failure(self) -> None:
+        self._saw_failures = True
+        key = self._key("failures")
+        self.backend.add(key, 0, self.failure_window)
+        try:
+            failures = self.backend.incr(key)
+        except ValueError:
+            # the window expired between add and incr
+            self.backend.set(key, 1, self.failure_window)
+            failures = 1
+        if failures is None:
+            # django-redis with IGNORE_EXCEPTIONS answers None while Redis is down: count in this process instead
+            failures = self._count_locally()
+
+        if failures >= self.failure_threshold:
+            self._open_until = time.time() + self.recovery_timeout
+            self.backend.set(self._key("open_until"), self._open_until, self.recovery_timeout)
+            self.backend.delete(key)
+            self._local_failures = 0
+            logger.warning("Circuit %s opened after %s failures", self.name, failures)
+
+    def _count_locally(self) -> int:
+        with self._local_lock:
+            now = time.monotonic()
+            if now - self._local_window_start > self.failure_window:
+                self._local_failures, self._local_window_start = 0, now
+            self._local_failures += 1
+            return self._local_failures
+
+    def record_success(self) -> None:
+        if self._saw_failures:
+            self._saw_failures = False
+            self._local_failures = 0
+            self.backend.delete(self._key("failures"))
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **options) -> CircuitBreaker:
+    # one breaker per name in the process, shared by every client that asks for it
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **options)
+        return _breakers[name]
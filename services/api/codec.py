@@ -0,0 +1,83 @@
+import struct
+
+from services.api.models import AICArtwork, AICArtworkPage
+
+# Bump whenever the layout below changes. Readers reject any other version, so entries written by a
+# different deploy are treated as cache misses instead of being misread.
+ARTWORK_CODEC_VERSION = 1
+
+# version, id, then the byte lengths of title, artist_display, date_display and image_id
+_HEADER = struct.Struct(">Bq4I")
+# version, page number, total pages and artwork count, followed by each encoded artwork prefixed by its length
+_PAGE_HEADER = struct.Struct(">B3I")
+_LENGTH = struct.Struct(">I")
+
+
+class CodecError(ValueError):
+    pass
+
+
+def encode_artwork(artwork: AICArtwork) -> bytes:
+    parts = [
+        artwork.title.encode(),
+        artwork.artist_display.encode(),
+        artwork.date_display.encode(),
+        (artwork.image_id or "").encode(),
+    ]
+    return _HEADER.pack(ARTWORK_CODEC_VERSION, artwork.id, *map(len, parts)) + b"".join(parts)
+
+
+def decode_artwork(raw: bytes | memoryview) -> AICArtwork:
+    try:
+        version, artwork_id, *lengths = _HEADER.unpack_from(raw)
+    except struct.error as e:
+        raise CodecError(f"Truncated artwork header: {e}")
+    if version != ARTWORK_CODEC_VERSION:
+        raise CodecError(f"Unsupported artwork codec version {version}")
+    if _HEADER.size + sum(lengths) != len(raw):
+        raise CodecError("Artwork payload length does not match its header")
+
+    view = memoryview(raw)
+    offset = _HEADER.size
+    parts = []
+    try:
+        for length in lengths:
+            parts.append(str(view[offset : offset + length], "utf-8"))
+            offset += length
+    except UnicodeDecodeError as e:
+        raise CodecError(f"Invalid artwork text: {e}")
+
+    title, artist_display, date_display, image_id = parts
+    return AICArtwork(artwork_id, title, artist_display, date_display, image_id or None)
+
+
+def encode_artwork_page(page: AICArtworkPage) -> bytes:
+    parts = [_PAGE_HEADER.pack(ARTWORK_CODEC_VERSION, page.number, page.total_pages, len(page.artworks))]
+    for artwork in page.artworks:
+        encoded = encode_artwork(artwork)
+        parts += [_LENGTH.pack(len(encoded)), encoded]
+    return b"".join(parts)
+
+
+def decode_artwork_page(raw: bytes | memoryview) -> AICArtworkPage:
+    try:
+        version, number, total_pages, count = _PAGE_HEADER.unpack_from(raw)
+    except struct.error as e:
+        raise CodecError(f"Truncated artwork page header: {e}")
+    if version != ARTWORK_CODEC_VERSION:
+        raise CodecError(f"Unsupported artwork codec version {version}")
+
+    view = memoryview(raw)
+    offset = _PAGE_HEADER.size
+    artworks = []
+    for _ in range(count):
+        try:
+            (length,) = _LENGTH.unpack_from(view, offset)
+        except struct.error as e:
+            raise CodecError(f"Truncated artwork page: {e}")
+        offset += _LENGTH.size
+        artworks.append(decode_artwork(view[offset : offset + length]))
+        offset += length
+    if offset != len(view):
+        raise CodecError("Artwork page length does not match its header")
+    return AICArtworkPage(number, total_pages, artworks)
@@ -0,0 +1,83 @@
+import logging
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from services import metrics
+
+logger = logging.getLogger("travel_planner.api")
+
+outbound_duration = metrics.histogram(
+    "outbound_request_duration_seconds", "Outbound HTTP attempts by client, method, route and status"
+)
+outbound_requests = metrics.counter(
+    "outbound_requests_total", "Outbound HTTP attempts by client, method, route and status"
+)
+outbound_bytes = metrics.counter("outbound_response_bytes_total", "Outbound response body bytes by client and route")
+outbound_retries = metrics.counter("outbound_retries_total", "Outbound HTTP retries by client and route")
+
+# the label of calls made without a route template; never derived from the URL, which may carry user input
+UNLABELLED_ROUTE = "other"
+
+
+class OutboundCall:
+    def __init__(self, client: str, method: str, url, route: str | None):
+        self.url = url
+        self.labels = {"client": client, "method": method, "route": route or UNLABELLED_ROUTE}
+        # set by the caller as soon as there is one, so failed statuses are recorded too
+        self.response: httpx.Response | None = None
+
+
+@contextmanager
+def outbound_call(
+    client: str,
+    method: str,
+    url,
+    *,
+    route: str | None = None,
+    attempt: int = 0,
+    log: bool = True,
+    params: dict | None = None,
+):
+    """Time one attempt and record its status, size and duration; wraps the raw httpx call.
+
+    ``route`` is the caller's fixed template for the URL (``"/artworks/{id}"``), the only thing besides the
+    client and method the metrics are labelled by.
+    """
+    call = OutboundCall(client, method, url, route)
+    failure = None
+    started = time.perf_counter()
+    try:
+        yield call
+    except httpx.TimeoutException:
+        failure = "timeout"
+        raise
+    except httpx.RequestError:
+        failure = "connection_error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        response = call.response
+        status = failure or (str(response.status_code) if response is not None else "error")
+        size = len(response.content) if response is not None else 0
+        outbound_duration.observe(elapsed, **call.labels, status=status)
+        outbound_requests.inc(**call.labels, status=status)
+        outbound_bytes.inc(size, client=client, route=call.labels["route"])
+        if log:
+            logger.info(
+                "%s %s: %s in %.1fms",
+                method,
+                url,
+                status,
+                elapsed * 1000,
+                extra={
+                    **call.labels,
+                    "url": str(url),
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "bytes": size,
+                    "attempt": attempt,
+                    **({"params": params} if params is not None else {}),
+                },
+            )
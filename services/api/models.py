@@ -1,13 +1,30 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, NamedTuple
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AICArtwork:
     id: int
     title: str
     artist_display: str
     date_display: str
-    thumbnail: dict[str, Any] | None
-    image_id: str | None
+    image_id: str | None = None
 
+    # fields to request from the API, matching what this class keeps
+    api_fields = "id,title,artist_display,date_display,image_id"
+
+    @classmethod
+    def from_api(cls, raw: dict[str, Any]) -> "AICArtwork":
+        return cls(
+            id=raw["id"],
+            title=raw.get("title") or "",
+            artist_display=raw.get("artist_display") or "",
+            date_display=raw.get("date_display") or "",
+            image_id=raw.get("image_id"),
+        )
+
+
+class AICArtworkPage(NamedTuple):
+    number: int
+    total_pages: int
+    artworks: list[AICArtwork]
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+
+from services import metrics
+
+try:
+    from django_redis import get_redis_connection
+    from django_redis.cache import RedisCache
+except ImportError:  # only needed when the cache is Redis
+    get_redis_connection = None
+    RedisCache = None
+
+logger = logging.getLogger("travel_planner.api")
+
+ratelimit_acquired = metrics.counter("ratelimit_acquired_total", "Outbound requests let through by the limiter")
+ratelimit_rejected = metrics.counter(
+    "ratelimit_rejected_total", "Outbound requests refused because the wait exceeded the deadline"
+)
+ratelimit_wait_seconds = metrics.counter("ratelimit_wait_seconds_total", "Time spent queued by the limiter")
+
+# Reserves one token and returns how long the caller must wait for it, or -1 without reserving anything when
+# that wait would exceed the caller's deadline. Tokens may go negative: that is the queue of callers that
+# already hold a reservation, so waiters are served in order instead of racing each other.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - 1
+local wait = 0
+if tokens < 0 then
+  wait = -tokens / rate
+end
+if wait > max_wait then
+  return '-1'
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate + max_wait) + 1)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """Token bucket shared by every worker through Redis, with an in-process bucket as fallback.
+
+    ``rate`` is in tokens per second and ``capacity`` is the burst size. The fallback applies when the
+    cache is not django-redis or Redis is unreachable; it then only limits this process.
+    """
+
+    def __init__(self, name: str, *, rate: float, capacity: int, alias: str = "default"):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.alias = alias
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._script = None
+
+    def _shared_script(self):
+        if self._script is None and RedisCache is not None and isinstance(caches[self.alias], RedisCache):
+            self._script = get_redis_connection(self.alias).register_script(_RESERVE_SCRIPT)
+        return self._script
+
+    def _reserve_shared(self, max_wait: float) -> float | None:
+        if (script := self._shared_script()) is None:
+            return None
+        try:
+            return float(script(keys=[f"ratelimit:{self.name}"], args=[self.rate, self.capacity, max_wait]))
+        except Exception as e:
+            logger.warning("Shared rate limiter %s unavailable, limiting locally: %s", self.name, e)
+            return None
+
+    def _reserve_local(self, max_wait: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate) - 1
+            wait = max(0.0, -tokens / self.rate)
+            if wait > max_wait:
+                return -1
+            self._tokens, self._updated_at = tokens, now
+            return wait
+
+    def reserve(self, max_wait: float) -> float | None:
+        """Reserve a token and return the seconds to wait before using it.
+
+        Returns None, without consuming anything, if that wait would exceed ``max_wait``.
+        """
+        wait = self._reserve_shared(max_wait)
+        if wait is None:
+            wait = self._reserve_local(max_wait)
+        if wait < 0:
+            ratelimit_rejected.inc(limiter=self.name)
+            return None
+        ratelimit_acquired.inc(limiter=self.name)
+        ratelimit_wait_seconds.inc(wait, limiter=self.name)
+        return wait
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(name: str, **options) -> TokenBucket:
+    with _buckets_lock:
+        if name not in _buckets:
+            _buckets[name] = TokenBucket(name, **options)
+        return _buckets[name]
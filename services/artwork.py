@@ -1,31 +1,453 @@
-from django.core.cache import cache
+import logging
+import struct
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, NamedTuple
 
-from services import APIError, NotFoundError
-from services.api.aic import aic_client
+from django.conf import settings
+
+from services import APIError, NotFoundError, metrics
+from services.api.aic import aic_client, async_aic_client
+from services.api.base_client import DeadlineExceededError, PoolSaturatedError, Validators
+from services.api.codec import ARTWORK_CODEC_VERSION, CodecError, decode_artwork, encode_artwork
 from services.api.models import AICArtwork
+from services.cache import BatchedCache, LocalCache
+from services.executor import outbound_pool
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger("travel_planner.artwork")
+
+# entries are served as-is until SOFT_TTL, then served stale while a background refresh runs, until HARD_TTL
+SOFT_TTL = settings.ARTWORK_CACHE_SOFT_TTL
+HARD_TTL = settings.ARTWORK_CACHE_HARD_TTL
+NEGATIVE_TTL = settings.ARTWORK_CACHE_NEGATIVE_TTL
+REFRESH_RETRY_DELAY = 60
+USE_CATALOGUE = settings.ARTWORK_USE_CATALOGUE
+# AIC ids fit in 32 bits; anything larger is no artwork and would overflow the catalogue's id column
+MAX_ARTWORK_ID = 2**31 - 1
+
+# entry format version, soft expiry and the byte lengths of the ETag and Last-Modified validators,
+# followed by the validators and the encoded artwork unless the id was a 404
+_ENTRY_VERSION = 2
+_ENTRY_HEADER = struct.Struct(">BdHH")
 
-CACHE_TTL = 60 * 60 * 6
+# the formats are part of the key so a deploy that changes them starts from a cold namespace
+# instead of reading the previous release's entries
+artwork_cache = BatchedCache(
+    f"aic:artwork:e{_ENTRY_VERSION}a{ARTWORK_CODEC_VERSION}",
+    HARD_TTL,
+    local=LocalCache("aic:artwork", settings.ARTWORK_LOCAL_CACHE_SIZE, settings.ARTWORK_LOCAL_CACHE_TTL),
+    encode=lambda entry: entry.encode(),
+    decode=lambda raw: CacheEntry.decode(raw),
+)
+# the lease outlives a worst-case upstream call so a slow leader is not joined by a second fetch
+artwork_flight = SingleFlight("aic:artwork", lease_timeout=aic_client.timeout * 2, wait_timeout=aic_client.timeout)
+
+_refreshing: set[str] = set()
+_refreshing_lock = threading.Lock()
+
+revalidations = metrics.counter(
+    "artwork_revalidations_total", "Conditional artwork refreshes by result (not_modified/modified/not_found)"
+)
+lookups = metrics.counter(
+    "artwork_lookups_total", "Artwork ids looked up, by where they were answered (catalogue/cache/upstream)"
+)
 
 
 class ArtworkValidationError(Exception):
     pass
 
 
+class ArtworkValidationTimeout(ArtworkValidationError):
+    """Validation stopped at the request's deadline; ``errors`` has what was established before it."""
+
+    def __init__(self, errors: dict[str, str]):
+        super().__init__("Artwork validation ran out of time")
+        self.errors = errors
+
+
+class ArtworkLookupTimeout(DeadlineExceededError):
+    """A batch lookup hit the deadline with ``unresolved`` ids still to fetch; ``found`` has the rest's hits."""
+
+    def __init__(self, message: str, found: dict[str, AICArtwork], unresolved: list[str]):
+        super().__init__(message)
+        self.found = found
+        self.unresolved = unresolved
+
+
+class ArtworkLookupFailed(APIError):
+    """A batch lookup's upstream fetch failed for ``unresolved``; ``found`` has what was settled before it."""
+
+    def __init__(self, error: APIError, found: dict[str, AICArtwork], unresolved: list[str]):
+        super().__init__(
+            str(error), status_code=error.status_code, retryable=error.retryable, retry_after=error.retry_after
+        )
+        self.found = found
+        self.unresolved = unresolved
+
+
+class CacheEntry(NamedTuple):
+    # ``artwork`` is None for ids the API answered 404 for
+    artwork: AICArtwork | None
+    fresh_until: float
+    # sent back on refresh so an unchanged artwork costs a 304 instead of a full body
+    validators: Validators = Validators()
+
+    @property
+    def stale(self) -> bool:
+        return time.time() >= self.fresh_until
+
+    def encode(self) -> bytes:
+        etag = (self.validators.etag or "").encode()
+        last_modified = (self.validators.last_modified or "").encode()
+        header = _ENTRY_HEADER.pack(_ENTRY_VERSION, self.fresh_until, len(etag), len(last_modified))
+        body = b"" if self.artwork is None else encode_artwork(self.artwork)
+        return header + etag + last_modified + body
+
+    @classmethod
+    def decode(cls, raw: Any) -> "CacheEntry | None":
+        if not isinstance(raw, bytes) or len(raw) < _ENTRY_HEADER.size:
+            return None
+        version, fresh_until, etag_length, last_modified_length = _ENTRY_HEADER.unpack_from(raw)
+        if version != _ENTRY_VERSION:
+            return None
+        offset = _ENTRY_HEADER.size + etag_length + last_modified_length
+        try:
+            validators = Validators(
+                raw[_ENTRY_HEADER.size : _ENTRY_HEADER.size + etag_length].decode() or None,
+                raw[_ENTRY_HEADER.size + etag_length : offset].decode() or None,
+            )
+            if len(raw) == offset:
+                return cls(None, fresh_until, validators)
+            return cls(decode_artwork(memoryview(raw)[offset:]), fresh_until, validators)
+        except (CodecError, UnicodeDecodeError) as e:
+            logger.warning("Discarding undecodable artwork cache entry: %s", e)
+            return None
+
+
+def _found(artwork: AICArtwork, validators: Validators = Validators()) -> CacheEntry:
+    return CacheEntry(artwork, time.time() + SOFT_TTL, validators)
+
+
+def _not_found() -> CacheEntry:
+    # never stale: it simply expires after NEGATIVE_TTL
+    return CacheEntry(None, time.time() + NEGATIVE_TTL)
+
+
+def _store(entries: dict[str, CacheEntry]) -> None:
+    artwork_cache.set_many({eid: e for eid, e in entries.items() if e.artwork is not None})
+    artwork_cache.set_many({eid: e for eid, e in entries.items() if e.artwork is None}, NEGATIVE_TTL)
+
+
+async def _astore(entries: dict[str, CacheEntry]) -> None:
+    await artwork_cache.aset_many({eid: e for eid, e in entries.items() if e.artwork is not None})
+    await artwork_cache.aset_many({eid: e for eid, e in entries.items() if e.artwork is None}, NEGATIVE_TTL)
+
+
+def _unwrap(entry: CacheEntry) -> AICArtwork:
+    if entry.artwork is None:
+        raise NotFoundError()
+    return entry.artwork
+
+
+def _peek_many(external_ids: list[str]) -> dict[str, CacheEntry]:
+    return artwork_cache.get_many(external_ids, record=False).hits
+
+
+def _canonical_id(external_id: str) -> str | None:
+    # AIC ids are integers; anything else can never resolve, so it is not worth a round trip
+    # isdigit() alone also accepts the likes of "²", which int() refuses; the length check keeps int() cheap
+    if not (external_id.isascii() and external_id.isdigit() and len(external_id) <= 20):
+        return None
+    return str(artwork_id) if 0 < (artwork_id := int(external_id)) <= MAX_ARTWORK_ID else None
+
+
+def is_artwork_id(external_id: str) -> bool:
+    """Whether the id can name an AIC artwork at all; other ids are not found without any lookup."""
+    return _canonical_id(external_id) is not None
+
+
+# the local mirror of the collection, registered by the app that keeps it (see register_catalogue)
+_catalogue: tuple[Callable[[set[int]], dict[int, AICArtwork]], Callable[[set[int]], Awaitable[dict]]] | None = None
+
+
+def register_catalogue(
+    lookup: Callable[[set[int]], dict[int, AICArtwork]], alookup: Callable[[set[int]], Awaitable[dict]]
+) -> None:
+    """Resolve artworks from a local mirror first: both functions map AIC ids to the artworks it has."""
+    global _catalogue
+    _catalogue = (lookup, alookup)
+
+
+def _catalogue_ids(external_ids: list[str]) -> dict[str, int]:
+    if not USE_CATALOGUE or _catalogue is None:
+        return {}
+    return {eid: int(canonical) for eid in external_ids if (canonical := _canonical_id(eid))}
+
+
+def _from_catalogue(external_ids: list[str]) -> dict[str, AICArtwork]:
+    # ids missing from the mirror are not treated as 404s: it may simply not have synced them yet
+    if not (ids := _catalogue_ids(external_ids)):
+        return {}
+    found = _catalogue[0](set(ids.values()))
+    return {eid: found[pk] for eid, pk in ids.items() if pk in found}
+
+
+async def _afrom_catalogue(external_ids: list[str]) -> dict[str, AICArtwork]:
+    if not (ids := _catalogue_ids(external_ids)):
+        return {}
+    found = await _catalogue[1](set(ids.values()))
+    return {eid: found[pk] for eid, pk in ids.items() if pk in found}
+
+
+def cache_stats() -> dict[str, Any]:
+    return artwork_cache.stats()
+
+
+def invalidate_artworks(external_ids: list[str], *, local_only: bool = False) -> None:
+    if local_only:
+        artwork_cache.invalidate_local(external_ids)
+    else:
+        artwork_cache.delete_many(external_ids)
+
+
+def _revalidate(external_id: str, entry: CacheEntry) -> CacheEntry:
+    try:
+        result = aic_client.get_artwork_if_modified(external_id, entry.validators)
+    except NotFoundError:
+        revalidations.inc(result="not_found")
+        fresh = _not_found()
+    else:
+        if result.not_modified:
+            revalidations.inc(result="not_modified")
+            fresh = entry._replace(fresh_until=time.time() + SOFT_TTL, validators=result.validators)
+        else:
+            revalidations.inc(result="modified")
+            fresh = _found(result.data, result.validators)
+    _store({external_id: fresh})
+    return fresh
+
+
+def _refresh(stale: dict[str, CacheEntry]) -> None:
+    # entries with validators are revalidated one by one with conditional GETs, which mostly come back as
+    # bodiless 304s; the rest (filled from the batch endpoint, which has no per-artwork validators) are
+    # refetched together in one batch call
+    conditional = {eid: entry for eid, entry in stale.items() if entry.validators}
+    unconditional = [eid for eid in stale if eid not in conditional]
+    try:
+        if unconditional:
+            artwork_flight.do_many(unconditional, _fetch_artworks_many, _peek_many)
+        for eid, entry in conditional.items():
+            artwork_flight.do(
+                eid,
+                lambda eid=eid, entry=entry: _revalidate(eid, entry),
+                lambda eid=eid: _peek_many([eid]).get(eid),
+            )
+    except APIError as e:
+        # keep serving the stale entries and hold off the next attempt instead of retrying on every hit
+        logger.warning("Artwork refresh failed for %s: %s", list(stale), e)
+        retry_at = time.time() + REFRESH_RETRY_DELAY
+        _store({eid: entry._replace(fresh_until=retry_at) for eid, entry in stale.items()})
+    finally:
+        with _refreshing_lock:
+            _refreshing.difference_update(stale)
+
+
+def _refresh_stale(entries: dict[str, CacheEntry]) -> None:
+    with _refreshing_lock:
+        stale = {eid: entry for eid, entry in entries.items() if entry.stale and eid not in _refreshing}
+        _refreshing.update(stale)
+    if not stale:
+        return
+    try:
+        outbound_pool.submit(_refresh, stale)
+    except PoolSaturatedError:
+        # best effort: the entries stay stale and the next hit tries again
+        with _refreshing_lock:
+            _refreshing.difference_update(stale)
+
+
+def _fetch_artwork(external_id: str) -> CacheEntry:
+    try:
+        result = aic_client.get_artwork_if_modified(external_id)
+        entry = _found(result.data, result.validators)
+    except NotFoundError:
+        entry = _not_found()
+    _store({external_id: entry})
+    return entry
+
+
+async def _afetch_artwork(external_id: str) -> CacheEntry:
+    try:
+        entry = _found(await async_aic_client.get_artwork(external_id))
+    except NotFoundError:
+        entry = _not_found()
+    await _astore({external_id: entry})
+    return entry
+
+
 def get_artwork(external_id: str) -> AICArtwork:
-    cache_key = f"aic:artwork:{external_id}"
+    if _canonical_id(external_id) is None:
+        raise NotFoundError()
+    if (artwork := _from_catalogue([external_id]).get(external_id)) is not None:
+        lookups.inc(source="catalogue")
+        return artwork
+    if (entry := artwork_cache.get(external_id)) is not None:
+        lookups.inc(source="cache")
+        _refresh_stale({external_id: entry})
+    else:
+        lookups.inc(source="upstream")
+        entry = artwork_flight.do(
+            external_id,
+            lambda: outbound_pool.call(_fetch_artwork, external_id),
+            lambda: _peek_many([external_id]).get(external_id),
+        )
+    return _unwrap(entry)
+
+
+async def aget_artwork(external_id: str) -> AICArtwork:
+    if _canonical_id(external_id) is None:
+        raise NotFoundError()
+    if (artwork := (await _afrom_catalogue([external_id])).get(external_id)) is not None:
+        lookups.inc(source="catalogue")
+        return artwork
+    if (entry := await artwork_cache.aget(external_id)) is not None:
+        lookups.inc(source="cache")
+        _refresh_stale({external_id: entry})
+    else:
+        lookups.inc(source="upstream")
+        entry = await _afetch_artwork(external_id)
+    return _unwrap(entry)
+
+
+def _fetchable(misses: list[str]) -> dict[str, str]:
+    return {eid: canonical for eid in misses if (canonical := _canonical_id(eid))}
+
+
+def _entries_from(fetchable: dict[str, str], fetched: list[AICArtwork]) -> dict[str, CacheEntry]:
+    by_id = {str(artwork.id): artwork for artwork in fetched}
+    return {
+        eid: _found(by_id[canonical]) if canonical in by_id else _not_found()
+        for eid, canonical in fetchable.items()
+    }
+
 
-    if cached := cache.get(cache_key):
-        return cached
+def _fetch_artworks_many(external_ids: list[str]) -> dict[str, CacheEntry]:
+    fetchable = _fetchable(external_ids)
+    entries = _entries_from(fetchable, aic_client.get_artworks(list(fetchable.values())))
+    _store(entries)
+    return entries
 
-    data = aic_client.get_artwork(external_id)
-    cache.set(cache_key, data, CACHE_TTL)
-    return data
+
+def _found_artworks(entries: dict[str, CacheEntry]) -> dict[str, AICArtwork]:
+    return {eid: entry.artwork for eid, entry in entries.items() if entry.artwork is not None}
+
+
+def get_artworks_many(external_ids: list[str]) -> dict[str, AICArtwork]:
+    found = _from_catalogue(external_ids)
+    lookups.inc(len(found), source="catalogue")
+    if not (rest := [eid for eid in external_ids if eid not in found]):
+        return found
+    entries, misses = artwork_cache.get_many(rest)
+    _refresh_stale(entries)
+    fetchable = _fetchable(misses)
+    lookups.inc(len(entries), source="cache")
+    lookups.inc(len(fetchable), source="upstream")
+    if fetchable:
+        try:
+            entries.update(artwork_flight.do_many(list(fetchable), _fetch_artworks_many, _peek_many))
+        except DeadlineExceededError as e:
+            raise ArtworkLookupTimeout(str(e), found | _found_artworks(entries), list(fetchable)) from e
+        except APIError as e:
+            raise ArtworkLookupFailed(e, found | _found_artworks(entries), list(fetchable)) from e
+    return found | _found_artworks(entries)
+
+
+async def aget_artworks_many(external_ids: list[str]) -> dict[str, AICArtwork]:
+    found = await _afrom_catalogue(external_ids)
+    lookups.inc(len(found), source="catalogue")
+    if not (rest := [eid for eid in external_ids if eid not in found]):
+        return found
+    entries, misses = await artwork_cache.aget_many(rest)
+    _refresh_stale(entries)
+    fetchable = _fetchable(misses)
+    lookups.inc(len(entries), source="cache")
+    lookups.inc(len(fetchable), source="upstream")
+    if fetchable:
+        try:
+            fetched = _entries_from(fetchable, await async_aic_client.get_artworks(list(fetchable.values())))
+        except DeadlineExceededError as e:
+            raise ArtworkLookupTimeout(str(e), found | _found_artworks(entries), list(fetchable)) from e
+        except APIError as e:
+            raise ArtworkLookupFailed(e, found | _found_artworks(entries), list(fetchable)) from e
+        await _astore(fetched)
+        entries.update(fetched)
+    return found | _found_artworks(entries)
+
+
+def _validation_error(external_id: str, error: APIError) -> ArtworkValidationError:
+    if isinstance(error, NotFoundError):
+        return ArtworkValidationError(f"Artwork {external_id} not found in AIC API")
+    return ArtworkValidationError(f"Could not validate artwork {external_id}, try again later")
+
+
+def _validation_result(
+    external_ids: list[str], found: dict[str, AICArtwork]
+) -> tuple[dict[str, AICArtwork], dict[str, str]]:
+    # every lookup that completed without finding an id settled it as a 404
+    errors = {eid: str(_validation_error(eid, NotFoundError())) for eid in external_ids if eid not in found}
+    return found, errors
+
+
+def _deadline_message(external_id: str) -> str:
+    return f"Could not validate artwork {external_id} in time, try again later"
+
+
+def _timed_out(external_ids: list[str], error: ArtworkLookupTimeout) -> ArtworkValidationTimeout:
+    # ids settled from the catalogue or the cache keep their verdict, only the ones left to fetch are unknown
+    _, errors = _validation_result([eid for eid in external_ids if eid not in error.unresolved], error.found)
+    return ArtworkValidationTimeout(errors | {eid: _deadline_message(eid) for eid in error.unresolved})
+
+
+def _failed(external_ids: list[str], error: ArtworkLookupFailed) -> tuple[dict[str, AICArtwork], dict[str, str]]:
+    # as at the deadline, only the ids that were left to fetch are reported as unverifiable
+    found, errors = _validation_result([eid for eid in external_ids if eid not in error.unresolved], error.found)
+    return found, errors | {eid: str(_validation_error(eid, error)) for eid in error.unresolved}
 
 
 def validate_artwork_exists(external_id: str) -> AICArtwork:
     try:
         return get_artwork(external_id)
-    except NotFoundError:
-        raise ArtworkValidationError(f"Artwork {external_id} not found in AIC API")
-    except APIError:
-        raise ArtworkValidationError(f"Could not validate artwork {external_id}, try again later")
+    except DeadlineExceededError:
+        raise ArtworkValidationTimeout({external_id: _deadline_message(external_id)})
+    except APIError as e:
+        raise _validation_error(external_id, e)
+
+
+async def avalidate_artwork_exists(external_id: str) -> AICArtwork:
+    try:
+        return await aget_artwork(external_id)
+    except DeadlineExceededError:
+        raise ArtworkValidationTimeout({external_id: _deadline_message(external_id)})
+    except APIError as e:
+        raise _validation_error(external_id, e)
+
+
+def validate_artworks_many(external_ids: list[str]) -> tuple[dict[str, AICArtwork], dict[str, str]]:
+    """The artworks found and an error per id that was not; raises ArtworkValidationTimeout at the deadline."""
+    try:
+        return _validation_result(external_ids, get_artworks_many(external_ids))
+    except ArtworkLookupTimeout as e:
+        raise _timed_out(external_ids, e)
+    except ArtworkLookupFailed as e:
+        return _failed(external_ids, e)
+
+
+async def avalidate_artworks_many(external_ids: list[str]) -> tuple[dict[str, AICArtwork], dict[str, str]]:
+    try:
+        return _validation_result(external_ids, await aget_artworks_many(external_ids))
+    except ArtworkLookupTimeout as e:
+        raise _timed_out(external_ids, e)
+    except ArtworkLookupFailed as e:
+        return _failed(external_ids, e)
@@ -0,0 +1,89 @@
+import hashlib
+import unicodedata
+from typing import NamedTuple
+
+from django.conf import settings
+
+from services.api.aic import MAX_PAGE_SIZE, aic_client
+from services.api.codec import ARTWORK_CODEC_VERSION, CodecError, decode_artwork_page, encode_artwork_page
+from services.api.models import AICArtwork, AICArtworkPage
+from services.cache import BatchedCache, LocalCache
+from services.executor import outbound_pool
+from services.singleflight import SingleFlight
+
+# Results are cached in aligned blocks of BLOCK_SIZE, whatever page/limit the caller asked for, so every
+# page size and every later page of a query is served from the same entries. Reusing a broader query's
+# results for a narrower one is deliberately not done: AIC ranks and matches with its own analyzers, and
+# filtering a cached list locally would return different results than the API.
+BLOCK_SIZE = MAX_PAGE_SIZE
+# AIC rejects searches reaching past this many results
+MAX_RESULTS = 10_000
+
+
+def _decode(raw) -> AICArtworkPage | None:
+    try:
+        return decode_artwork_page(raw) if isinstance(raw, bytes) else None
+    except CodecError:
+        return None
+
+
+search_cache = BatchedCache(
+    f"aic:search:a{ARTWORK_CODEC_VERSION}",
+    settings.ARTWORK_SEARCH_CACHE_TTL,
+    local=LocalCache("aic:search", settings.ARTWORK_SEARCH_LOCAL_CACHE_SIZE, settings.ARTWORK_SEARCH_CACHE_TTL),
+    encode=encode_artwork_page,
+    decode=_decode,
+)
+search_flight = SingleFlight("aic:search", lease_timeout=aic_client.timeout * 2, wait_timeout=aic_client.timeout)
+
+
+class ArtworkSearchResult(NamedTuple):
+    artworks: list[AICArtwork]
+    has_next: bool
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def _block_ident(query: str, number: int) -> str:
+    return f"{hashlib.sha256(query.encode()).hexdigest()[:32]}:{number}"
+
+
+def _fetch_block(query: str, number: int) -> AICArtworkPage:
+    block = outbound_pool.call(aic_client.search_artwork_page, query, page=number, limit=BLOCK_SIZE)
+    search_cache.set(_block_ident(query, number), block)
+    return block
+
+
+def _block(query: str, number: int) -> AICArtworkPage:
+    ident = _block_ident(query, number)
+    if (block := search_cache.get(ident)) is not None:
+        return block
+    return search_flight.do(
+        ident,
+        lambda: _fetch_block(query, number),
+        lambda: search_cache.get_many([ident], record=False).hits.get(ident),
+    )
+
+
+def search_artworks(query: str, *, page: int = 1, limit: int = 10) -> ArtworkSearchResult:
+    if not (query := normalize_query(query)):
+        return ArtworkSearchResult([], False)
+
+    start = (page - 1) * limit
+    end = min(start + limit, MAX_RESULTS)
+    first = start // BLOCK_SIZE + 1
+    artworks: list[AICArtwork] = []
+    block = None
+    for number in range(first, (end - 1) // BLOCK_SIZE + 2):
+        block = _block(query, number)
+        artworks += block.artworks
+        if len(block.artworks) < BLOCK_SIZE or number >= block.total_pages:
+            break
+
+    offset = start - (first - 1) * BLOCK_SIZE
+    window = artworks[offset : offset + end - start]
+    more_in_block = offset + len(window) < len(artworks)
+    more_blocks = block is not None and len(block.artworks) == BLOCK_SIZE and block.number < block.total_pages
+    return ArtworkSearchResult(window, end < MAX_RESULTS and (more_in_block or more_blocks))
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+from django.core.cache import caches
+
+from services import metrics
+
+cache_requests = metrics.counter("cache_requests_total", "Cache lookups by namespace and result (hit/miss)")
+local_cache_requests = metrics.counter(
+    "local_cache_requests_total", "In-process cache lookups by namespace and result (hit/miss)"
+)
+local_cache_evictions = metrics.counter(
+    "local_cache_evictions_total", "In-process cache evictions by namespace and reason (size/expired)"
+)
+
+
+class CacheLookup(NamedTuple):
+    hits: dict[str, Any]
+    misses: list[str]
+
+
+class LocalCache:
+    """Bounded per-process LRU with a TTL, used as a first tier in front of the shared cache."""
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_many(self, idents: list[str]) -> dict[str, Any]:
+        found = {}
+        expired = 0
+        now = time.monotonic()
+        with self._lock:
+            for ident in idents:
+                if (item := self._data.get(ident)) is None:
+                    continue
+                expires_at, value = item
+                if expires_at <= now:
+                    del self._data[ident]
+                    expired += 1
+                    continue
+                self._data.move_to_end(ident)
+                found[ident] = value
+        local_cache_requests.inc(len(found), namespace=self.namespace, result="hit")
+        local_cache_requests.inc(len(idents) - len(found), namespace=self.namespace, result="miss")
+        if expired:
+            local_cache_evictions.inc(expired, namespace=self.namespace, reason="expired")
+        return found
+
+    def set_many(self, values: dict[str, Any], timeout: float | None = None) -> None:
+        if not self.maxsize:
+            return
+        expires_at = time.monotonic() + min(timeout or self.ttl, self.ttl)
+        evicted = 0
+        with self._lock:
+            for ident, value in values.items():
+                self._data[ident] = (expires_at, value)
+                self._data.move_to_end(ident)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            local_cache_evictions.inc(evicted, namespace=self.namespace, reason="size")
+
+    def delete_many(self, idents: list[str]) -> None:
+        with self._lock:
+            for ident in idents:
+                self._data.pop(ident, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self),
+            "hits": int(local_cache_requests.value(namespace=self.namespace, result="hit")),
+            "misses": int(local_cache_requests.value(namespace=self.namespace, result="miss")),
+            "evictions": int(
+                local_cache_evictions.value(namespace=self.namespace, reason="size")
+                + local_cache_evictions.value(namespace=self.namespace, reason="expired")
+            ),
+        }
+
+
+class BatchedCache:
+    """Namespaced view over a Django cache that batches lookups with get_many/set_many.
+
+    django-redis turns each batch into a single MGET / pipelined SET, so looking up N ids
+    costs one round trip instead of N.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        timeout: int,
+        *,
+        alias: str = "default",
+        local: LocalCache | None = None,
+        encode: Callable[[Any], Any] | None = None,
+        decode: Callable[[Any], Any | None] | None = None,
+    ):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.alias = alias
+        self.local = local
+        # values are encoded only for the shared tier; a ``decode`` returning None counts as a miss
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda raw: raw)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def key(self, ident: str) -> str:
+        return f"{self.namespace}:{ident}"
+
+    def _local_hits(self, idents: list[str]) -> tuple[dict[str, Any], list[str]]:
+        idents = list(dict.fromkeys(idents))
+        if self.local is None:
+            return {}, idents
+        hits = self.local.get_many(idents)
+        return hits, [i for i in idents if i not in hits]
+
+    def _lookup(
+        self, local_hits: dict[str, Any], remaining: list[str], found: dict[str, Any], record: bool = True
+    ) -> CacheLookup:
+        hits = dict(local_hits)
+        remote_hits = {}
+        misses = []
+        for ident in remaining:
+            key = self.key(ident)
+            if key in found and (value := self.decode(found[key])) is not None:
+                remote_hits[ident] = value
+            else:
+                misses.append(ident)
+        if self.local is not None and remote_hits:
+            self.local.set_many(remote_hits)
+        hits.update(remote_hits)
+        if record:
+            cache_requests.inc(len(hits), namespace=self.namespace, result="hit")
+            cache_requests.inc(len(misses), namespace=self.namespace, result="miss")
+        return CacheLookup(hits, misses)
+
+    def get_many(self, idents: list[str], *, record: bool = True) -> CacheLookup:
+        local_hits, remaining = self._local_hits(idents)
+        found = self.backend.get_many([self.key(i) for i in remaining]) if remaining else {}
+        return self._lookup(local_hits, remaining, found, record)
+
+    async def aget_many(self, idents: list[str]) -> CacheLookup:
+        local_hits, remaining = self._local_hits(idents)
+        found = await self.backend.aget_many([self.key(i) for i in remaining]) if remaining else {}
+        return self._lookup(local_hits, remaining, found)
+
+    def get(self, ident: str) -> Any | None:
+        return self.get_many([ident]).hits.get(ident)
+
+    async def aget(self, ident: str) -> Any | None:
+        return (await self.aget_many([ident])).hits.get(ident)
+
+    def _encoded(self, values: dict[str, Any]) -> dict[str, Any]:
+        return {self.key(ident): self.encode(value) for ident, value in values.items()}
+
+    def set_many(self, values: dict[str, Any], timeout: int | None = None) -> None:
+        if values:
+            self.backend.set_many(self._encoded(values), timeout or self.timeout)
+            if self.local is not None:
+                self.local.set_many(values, timeout)
+
+    async def aset_many(self, values: dict[str, Any], timeout: int | None = None) -> None:
+        if values:
+            await self.backend.aset_many(self._encoded(values), timeout or self.timeout)
+            if self.local is not None:
+                self.local.set_many(values, timeout)
+
+    def set(self, ident: str, value: Any, timeout: int | None = None) -> None:
+        self.set_many({ident: value}, timeout)
+
+    async def aset(self, ident: str, value: Any, timeout: int | None = None) -> None:
+        await self.aset_many({ident: value}, timeout)
+
+    def delete_many(self, idents: list[str]) -> None:
+        self.backend.delete_many([self.key(i) for i in idents])
+        self.invalidate_local(idents)
+
+    def invalidate_local(self, idents: list[str]) -> None:
+        if self.local is not None:
+            self.local.delete_many(idents)
+
+    def stats(self) -> dict[str, Any]:
+        hits = int(cache_requests.value(namespace=self.namespace, result="hit"))
+        misses = int(cache_requests.value(namespace=self.namespace, result="miss"))
+        stats: dict[str, Any] = {"hits": hits, "misses": misses}
+        if self.local is not None:
+            stats["local"] = self.local.stats()
+        return stats
@@ -0,0 +1,35 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# The monotonic time by which the current request has to be done with outbound calls. Being a ContextVar it
+# follows the request into sync_to_async threads, asyncio tasks and OutboundPool.map workers.
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+def remaining() -> float | None:
+    """Seconds left until the deadline (zero or less once it passed), None when no deadline is set."""
+    if (at := _deadline.get()) is None:
+        return None
+    return at - time.monotonic()
+
+
+def bounded(timeout: float) -> float:
+    """``timeout`` cut down to what is left of the deadline."""
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
+
+
+@contextmanager
+def deadline(seconds: float | None):
+    """Run the block with at most ``seconds`` left; an enclosing deadline is only ever tightened."""
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
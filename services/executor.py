@@ -0,0 +1,122 @@
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Any, TypeVar
+
+from django.conf import settings
+
+from services import deadline, metrics
+from services.api.base_client import DeadlineExceededError, PoolSaturatedError
+
+T = TypeVar("T")
+
+submitted = metrics.counter("outbound_pool_submitted_total", "Calls submitted to an outbound pool")
+rejected = metrics.counter("outbound_pool_rejected_total", "Calls refused because the pool and its queue were full")
+timed_out = metrics.counter("outbound_pool_deadline_exceeded_total", "Batches abandoned at their deadline")
+active_gauge = metrics.gauge("outbound_pool_active", "Calls currently running")
+queued_gauge = metrics.gauge("outbound_pool_queued", "Calls waiting for a free worker")
+saturation_gauge = metrics.gauge("outbound_pool_saturation", "Running calls as a fraction of the pool size")
+
+
+class OutboundPool:
+    """A process-wide thread pool bounding how many outbound calls run at once.
+
+    At most ``size`` calls run and ``queue_limit`` more wait; past that ``submit`` raises PoolSaturatedError
+    rather than letting requests pile up behind a slow upstream. Calls made from one of the pool's own
+    workers run inline, so a pooled task fanning out again cannot deadlock waiting for itself.
+    """
+
+    def __init__(self, name: str, size: int, queue_limit: int):
+        self.name = name
+        self.size = size
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = 0
+        self._active = 0
+        active_gauge.track(lambda: self.active, pool=name)
+        queued_gauge.track(lambda: self.queued, pool=name)
+        saturation_gauge.track(lambda: self.active / self.size, pool=name)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._pending - self._active
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "queue_limit": self.queue_limit,
+            "active": self.active,
+            "queued": self.queued,
+            "saturation": self.active / self.size,
+        }
+
+    def _in_worker(self) -> bool:
+        return getattr(self._local, "worker", False)
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._active += 1
+        self._local.worker = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._local.worker = False
+            with self._lock:
+                self._active -= 1
+
+    def _release(self, future: Future) -> None:
+        # also runs for futures cancelled before they started
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn: Callable[..., T], *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.size + self.queue_limit:
+                rejected.inc(pool=self.name)
+                raise PoolSaturatedError(f"{self.name} pool is saturated")
+            self._pending += 1
+        submitted.inc(pool=self.name)
+        future = self._executor.submit(self._run, fn, args, kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def map(self, fn: Callable[..., T], items: Iterable, *, timeout: float | None = None) -> list[T]:
+        """``[fn(item) for item in items]`` on the pool, abandoning the batch after ``timeout`` seconds.
+
+        The timeout is cut short by the request's deadline. The calls see that deadline and log under the
+        caller's request id. Calls still queued at the deadline are cancelled; running ones cannot be
+        interrupted and finish in the background (bounded by the client's own timeout), their results discarded.
+        """
+        items = list(items)
+        if self._in_worker():
+            return [fn(item) for item in items]
+        timeout = deadline.bounded(settings.OUTBOUND_DEADLINE if timeout is None else timeout)
+        if timeout <= 0:
+            timed_out.inc(pool=self.name)
+            raise DeadlineExceededError(f"Request deadline passed before any {self.name} call was made")
+        futures: list[Future] = []
+        try:
+            for item in items:
+                # a context per call: one cannot be entered by two threads at once
+                futures.append(self.submit(copy_context().run, fn, item))
+            _, not_done = wait(futures, timeout=timeout)
+            if not_done:
+                timed_out.inc(pool=self.name)
+                raise DeadlineExceededError(f"{len(not_done)} of {len(futures)} {self.name} calls missed the deadline")
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def call(self, fn: Callable[..., T], *args, timeout: float | None = None, **kwargs) -> T:
+        return self.map(lambda _: fn(*args, **kwargs), [None], timeout=timeout)[0]
+
+
+outbound_pool = OutboundPool("outbound", settings.OUTBOUND_POOL_SIZE, settings.OUTBOUND_POOL_QUEUE)
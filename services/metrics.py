@@ -0,0 +1,154 @@
+import bisect
+import itertools
+import os
+import threading
+from collections.abc import Callable
+from typing import Any
+
+
+class Counter:
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: dict[tuple[tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+
+class Gauge:
+    """A value read when sampled, from one callback per label set."""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._sources: dict[tuple[tuple[str, str], ...], Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def track(self, source: Callable[[], float], **labels: str) -> None:
+        with self._lock:
+            self._sources[tuple(sorted(labels.items()))] = source
+
+    def value(self, **labels: str) -> float:
+        source = self._sources.get(tuple(sorted(labels.items())))
+        return source() if source is not None else 0
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        with self._lock:
+            sources = list(self._sources.items())
+        return [(dict(key), source()) for key, source in sources]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets, with their sum and count, per label set."""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, description: str = "", buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # per label set: one count per bucket plus +Inf, then the sum
+        self._values: dict[tuple[tuple[str, str], ...], tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(tuple(sorted(labels.items())), ([], 0.0))
+        return sum(counts)
+
+    def samples(self) -> list[tuple[dict[str, str], dict[str, float]]]:
+        """Per label set the cumulative count for each bucket's upper bound ("+Inf" last), "sum" and "count"."""
+        with self._lock:
+            values = [(dict(key), list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for labels, counts, total in values:
+            cumulative = list(itertools.accumulate(counts))
+            bounds = [_format_bound(bound) for bound in self.buckets] + ["+Inf"]
+            samples.append((labels, {**dict(zip(bounds, cumulative)), "sum": total, "count": cumulative[-1]}))
+        return samples
+
+
+_registry: dict[str, Counter | Gauge | Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, description: str = "") -> Counter:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, description)
+        return _registry[name]  # pyright: ignore[reportReturnType]
+
+
+def gauge(name: str, description: str = "") -> Gauge:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Gauge(name, description)
+        return _registry[name]  # pyright: ignore[reportReturnType]
+
+
+def histogram(name: str, description: str = "", buckets: tuple[float, ...] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, description, buckets)
+        return _registry[name]  # pyright: ignore[reportReturnType]
+
+
+def snapshot() -> dict[str, list[tuple[dict[str, str], Any]]]:
+    return {name: metric.samples() for name, metric in _registry.items()}
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format.
+
+    The registry is per process, so each sample carries the process's pid: behind several workers a scrape
+    reaches any one of them, and without it their counters would look like a single one resetting.
+    """
+    with _registry_lock:
+        metrics = sorted(_registry.items())
+    process = {"pid": str(os.getpid())}
+    lines = []
+    for name, metric in metrics:
+        kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+        lines += [f"# HELP {name} {metric.description}", f"# TYPE {name} {kind}"]
+        if isinstance(metric, Histogram):
+            for labels, values in metric.samples():
+                labels = {**labels, **process}
+                for bound in [_format_bound(bound) for bound in metric.buckets] + ["+Inf"]:
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {values[bound]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {values['count']}")
+        else:
+            lines += [f"{name}{_format_labels({**labels, **process})} {value}" for labels, value in metric.samples()]
+    return "\n".join(lines) + "\n"
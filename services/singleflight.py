@@ -0,0 +1,152 @@
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from django.core.cache import caches
+
+from services.api.base_client import DeadlineExceededError
+from services.deadline import bounded, remaining
+
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = _MISSING
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent fetches of the same key into one.
+
+    Threads in this process wait on the leader's in-flight call. Other processes are kept out by a short
+    lease taken with ``cache.add``; while a lease is held they poll ``lookup_many`` for the leader's result
+    and only fetch themselves once the lease is gone or ``wait_timeout`` runs out.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        lease_timeout: float = 10.0,
+        wait_timeout: float = 5.0,
+        poll_interval: float = 0.05,
+        alias: str = "default",
+    ):
+        self.namespace = namespace
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.alias = alias
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _lease_key(self, key: str) -> str:
+        return f"{self.namespace}:lease:{key}"
+
+    def do(self, key: str, fn: Callable[[], Any], lookup: Callable[[], Any | None]) -> Any:
+        def lookup_many(keys):
+            value = lookup()
+            return {} if value is None else {key: value}
+
+        return self.do_many([key], lambda keys: {key: fn()}, lookup_many)[key]
+
+    def do_many(
+        self,
+        keys: list[str],
+        fetch_many: Callable[[list[str]], dict[str, Any]],
+        lookup_many: Callable[[list[str]], dict[str, Any]],
+    ) -> dict[str, Any]:
+        owned: dict[str, _Call] = {}
+        joined: dict[str, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._calls:
+                    joined[key] = self._calls[key]
+                else:
+                    owned[key] = self._calls[key] = _Call()
+
+        results: dict[str, Any] = {}
+        if owned:
+            try:
+                results.update(self._lead(list(owned), fetch_many, lookup_many))
+            except BaseException as e:
+                for call in owned.values():
+                    call.error = e
+                raise
+            else:
+                for key, call in owned.items():
+                    call.value = results.get(key, _MISSING)
+            finally:
+                with self._lock:
+                    for key, call in owned.items():
+                        if self._calls.get(key) is call:
+                            del self._calls[key]
+                        call.done.set()
+
+        stalled = []
+        for key, call in joined.items():
+            # no point waiting on another thread past the request's deadline
+            if not call.done.wait(max(0.0, bounded(self.wait_timeout))):
+                stalled.append(key)
+            elif call.error is not None:
+                # the leader ran out of its own deadline; a caller with time left tries for itself
+                if isinstance(call.error, DeadlineExceededError) and ((left := remaining()) is None or left > 0):
+                    stalled.append(key)
+                    continue
+                raise call.error
+            elif call.value is not _MISSING:
+                results[key] = call.value
+        if stalled:
+            results.update(fetch_many(stalled))
+        return results
+
+    def _lead(self, keys: list[str], fetch_many, lookup_many) -> dict[str, Any]:
+        token = uuid.uuid4().hex
+        leased = []
+        contended = []
+        for key in keys:
+            if self.backend.add(self._lease_key(key), token, self.lease_timeout):
+                leased.append(key)
+            else:
+                contended.append(key)
+
+        results = {}
+        if leased:
+            try:
+                results.update(fetch_many(leased))
+            finally:
+                self._release(leased, token)
+        if contended:
+            results.update(self._await_remote(contended, fetch_many, lookup_many))
+        return results
+
+    def _release(self, keys: list[str], token: str) -> None:
+        # a lease that expired mid-fetch may have been taken by another worker since, which keeps it; the cache
+        # API has no compare-and-delete, so this only narrows that window to between the get and the delete
+        lease_keys = [self._lease_key(key) for key in keys]
+        held = self.backend.get_many(lease_keys)
+        self.backend.delete_many([lease_key for lease_key in lease_keys if held.get(lease_key) == token])
+
+    def _await_remote(self, keys: list[str], fetch_many, lookup_many) -> dict[str, Any]:
+        results = {}
+        pending = keys
+        deadline = time.monotonic() + bounded(self.wait_timeout)
+        while pending and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            found = lookup_many(pending)
+            results.update(found)
+            held = self.backend.get_many([self._lease_key(key) for key in pending if key not in found])
+            pending = [key for key in pending if self._lease_key(key) in held]
+
+        # the other worker gave up, found nothing or is taking too long: fetch what is still missing ourselves
+        if missing := [key for key in keys if key not in results]:
+            results.update(fetch_many(missing))
+        return results
@@ -0,0 +1,107 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+try:
+    from celery import shared_task
+except ImportError:  # celery is optional, the local backends need nothing
+    shared_task = None
+
+logger = logging.getLogger("celery")
+
+
+class Task:
+    """A function with Celery's ``delay``/``apply_async``, run by the backend named in TASK_BACKEND.
+
+    "local" runs tasks on an in-process thread pool, "eager" runs them inline (tests, scripts) and "celery"
+    hands them to Celery, when it is installed, under the same name.
+    """
+
+    def __init__(self, func, name: str):
+        self.func = func
+        self.name = name
+        self.celery_task = shared_task(name=name)(func) if shared_task is not None else None
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown: float | None = None):
+        return get_backend().submit(self, tuple(args), dict(kwargs or {}), countdown)
+
+
+def task(func=None, *, name: str | None = None):
+    def wrap(func):
+        return Task(func, name or f"{func.__module__}.{func.__qualname__}")
+
+    return wrap(func) if func is not None else wrap
+
+
+class EagerBackend:
+    def submit(self, task: Task, args, kwargs, countdown):
+        # like Celery's task_always_eager, countdowns are not waited for and errors propagate
+        return task(*args, **kwargs)
+
+
+class LocalBackend:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task")
+            return self._executor
+
+    def _run(self, task: Task, args, kwargs):
+        try:
+            return task(*args, **kwargs)
+        except Exception:
+            logger.exception("Task %s failed", task.name)
+            raise
+        finally:
+            # worker threads outlive requests, so nothing else closes their connections
+            close_old_connections()
+
+    def submit(self, task: Task, args, kwargs, countdown) -> Future | threading.Timer:
+        if countdown:
+            timer = threading.Timer(countdown, self.executor.submit, (self._run, task, args, kwargs))
+            timer.daemon = True
+            timer.start()
+            return timer
+        return self.executor.submit(self._run, task, args, kwargs)
+
+
+class CeleryBackend:
+    def submit(self, task: Task, args, kwargs, countdown):
+        if task.celery_task is None:
+            raise RuntimeError("TASK_BACKEND is 'celery' but celery is not installed")
+        return task.celery_task.apply_async(args, kwargs, countdown=countdown)
+
+
+_backends: dict[str, EagerBackend | LocalBackend | CeleryBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    name = settings.TASK_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            match name:
+                case "local":
+                    _backends[name] = LocalBackend(settings.TASK_LOCAL_WORKERS)
+                case "eager":
+                    _backends[name] = EagerBackend()
+                case "celery":
+                    _backends[name] = CeleryBackend()
+                case _:
+                    raise ValueError(f"Unknown TASK_BACKEND {name!r}")
+        return _backends[name]
@@ -0,0 +1,24 @@
+"""Fixtures shared by the services and travel_project test suites."""
+
+from django.core.cache import cache
+
+from services.api.models import AICArtwork
+from services.artwork import artwork_cache
+
+FETCH_MANY_PATH = "services.artwork.aic_client.get_artworks"
+FETCH_ONE_PATH = "services.artwork.aic_client.get_artwork_if_modified"
+
+
+def make_artwork(artwork_id) -> AICArtwork:
+    return AICArtwork(
+        id=artwork_id,
+        title=f"Artwork {artwork_id}",
+        artist_display="",
+        date_display="",
+        image_id=None,
+    )
+
+
+def clear_artwork_caches():
+    cache.clear()
+    artwork_cache.local.clear()
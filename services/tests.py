@@ -0,0 +1,927 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import PropertyMock, patch
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from services import artwork as artwork_service
+from services import metrics
+from services.api.base_client import (
+    APIError,
+    AsyncBaseAPIClient,
+    BaseAPIClient,
+    CircuitOpenError,
+    Conditional,
+    DeadlineExceededError,
+    NotFoundError,
+    PoolSaturatedError,
+    RateLimitedError,
+    Validators,
+)
+from services.api.aic import AICClient
+from services.api.circuit_breaker import CircuitBreaker
+from services.api.instrumentation import outbound_bytes, outbound_duration, outbound_requests, outbound_retries
+from services.api.rate_limit import TokenBucket
+from services.api.codec import decode_artwork_page, encode_artwork_page
+from services.api.models import AICArtwork, AICArtworkPage
+from services.artwork import (
+    ArtworkValidationError,
+    ArtworkValidationTimeout,
+    CacheEntry,
+    artwork_cache,
+    cache_stats,
+    get_artwork,
+    invalidate_artworks,
+    validate_artwork_exists,
+    validate_artworks_many,
+)
+from services.artwork_search import search_artworks, search_cache
+from services.cache import LocalCache
+from travel_planner.request_context import get_request_id, request_id
+from services.deadline import deadline, remaining
+from services.executor import OutboundPool, rejected
+from services.singleflight import SingleFlight
+from services.tasks import task
+from services.testing import FETCH_MANY_PATH, FETCH_ONE_PATH, clear_artwork_caches, make_artwork
+
+SEARCH_PATH = "services.artwork_search.aic_client.search_artwork_page"
+
+
+class _FastRetryClient(BaseAPIClient):
+    base_url = "https://aic.test"
+    backoff_base = 0
+    circuit_failure_threshold = 3
+
+
+def _client(handler):
+    return _FastRetryClient(transport=httpx.MockTransport(handler))
+
+
+class _RateLimitedClient(BaseAPIClient):
+    base_url = "https://limited.test"
+    rate_limit = 10.0
+    rate_limit_burst = 1
+    rate_limit_max_wait = 0.01
+
+
+class _UnreachableCache:
+    """What django-redis with IGNORE_EXCEPTIONS looks like while Redis is down."""
+
+    def get(self, key, default=None):
+        return default
+
+    def add(self, key, value, timeout=None):
+        return False
+
+    def incr(self, key, delta=1):
+        return None
+
+    def set(self, key, value, timeout=None):
+        return None
+
+    def delete(self, key):
+        return False
+
+
+class BaseAPIClientResilienceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # breakers memoise the shared state per process; start every test from a closed circuit
+        patcher = patch.dict("services.api.circuit_breaker._breakers", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, client, **kwargs):
+        return client.request(client.client.get, f"{client.base_url}/artworks/1", **kwargs)
+
+    def test_retries_transient_errors_then_succeeds(self):
+        responses = iter([httpx.Response(503), httpx.Response(502), httpx.Response(200, json={"ok": True})])
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return next(responses)
+
+        self.assertEqual(self._get(_client(handler)), {"ok": True})
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ConnectError("connection refused", request=request)
+
+        with self.assertRaises(APIError):
+            self._get(_client(handler))
+        self.assertEqual(len(calls), 1 + _FastRetryClient.max_retries)
+
+    def test_does_not_retry_not_found_or_non_idempotent(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(404 if request.method == "GET" else 503)
+
+        client = _client(handler)
+        with self.assertRaises(NotFoundError):
+            self._get(client)
+        with self.assertRaises(APIError):
+            client.request(client.client.post, f"{client.base_url}/artworks")
+        self.assertEqual(len(calls), 2)
+
+    @patch("services.api.base_client.time.sleep")
+    def test_honours_retry_after_on_429(self, mock_sleep):
+        responses = iter([httpx.Response(429, headers={"Retry-After": "3"}), httpx.Response(200, json={})])
+
+        self._get(_client(lambda request: next(responses)))
+
+        mock_sleep.assert_called_once_with(3.0)
+
+    def test_retry_after_beyond_cap_is_not_waited_out(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(429, headers={"Retry-After": "3600"})
+
+        with self.assertRaises(APIError) as ctx:
+            self._get(_client(handler))
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(len(calls), 1)
+
+    def test_circuit_opens_after_repeated_failures_and_fails_fast(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500)
+
+        client = _client(handler)
+        with self.assertRaises(APIError):
+            self._get(client)
+        self.assertEqual(len(calls), 3)
+
+        with self.assertRaises(CircuitOpenError):
+            self._get(client)
+        self.assertEqual(len(calls), 3)
+
+    def test_open_circuit_is_shared_through_the_cache(self):
+        failing = _client(lambda request: httpx.Response(500))
+        with self.assertRaises(APIError):
+            self._get(failing)
+
+        # a fresh process has no local memo, it only sees the shared state
+        with patch.dict("services.api.circuit_breaker._breakers", clear=True):
+            healthy = _client(lambda request: httpx.Response(200, json={}))
+            with self.assertRaises(CircuitOpenError):
+                self._get(healthy)
+
+    def test_failures_are_counted_locally_while_the_cache_is_unreachable(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        client = _client(handler)
+        with patch.object(CircuitBreaker, "backend", new_callable=PropertyMock, return_value=_UnreachableCache()):
+            with self.assertRaises(APIError):
+                self._get(client)
+            with self.assertRaises(CircuitOpenError):
+                self._get(client)
+        self.assertEqual(len(calls), 3)
+
+    def test_clients_share_a_breaker_only_with_the_same_thresholds(self):
+        class _TolerantClient(_FastRetryClient):
+            circuit_failure_threshold = 50
+
+        failing = _client(lambda request: httpx.Response(500))
+        with self.assertRaises(APIError):
+            self._get(failing)
+
+        tolerant = _TolerantClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+        self.assertEqual(self._get(tolerant), {})
+        with self.assertRaises(CircuitOpenError):
+            self._get(_client(lambda request: httpx.Response(200, json={})))
+
+    def test_running_out_of_deadline_is_not_held_against_the_host(self):
+        def handler(request):
+            # what a read timeout cut down to the little that was left of the deadline looks like
+            time.sleep(0.03)
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        client = _client(handler)
+        for _ in range(client.circuit_failure_threshold):
+            with deadline(0.02), self.assertRaises(DeadlineExceededError):
+                self._get(client)
+
+        self.assertFalse(client._circuit_breaker(f"{client.base_url}/artworks/1").is_open())
+
+    def test_async_client_keeps_breaker_calls_off_the_event_loop(self):
+        class _AsyncClient(AsyncBaseAPIClient):
+            base_url = "https://aic.test"
+
+        threads = set()
+        is_open = CircuitBreaker.is_open
+
+        def recording_is_open(breaker):
+            threads.add(threading.current_thread())
+            return is_open(breaker)
+
+        async def get():
+            client = _AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+            try:
+                data = await client.request(client.client.get, f"{client.base_url}/artworks/1")
+                return data, threading.current_thread()
+            finally:
+                await client.aclose()
+
+        with patch.object(CircuitBreaker, "is_open", recording_is_open):
+            data, loop_thread = async_to_sync(get)()
+
+        self.assertEqual(data, {})
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_conditional_request_sends_validators_and_handles_not_modified(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"ok": True}, headers={"ETag": '"v1"'})
+
+        client = _client(handler)
+        url = f"{client.base_url}/artworks/1"
+        first = client.conditional_request(client.client.get, url)
+        second = client.conditional_request(client.client.get, url, first.validators)
+
+        self.assertEqual(first, Conditional({"ok": True}, Validators('"v1"', None)))
+        self.assertTrue(second.not_modified)
+        self.assertEqual(second.validators, first.validators)
+        self.assertEqual(seen, [None, '"v1"'])
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        patcher = patch.dict("services.api.rate_limit._buckets", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bucket_allows_burst_then_queues(self):
+        bucket = TokenBucket("test", rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(max_wait=1), 0)
+        self.assertEqual(bucket.reserve(max_wait=1), 0)
+        self.assertAlmostEqual(bucket.reserve(max_wait=1), 0.1, delta=0.02)
+        # the queued reservation pushes the next caller further back
+        self.assertAlmostEqual(bucket.reserve(max_wait=1), 0.2, delta=0.02)
+
+    def test_bucket_refuses_waits_beyond_deadline_without_consuming(self):
+        bucket = TokenBucket("test", rate=10, capacity=1)
+        bucket.reserve(max_wait=1)
+        self.assertIsNone(bucket.reserve(max_wait=0.05))
+        self.assertAlmostEqual(bucket.reserve(max_wait=1), 0.1, delta=0.02)
+
+    def test_client_fails_when_queue_exceeds_max_wait(self):
+        client = _RateLimitedClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+        client.request(client.client.get, f"{client.base_url}/a")
+        with self.assertRaises(RateLimitedError):
+            client.request(client.client.get, f"{client.base_url}/a")
+
+    def test_clients_share_a_bucket_only_with_the_same_rate(self):
+        class _GenerousClient(_RateLimitedClient):
+            rate_limit = 1000.0
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+        limited = _RateLimitedClient(transport=transport)
+        limited.request(limited.client.get, f"{limited.base_url}/a")
+
+        generous = _GenerousClient(transport=transport)
+        self.assertEqual(generous.request(generous.client.get, f"{generous.base_url}/a"), {})
+        with self.assertRaises(RateLimitedError):
+            _RateLimitedClient(transport=transport).request(limited.client.get, f"{limited.base_url}/a")
+
+    def test_async_client_reserves_tokens_off_the_event_loop(self):
+        class _AsyncLimitedClient(AsyncBaseAPIClient):
+            base_url = "https://limited.test"
+            rate_limit = 10.0
+
+        threads = set()
+        reserve = TokenBucket.reserve
+
+        def recording_reserve(bucket, max_wait):
+            threads.add(threading.current_thread())
+            return reserve(bucket, max_wait)
+
+        async def get():
+            client = _AsyncLimitedClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+            try:
+                await client.request(client.client.get, f"{client.base_url}/a")
+                return threading.current_thread()
+            finally:
+                await client.aclose()
+
+        with patch.object(TokenBucket, "reserve", recording_reserve):
+            loop_thread = async_to_sync(get)()
+
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+
+class _UnlimitedAICClient(AICClient):
+    rate_limit = None
+
+
+class IterArtworksTests(TestCase):
+    TOTAL_PAGES = 4
+
+    def setUp(self):
+        self.requested = []
+
+    def _handler(self, request):
+        page = int(request.url.params["page"])
+        self.requested.append(page)
+        items = [{"id": page * 10 + i, "title": f"t{page}"} for i in range(2)]
+        return httpx.Response(200, json={"pagination": {"total_pages": self.TOTAL_PAGES}, "data": items})
+
+    def _client(self):
+        return _UnlimitedAICClient(transport=httpx.MockTransport(self._handler))
+
+    def test_yields_typed_artworks_in_page_order(self):
+        artworks = list(self._client().iter_artworks(page_size=2, prefetch=2))
+
+        self.assertTrue(all(isinstance(a, AICArtwork) for a in artworks))
+        self.assertEqual([a.id for a in artworks], [10, 11, 20, 21, 30, 31, 40, 41])
+        self.assertEqual(sorted(self.requested), [1, 2, 3, 4])
+
+    def test_prefetch_is_bounded(self):
+        pages = self._client().iter_artwork_pages(page_size=2, prefetch=1)
+        next(pages)
+        time.sleep(0.05)
+        # page 1 was consumed and only page 2 may be in flight
+        self.assertEqual(sorted(self.requested), [1, 2])
+        pages.close()
+
+    def test_without_prefetch_pages_are_fetched_on_demand(self):
+        pages = self._client().iter_artwork_pages(page_size=2, prefetch=0)
+        next(pages)
+        time.sleep(0.05)
+        self.assertEqual(self.requested, [1])
+
+        self.assertEqual([page.number for page in pages], [2, 3, 4])
+        self.assertEqual(self.requested, [1, 2, 3, 4])
+
+    def test_negative_prefetch_is_rejected(self):
+        with self.assertRaises(ValueError):
+            next(self._client().iter_artwork_pages(prefetch=-1))
+
+    def test_resumes_from_checkpoint(self):
+        checkpoints = []
+        artworks = self._client().iter_artworks(page_size=2, checkpoint=checkpoints.append)
+        for artwork in artworks:
+            if artwork.id == 21:
+                break
+        artworks.close()
+
+        self.assertEqual(checkpoints, [2])
+        resumed = list(self._client().iter_artworks(page_size=2, start_page=checkpoints[-1]))
+        self.assertEqual(resumed[0].id, 20)
+
+class ArtworkSingleFlightTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+
+    @patch(FETCH_ONE_PATH)
+    def test_concurrent_misses_share_one_fetch(self, mock_fetch):
+        def slow_fetch(external_id):
+            time.sleep(0.2)
+            return Conditional(make_artwork(int(external_id)), Validators())
+
+        mock_fetch.side_effect = slow_fetch
+        with ThreadPoolExecutor(max_workers=5) as ex:
+            results = list(ex.map(get_artwork, ["7"] * 5))
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertTrue(all(r.id == 7 for r in results))
+
+    @patch(FETCH_ONE_PATH)
+    def test_waits_for_lease_held_by_another_worker(self, mock_fetch):
+        cache.add("aic:artwork:lease:8", "other-worker", 10)
+
+        def other_worker_finishes():
+            artwork_cache.set("8", CacheEntry(make_artwork(8), time.time() + 60))
+            cache.delete("aic:artwork:lease:8")
+
+        threading.Timer(0.1, other_worker_finishes).start()
+
+        self.assertEqual(get_artwork("8").id, 8)
+        mock_fetch.assert_not_called()
+
+    def test_expired_lease_taken_over_by_another_worker_is_left_alone(self):
+        flight = SingleFlight("test:flight", lease_timeout=0.05)
+
+        def slow_fetch(keys):
+            time.sleep(0.1)
+            cache.add("test:flight:lease:a", "other-worker", 10)
+            return {"a": 1}
+
+        self.assertEqual(flight.do_many(["a"], slow_fetch, lambda keys: {}), {"a": 1})
+        self.assertEqual(cache.get("test:flight:lease:a"), "other-worker")
+        cache.delete("test:flight:lease:a")
+
+    def test_follower_with_time_left_fetches_after_the_leader_times_out(self):
+        flight = SingleFlight("test:flight")
+        leading = threading.Event()
+
+        def fetch():
+            if remaining() is not None:
+                leading.set()
+                time.sleep(0.1)
+                raise DeadlineExceededError("Request deadline exceeded")
+            return "fetched"
+
+        def lead():
+            with deadline(0.05), self.assertRaises(DeadlineExceededError):
+                flight.do("b", fetch, lambda: None)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        leading.wait(1)
+        self.assertEqual(flight.do("b", fetch, lambda: None), "fetched")
+        leader.join()
+
+
+class ArtworkStaleWhileRevalidateTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+
+    def _wait_for_refreshes(self):
+        for _ in range(100):
+            if not artwork_service._refreshing:
+                return
+            time.sleep(0.01)
+
+    @patch(FETCH_ONE_PATH, side_effect=NotFoundError())
+    def test_not_found_is_cached(self, mock_fetch):
+        for _ in range(2):
+            with self.assertRaises(ArtworkValidationError):
+                validate_artwork_exists("404")
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch(FETCH_MANY_PATH)
+    def test_stale_entry_served_while_refreshed(self, mock_fetch):
+        mock_fetch.return_value = [AICArtwork(9, "Fresh", "", "")]
+        stale = CacheEntry(AICArtwork(9, "Stale", "", ""), time.time() - 1)
+        artwork_cache.set("9", stale)
+
+        self.assertEqual(get_artwork("9").title, "Stale")
+        self._wait_for_refreshes()
+
+        self.assertEqual(get_artwork("9").title, "Fresh")
+        mock_fetch.assert_called_once_with(["9"])
+
+    @patch(FETCH_MANY_PATH, side_effect=APIError("Request timed out"))
+    def test_stale_entry_kept_when_refresh_fails(self, mock_fetch):
+        stale = CacheEntry(AICArtwork(9, "Stale", "", ""), time.time() - 1)
+        artwork_cache.set("9", stale)
+
+        self.assertEqual(get_artwork("9").title, "Stale")
+        self._wait_for_refreshes()
+
+        mock_fetch.assert_called_once_with(["9"])
+        self.assertEqual(get_artwork("9").title, "Stale")
+
+    @patch(FETCH_MANY_PATH)
+    @patch(FETCH_ONE_PATH)
+    def test_not_modified_refresh_extends_entry(self, mock_conditional, mock_fetch_many):
+        validators = Validators('"v1"', None)
+        mock_conditional.return_value = Conditional(None, validators)
+        artwork_cache.set("9", CacheEntry(AICArtwork(9, "Cached", "", ""), time.time() - 1, validators))
+
+        self.assertEqual(get_artwork("9").title, "Cached")
+        self._wait_for_refreshes()
+
+        mock_conditional.assert_called_once_with("9", validators)
+        mock_fetch_many.assert_not_called()
+        entry = artwork_cache.get("9")
+        self.assertFalse(entry.stale)
+        self.assertEqual(entry.artwork.title, "Cached")
+
+
+class ArtworkCacheCodecTests(TestCase):
+    def test_entry_round_trip(self):
+        entry = CacheEntry(AICArtwork(27992, "A Sunday on La Grande Jatte", "Georges Seurat", "1884", "abc"), 1.5)
+        self.assertEqual(CacheEntry.decode(entry.encode()), entry)
+        self.assertEqual(CacheEntry.decode(CacheEntry(None, 1.5).encode()), CacheEntry(None, 1.5))
+        with_validators = entry._replace(validators=Validators('W/"abc"', "Wed, 21 Oct 2015 07:28:00 GMT"))
+        self.assertEqual(CacheEntry.decode(with_validators.encode()), with_validators)
+
+    def test_foreign_or_corrupt_payloads_are_misses(self):
+        raw = CacheEntry(make_artwork(1), 1.5).encode()
+        self.assertIsNone(CacheEntry.decode(b"\x09" + raw[1:]))
+        self.assertIsNone(CacheEntry.decode(raw[:-1]))
+        self.assertIsNone(CacheEntry.decode(make_artwork(1)))
+
+
+class LocalArtworkCacheTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+
+    def test_evicts_least_recently_used(self):
+        local = LocalCache("test", maxsize=2, ttl=60)
+        local.set_many({"a": 1, "b": 2})
+        local.get_many(["a"])
+        local.set_many({"c": 3})
+
+        self.assertEqual(local.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
+        self.assertEqual(local.stats()["evictions"], 1)
+
+    def test_expired_entries_are_dropped(self):
+        local = LocalCache("test", maxsize=2, ttl=60)
+        local.set_many({"a": 1}, timeout=0.01)
+        time.sleep(0.02)
+        self.assertEqual(local.get_many(["a"]), {})
+        self.assertEqual(len(local), 0)
+
+    def test_hits_are_served_without_the_shared_cache(self):
+        artwork_cache.set("5", CacheEntry(make_artwork(5), time.time() + 60))
+
+        with patch.object(artwork_cache.backend, "get_many") as backend_get_many:
+            self.assertEqual(get_artwork("5").id, 5)
+            backend_get_many.assert_not_called()
+
+    def test_invalidate_drops_local_entry(self):
+        artwork_cache.set("5", CacheEntry(make_artwork(5), time.time() + 60))
+        invalidate_artworks(["5"], local_only=True)
+
+        self.assertEqual(artwork_cache.local.get_many(["5"]), {})
+        self.assertIn("5", artwork_cache.get_many(["5"]).hits)
+
+
+class ArtworkBatchValidationTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+
+    @patch(FETCH_MANY_PATH)
+    def test_batch_fetches_misses_in_one_call(self, mock_fetch):
+        mock_fetch.return_value = [make_artwork(1), make_artwork(3)]
+
+        results, errors = validate_artworks_many(["1", "2", "3", "not-a-number"])
+
+        mock_fetch.assert_called_once_with(["1", "2", "3"])
+        self.assertEqual(set(results), {"1", "3"})
+        self.assertEqual(set(errors), {"2", "not-a-number"})
+        self.assertEqual(results["1"].title, "Artwork 1")
+
+    @patch(FETCH_MANY_PATH)
+    def test_batch_serves_cached_artworks_without_fetching(self, mock_fetch):
+        mock_fetch.return_value = [make_artwork(1)]
+        validate_artworks_many(["1"])
+
+        results, errors = validate_artworks_many(["1"])
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(set(results), {"1"})
+        self.assertEqual(errors, {})
+
+    @patch(FETCH_MANY_PATH)
+    def test_batch_records_cache_hits_and_misses(self, mock_fetch):
+        mock_fetch.return_value = [make_artwork(1), make_artwork(2)]
+        before = cache_stats()
+
+        validate_artworks_many(["1", "2"])
+        validate_artworks_many(["1", "2"])
+
+        after = cache_stats()
+        self.assertEqual(after["misses"] - before["misses"], 2)
+        self.assertEqual(after["hits"] - before["hits"], 2)
+
+    @patch(FETCH_ONE_PATH)
+    @patch(FETCH_MANY_PATH)
+    def test_sync_validation_never_touches_the_async_client(self, mock_fetch, mock_fetch_one):
+        mock_fetch.return_value = [make_artwork(1)]
+        mock_fetch_one.return_value = Conditional(make_artwork(2), Validators())
+
+        with patch("services.artwork.async_aic_client") as async_client:
+            validate_artworks_many(["1"])
+            validate_artwork_exists("2")
+
+        self.assertEqual(async_client.mock_calls, [])
+
+    @patch(FETCH_MANY_PATH, side_effect=APIError("Request timed out"))
+    def test_batch_reports_upstream_failure_per_id(self, _):
+        results, errors = validate_artworks_many(["1", "2"])
+        self.assertEqual(results, {})
+        self.assertIn("try again later", errors["1"])
+
+    @patch(FETCH_MANY_PATH, side_effect=APIError("Request timed out"))
+    def test_upstream_failure_keeps_what_was_already_resolved(self, _):
+        expires = time.time() + 60
+        artwork_cache.set_many({"1": CacheEntry(make_artwork(1), expires), "2": CacheEntry(None, expires)})
+
+        results, errors = validate_artworks_many(["1", "2", "3"])
+
+        self.assertEqual(set(results), {"1"})
+        self.assertEqual(
+            errors,
+            {"2": "Artwork 2 not found in AIC API", "3": "Could not validate artwork 3, try again later"},
+        )
+
+
+class ArtworkCatalogueTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+        local = AICArtwork(id=5, title="Local", artist_display="Someone", date_display="", image_id=None)
+
+        def lookup(ids):
+            return {pk: local for pk in ids if pk == 5}
+
+        patcher = patch.object(artwork_service, "_catalogue", (lookup, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch(FETCH_ONE_PATH)
+    @patch(FETCH_MANY_PATH)
+    def test_validation_resolves_from_catalogue_first(self, mock_fetch_many, mock_fetch_one):
+        mock_fetch_many.return_value = [make_artwork(6)]
+
+        self.assertEqual(validate_artwork_exists("5").title, "Local")
+        found, errors = validate_artworks_many(["5", "6"])
+
+        mock_fetch_one.assert_not_called()
+        mock_fetch_many.assert_called_once_with(["6"])
+        self.assertEqual((found["5"].title, found["6"].id, errors), ("Local", 6, {}))
+
+
+def _search_block(query, *, page, limit, total=250):
+    ids = range((page - 1) * limit, min(page * limit, total))
+    return AICArtworkPage(page, -(-total // limit), [make_artwork(i) for i in ids])
+
+
+class ArtworkSearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        search_cache.local.clear()
+
+    @patch(SEARCH_PATH, side_effect=_search_block)
+    def test_pages_of_any_size_share_cached_blocks(self, mock_search):
+        first = search_artworks("Monet", page=1, limit=10)
+        second = search_artworks("  monet ", page=2, limit=25)
+        straddling = search_artworks("MONET", page=9, limit=12)
+
+        self.assertEqual([a.id for a in first.artworks], list(range(10)))
+        self.assertEqual([a.id for a in second.artworks], list(range(25, 50)))
+        self.assertEqual([a.id for a in straddling.artworks], list(range(96, 108)))
+        self.assertEqual([c.kwargs["page"] for c in mock_search.call_args_list], [1, 2])
+        mock_search.assert_called_with("monet", page=2, limit=100)
+
+    @patch(SEARCH_PATH, side_effect=_search_block)
+    def test_has_next_follows_the_result_count(self, _):
+        self.assertTrue(search_artworks("monet", page=1, limit=100).has_next)
+        last = search_artworks("monet", page=3, limit=100)
+        self.assertEqual(len(last.artworks), 50)
+        self.assertFalse(last.has_next)
+        self.assertEqual(search_artworks("monet", page=30, limit=10), ([], False))
+
+    @patch(SEARCH_PATH)
+    def test_blank_query_does_not_search(self, mock_search):
+        self.assertEqual(search_artworks("   "), ([], False))
+        mock_search.assert_not_called()
+
+    def test_page_codec_round_trip(self):
+        page = AICArtworkPage(3, 7, [make_artwork(1), AICArtwork(2, "Ünïcode", "A", "1900", "img")])
+        self.assertEqual(decode_artwork_page(encode_artwork_page(page)), page)
+
+
+
+class OutboundPoolTests(TestCase):
+    def test_map_runs_in_parallel_and_keeps_order(self):
+        pool = OutboundPool("test-parallel", size=2, queue_limit=0)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def work(n):
+            barrier.wait()  # only passes if both calls run at once
+            return n * 10
+
+        self.assertEqual(pool.map(work, [1, 2], timeout=5), [10, 20])
+
+    def test_full_pool_rejects_instead_of_queueing(self):
+        pool = OutboundPool("test-full", size=1, queue_limit=0)
+        release = threading.Event()
+        running = pool.submit(release.wait, 5)
+        try:
+            with self.assertRaises(PoolSaturatedError):
+                pool.submit(time.sleep, 0)
+            self.assertEqual(rejected.value(pool="test-full"), 1)
+            time.sleep(0.05)
+            self.assertEqual(pool.stats()["saturation"], 1)
+        finally:
+            release.set()
+            running.result(timeout=5)
+
+    def test_deadline_cancels_what_has_not_started(self):
+        pool = OutboundPool("test-deadline", size=1, queue_limit=5)
+        release = threading.Event()
+        started = []
+
+        def work(n):
+            started.append(n)
+            release.wait(5)
+
+        with self.assertRaises(DeadlineExceededError):
+            pool.map(work, [1, 2, 3], timeout=0.05)
+        release.set()
+        time.sleep(0.05)
+        self.assertEqual(started, [1])
+        self.assertEqual((pool.active, pool.queued), (0, 0))
+
+    def test_nested_calls_from_a_worker_run_inline(self):
+        pool = OutboundPool("test-nested", size=1, queue_limit=0)
+        self.assertEqual(pool.call(lambda: pool.map(str, [1, 2], timeout=1), timeout=5), ["1", "2"])
+
+    def test_get_artworks_fetches_chunks_concurrently(self):
+        client = _UnlimitedAICClient()
+        barrier = threading.Barrier(2, timeout=5)
+
+        def respond(method, url, params, **kwargs):
+            barrier.wait()
+            return {"data": [{"id": int(i), "title": "T"} for i in params["ids"].split(",")[:1]]}
+
+        with patch.object(client, "request", side_effect=respond):
+            artworks = client.get_artworks(list(range(150)))
+        self.assertEqual([a.id for a in artworks], [0, 100])
+
+
+class RequestDeadlineTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+        patcher = patch.dict("services.api.circuit_breaker._breakers", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_call_timeout_shrinks_to_what_is_left(self):
+        timeouts = []
+
+        def handler(request):
+            timeouts.append(request.extensions["timeout"]["read"])
+            return httpx.Response(200, json={})
+
+        client = _client(handler)
+        client.request(client.client.get, f"{client.base_url}/artworks/1")
+        with deadline(1):
+            client.request(client.client.get, f"{client.base_url}/artworks/1")
+        self.assertEqual(timeouts[0], client.timeout)
+        self.assertLessEqual(timeouts[1], 1)
+
+    def test_no_retry_or_call_past_the_deadline(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503, headers={"Retry-After": "2"})
+
+        client = _client(handler)
+        with deadline(0.5), self.assertRaises(DeadlineExceededError):
+            client.request(client.client.get, f"{client.base_url}/artworks/1")
+        with deadline(0), self.assertRaises(DeadlineExceededError):
+            client.request(client.client.get, f"{client.base_url}/artworks/1")
+        self.assertEqual(len(calls), 1)
+
+    def test_deadline_only_tightens_and_reaches_pool_workers(self):
+        pool = OutboundPool("test-request-deadline", size=2, queue_limit=0)
+        with deadline(0.5):
+            with deadline(60):
+                left = pool.call(remaining, timeout=5)
+            self.assertLessEqual(left, 0.5)
+            with self.assertRaises(DeadlineExceededError):
+                pool.call(time.sleep, 1, timeout=5)
+        self.assertIsNone(pool.call(remaining))
+
+    @patch(FETCH_MANY_PATH, side_effect=DeadlineExceededError("too slow"))
+    def test_batch_validation_reports_what_it_settled(self, _):
+        artwork_service._store({"1": artwork_service._found(make_artwork(1)), "2": artwork_service._not_found()})
+
+        with self.assertRaises(ArtworkValidationTimeout) as ctx:
+            validate_artworks_many(["1", "2", "3"])
+        self.assertEqual(
+            ctx.exception.errors,
+            {"2": "Artwork 2 not found in AIC API", "3": "Could not validate artwork 3 in time, try again later"},
+        )
+
+
+class _InstrumentedClient(_FastRetryClient):
+    pass
+
+
+class OutboundInstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = patch.dict("services.api.circuit_breaker._breakers", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_every_attempt_is_timed_and_counted_per_route(self):
+        responses = iter([httpx.Response(503), httpx.Response(200, json={"data": {"id": 5}})])
+        client = _InstrumentedClient(transport=httpx.MockTransport(lambda request: next(responses)))
+
+        with self.assertLogs("travel_planner.api", "INFO") as logs:
+            client.request(
+                client.client.get, f"{client.base_url}/artworks/5", params={"fields": "id"}, route="/artworks/{id}"
+            )
+
+        labels = {"client": "_InstrumentedClient", "method": "GET", "route": "/artworks/{id}"}
+        self.assertEqual(outbound_requests.value(**labels, status="503"), 1)
+        self.assertEqual(outbound_requests.value(**labels, status="200"), 1)
+        self.assertEqual(outbound_duration.count(**labels, status="200"), 1)
+        self.assertEqual(outbound_retries.value(client="_InstrumentedClient", route="/artworks/{id}"), 1)
+        self.assertGreater(outbound_bytes.value(client="_InstrumentedClient", route="/artworks/{id}"), 0)
+        record = next(r for r in logs.records if getattr(r, "status", None) == "200")
+        self.assertEqual(
+            (record.route, record.attempt, record.params), ("/artworks/{id}", 1, {"params": {"fields": "id"}})
+        )
+
+    def test_labels_never_come_from_the_url(self):
+        class _UnroutedClient(_FastRetryClient):
+            pass
+
+        client = _UnroutedClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+        for external_id in ("a", "b", "c"):
+            client.request(client.client.get, f"{client.base_url}/artworks/{external_id}", log=False)
+
+        routes = {labels["route"] for labels, _ in outbound_requests.samples() if labels["client"] == "_UnroutedClient"}
+        self.assertEqual(routes, {"other"})
+
+    def test_pool_workers_log_under_the_callers_request_id(self):
+        pool = OutboundPool("test-request-id", size=1, queue_limit=0)
+        with request_id("req-1"):
+            self.assertEqual(pool.call(get_request_id), "req-1")
+        self.assertEqual(pool.call(get_request_id), "")
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_request_id_middleware_uses_the_header_or_makes_one_up(self):
+        with patch("travel_planner.views.metrics.render", side_effect=get_request_id):
+            sent = self.client.get("/metrics", HTTP_X_REQUEST_ID="gateway-id").content.decode()
+            made_up = self.client.get("/metrics").content.decode()
+        self.assertEqual(sent, "gateway-id")
+        self.assertEqual(len(made_up), 32)
+
+    def test_histogram_exposition(self):
+        histogram = metrics.Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, route="/a")
+        [(labels, values)] = histogram.samples()
+        self.assertEqual(labels, {"route": "/a"})
+        self.assertEqual(values, {"0.1": 2, "1.0": 3, "+Inf": 4, "sum": 3.65, "count": 4})
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_metrics_endpoint_serves_the_registry(self):
+        metrics.counter("test_render_total", "Rendered").inc(route='/say "hi"')
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE test_render_total counter\n", body)
+        self.assertIn(f'test_render_total{{route="/say \\"hi\\"",pid="{os.getpid()}"}} 1\n', body)
+        self.assertIn("# TYPE outbound_request_duration_seconds histogram\n", body)
+        with self.settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    @override_settings(METRICS_ENABLED=True, METRICS_TOKEN="s3cret")
+    def test_metrics_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+
+@task(name="services.tests.add")
+def _add(a, b):
+    return a + b
+
+
+class TaskBackendTests(TestCase):
+    def test_eager_backend_runs_inline(self):
+        with self.settings(TASK_BACKEND="eager"):
+            self.assertEqual(_add.delay(1, 2), 3)
+            self.assertEqual(_add.apply_async((3,), {"b": 4}, countdown=60), 7)
+
+    def test_local_backend_runs_on_the_worker_pool(self):
+        with self.settings(TASK_BACKEND="local"):
+            future = _add.apply_async((5, 6))
+            self.assertEqual(future.result(timeout=5), 11)
+
+            timer = _add.apply_async((1, 1), countdown=0.01)
+            timer.join(timeout=5)
+            self.assertFalse(timer.is_alive())
+
+    def test_unknown_backend_is_rejected(self):
+        with self.settings(TASK_BACKEND="bogus"), self.assertRaises(ValueError):
+            _add.delay(1, 2)
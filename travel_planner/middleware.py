@@ -0,0 +1,69 @@
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from services import DeadlineExceededError
+from services.deadline import deadline
+from travel_planner.request_context import request_id
+
+# longer ids sent by a client are cut, they end up on every log line of the request
+MAX_REQUEST_ID_LENGTH = 64
+
+
+class RequestIdMiddleware:
+    """Tag the request's log lines with its id: the REQUEST_ID_HEADER value when sent, a fresh one otherwise."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _request_id(self, request) -> str:
+        sent = request.META.get(settings.REQUEST_ID_HEADER, "") if settings.REQUEST_ID_HEADER else ""
+        return sent[:MAX_REQUEST_ID_LENGTH] or uuid.uuid4().hex
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_id(self._request_id(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_id(self._request_id(request)):
+            return await self.get_response(request)
+
+
+class RequestDeadlineMiddleware:
+    """Give each request REQUEST_DEADLINE seconds of outbound calls (see services.deadline).
+
+    Outbound calls shrink their timeouts to what is left and fail with DeadlineExceededError once it is
+    spent; one that reaches this middleware uncaught is answered 504 instead of a 500.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deadline(settings.REQUEST_DEADLINE or None):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with deadline(settings.REQUEST_DEADLINE or None):
+            return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DeadlineExceededError):
+            return JsonResponse({"detail": "Upstream lookups ran out of time, try again later."}, status=504)
+        return None
@@ -0,0 +1,26 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# The id of the request being served. A ContextVar, so it follows the request into async views,
+# sync_to_async threads and OutboundPool workers, which a thread local does not.
+_request_id: ContextVar[str] = ContextVar("request_id", default="")
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+@contextmanager
+def request_id(value: str):
+    token = _request_id.set(value)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
@@ -42,6 +42,13 @@ def _parse_bool_env(key: str, default: bool = False) -> bool:
     return raw.lower() in ("true", "1", "yes")
 
 
+def _parse_int_env(key: str, default: int) -> int:
+    raw = os.environ.get(key, "")
+    if not raw:
+        return default
+    return int(raw)
+
+
 def _parse_tuple_env(key: str) -> tuple[str, str] | None:
     raw = os.environ.get(key, "")
     if not raw:
@@ -64,7 +71,6 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "request_id",
     "django_filters",
     "django_extensions",
     "drf_spectacular",
@@ -73,6 +79,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "travel_planner.middleware.RequestIdMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,6 +87,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "travel_planner.middleware.RequestDeadlineMiddleware",
 ]
 
 ROOT_URLCONF = "travel_planner.urls"
@@ -109,6 +117,14 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # take the write lock at BEGIN: the place-count checks read the counters and then write them in one
+        # transaction, and a deferred transaction that has to upgrade its lock fails with "database is locked"
+        # at once instead of waiting out the busy timeout
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        # an in-memory test database is shared-cache, whose table locks are never waited on: tests that write
+        # from several threads fail with "database table is locked" (or, through FTS5, "vtable constructor
+        # failed") instead of queueing as they would on a real database file
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -175,6 +191,47 @@ else:
         }
     }
 
+# AIC artwork lookups (services.artwork): fresh until the soft TTL, then served stale while refreshed
+# in the background until the hard TTL. 404s are cached for the negative TTL.
+ARTWORK_CACHE_SOFT_TTL = _parse_int_env("ARTWORK_CACHE_SOFT_TTL", 60 * 60 * 6)
+ARTWORK_CACHE_HARD_TTL = _parse_int_env("ARTWORK_CACHE_HARD_TTL", 60 * 60 * 24 * 7)
+ARTWORK_CACHE_NEGATIVE_TTL = _parse_int_env("ARTWORK_CACHE_NEGATIVE_TTL", 60 * 5)
+# Per-process LRU in front of the shared cache. Its TTL bounds how long a worker can keep serving an
+# entry another worker has already refreshed; a size of 0 disables it.
+ARTWORK_LOCAL_CACHE_SIZE = _parse_int_env("ARTWORK_LOCAL_CACHE_SIZE", 2048)
+ARTWORK_LOCAL_CACHE_TTL = _parse_int_env("ARTWORK_LOCAL_CACHE_TTL", 60)
+# AIC search results (services.artwork_search), cached per normalised query in 100-result blocks.
+ARTWORK_SEARCH_CACHE_TTL = _parse_int_env("ARTWORK_SEARCH_CACHE_TTL", 60 * 5)
+ARTWORK_SEARCH_LOCAL_CACHE_SIZE = _parse_int_env("ARTWORK_SEARCH_LOCAL_CACHE_SIZE", 256)
+# Resolve artworks from the local mirror filled by `manage.py sync_artworks` before the cache and API.
+ARTWORK_USE_CATALOGUE = _parse_bool_env("ARTWORK_USE_CATALOGUE", True)
+# Process-wide pool for outbound AIC lookups (services.executor): at most OUTBOUND_POOL_SIZE calls in flight
+# per worker process and OUTBOUND_POOL_QUEUE more waiting; beyond that lookups fail fast as unavailable.
+# A batch of lookups is abandoned after OUTBOUND_DEADLINE seconds.
+OUTBOUND_POOL_SIZE = _parse_int_env("OUTBOUND_POOL_SIZE", 8)
+OUTBOUND_POOL_QUEUE = _parse_int_env("OUTBOUND_POOL_QUEUE", 32)
+OUTBOUND_DEADLINE = _parse_int_env("OUTBOUND_DEADLINE", 10)
+# Seconds a request may spend on outbound lookups in total (travel_planner.middleware); every call's timeout
+# is cut to what is left and validation that runs out answers 504. Keep it under the gateway and gunicorn
+# timeouts; 0 disables it.
+REQUEST_DEADLINE = _parse_int_env("REQUEST_DEADLINE", 25)
+# Request header (as in request.META) with the gateway's request id, which every log line carries; when it
+# is missing, or this is left empty, a fresh id is generated per request.
+REQUEST_ID_HEADER = os.environ.get("REQUEST_ID_HEADER", "HTTP_X_REQUEST_ID") or None
+# Serve the process's metrics (services.metrics) in the Prometheus text format at /metrics. Off by default:
+# the labels name routes and upstream hosts. With METRICS_TOKEN set, scrapers must send it as a Bearer token.
+METRICS_ENABLED = _parse_bool_env("METRICS_ENABLED", False)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Serialized project detail/place list responses, cached per project version (travel_project.versioning);
+# every write to a project moves its version on, so the TTL only bounds memory. 0 disables it, ETags stay.
+PROJECT_RESPONSE_CACHE_TTL = _parse_int_env("PROJECT_RESPONSE_CACHE_TTL", 60 * 10)
+# Store new places as pending and fill in title/artist from AIC in the background (travel_project.enrichment)
+# instead of validating every artwork before answering.
+ARTWORK_DEFERRED_ENRICHMENT = _parse_bool_env("ARTWORK_DEFERRED_ENRICHMENT", False)
+# Where services.tasks runs background tasks: "local" (in-process thread pool), "eager" (inline) or "celery".
+TASK_BACKEND = os.environ.get("TASK_BACKEND", "local")
+TASK_LOCAL_WORKERS = _parse_int_env("TASK_LOCAL_WORKERS", 2)
+
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -2,10 +2,14 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from travel_planner.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/async/", include("travel_project.async_urls")),
     path("api/", include("travel_project.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
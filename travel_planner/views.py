@@ -0,0 +1,19 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from services import metrics
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint: this process's counters, gauges and histograms."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count, Q
 
-from travel_project.models import ProjectPlace, TravelProject
+from travel_project.models import Artwork, EnrichmentJob, ProjectPlace, TravelProject
+from travel_project.versioning import bump_project_version
 
 
 class ProjectPlaceInline(admin.TabularInline):
@@ -15,9 +18,38 @@ class TravelProjectAdmin(admin.ModelAdmin):
     search_fields = ["name"]
     inlines = [ProjectPlaceInline]
 
+    def delete_queryset(self, request, queryset):
+        # "delete selected" deletes the queryset, skipping TravelProject.delete and its version bump
+        pks = list(queryset.values_list("pk", flat=True))
+        super().delete_queryset(request, queryset)
+        bump_project_version(*pks, using=queryset.db)
+
 
 @admin.register(ProjectPlace)
 class ProjectPlaceAdmin(admin.ModelAdmin):
-    list_display = ["external_id", "title", "project", "visited"]
-    list_filter = ["visited"]
-
+    list_display = ["external_id", "title", "project", "visited", "enrichment_status"]
+    list_filter = ["visited", "enrichment_status"]
+
+    def delete_queryset(self, request, queryset):
+        # as for projects, ProjectPlace.delete is skipped, so the counters are adjusted once per project here
+        with transaction.atomic(using=queryset.db):
+            removed = list(
+                queryset.order_by()
+                .values("project_id")
+                .annotate(places=Count("pk"), visited=Count("pk", filter=Q(visited=True)))
+            )
+            super().delete_queryset(request, queryset)
+            for row in removed:
+                TravelProject.adjust_counters(row["project_id"], places=-row["places"], visited=-row["visited"])
+
+
+@admin.register(Artwork)
+class ArtworkAdmin(admin.ModelAdmin):
+    list_display = ["id", "title", "artist_display", "source_updated_at"]
+    search_fields = ["title"]
+
+
+@admin.register(EnrichmentJob)
+class EnrichmentJobAdmin(admin.ModelAdmin):
+    list_display = ["external_id", "attempts", "available_at", "locked_until", "last_error"]
+    search_fields = ["external_id"]
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _restore_search_triggers(sender, using, **kwargs):
+    from travel_project.search import restore_search_triggers
+
+    restore_search_triggers(using)
 
 
 class TravelProjectConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'travel_project'
+
+    def ready(self):
+        from services.artwork import register_catalogue
+        from travel_project.models import Artwork
+
+        # services stays independent of the app: the app hands it the catalogue lookup
+        register_catalogue(Artwork.lookup, Artwork.alookup)
+        post_migrate.connect(_restore_search_triggers, sender=self)
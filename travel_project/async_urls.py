@@ -0,0 +1,19 @@
+from django.urls import path
+
+from travel_project.async_views import (
+    AsyncProjectPlaceDetailView,
+    AsyncProjectPlaceListView,
+    AsyncTravelProjectDetailView,
+    AsyncTravelProjectListView,
+)
+
+urlpatterns = [
+    path("projects/", AsyncTravelProjectListView.as_view(), name="async-project-list"),
+    path("projects/<int:pk>/", AsyncTravelProjectDetailView.as_view(), name="async-project-detail"),
+    path("projects/<int:project_pk>/places/", AsyncProjectPlaceListView.as_view(), name="async-project-place-list"),
+    path(
+        "projects/<int:project_pk>/places/<str:external_id>/",
+        AsyncProjectPlaceDetailView.as_view(),
+        name="async-project-place-detail",
+    ),
+]
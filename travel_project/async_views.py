@@ -0,0 +1,208 @@
+import base64
+import binascii
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, NotFound, Throttled, UnsupportedMediaType
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+from travel_project.filters import TravelProjectFilter
+from travel_project.models import ProjectPlace, TravelProject
+from travel_project.pagination import TravelProjectCursorPagination
+from travel_project.serializers import (
+    DEFER_LOOKUPS,
+    AddPlaceSerializer,
+    ProjectPlaceSerializer,
+    TravelProjectCreateSerializer,
+    TravelProjectExpandedSerializer,
+    TravelProjectSerializer,
+    TravelProjectSummarySerializer,
+)
+from travel_project.versioning import acached_response_data, aproject_version, etag_matches, project_etag
+
+# Async-native variants of the project and place read/create endpoints, mounted under /api/async/ for the
+# ASGI server. DRF 3.14 cannot run async handlers, so these are plain Django views that reuse the DRF
+# serializers, filters and throttles and answer with the same JSON; the only synchronous sections are the
+# write transactions.
+
+
+def _response(data, status_code=status.HTTP_200_OK, headers=None) -> JsonResponse:
+    # the same bytes DRF's JSONRenderer writes, so ETags and cached bodies are shared with the sync views
+    return JsonResponse(
+        data,
+        status=status_code,
+        headers=headers,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={"separators": (",", ":"), "ensure_ascii": False},
+    )
+
+
+def _error(detail: str, status_code: int) -> JsonResponse:
+    return _response({"detail": detail}, status_code)
+
+
+def _json_body(request):
+    if request.content_type != JSONParser.media_type:
+        raise UnsupportedMediaType(request.content_type)
+    return JSONParser().parse(request)
+
+
+async def _validated(serializer):
+    serializer.is_valid(raise_exception=True)
+    try:
+        await serializer.avalidate(serializer.validated_data)
+    except serializers.ValidationError as e:
+        # shaped as is_valid() would have reported it
+        raise serializers.ValidationError(serializers.as_serializer_error(e))
+    return serializer
+
+
+def _save(serializer):
+    # the writes and the read-back of what they created, in one trip to a worker thread
+    with transaction.atomic():
+        serializer.save()
+        return serializer.data
+
+
+async def _versioned(request, project_pk, variant: str, abuild) -> JsonResponse | HttpResponseNotModified:
+    if (version := await aproject_version(project_pk)) is None:
+        return _response(await abuild())
+    etag = project_etag(project_pk, version, variant, "json")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(etag, request.headers.get("If-None-Match", "")):
+        return HttpResponseNotModified(headers=headers)
+    return _response(await acached_response_data(project_pk, variant, version, abuild), headers=headers)
+
+
+def _throttled(request, view) -> Throttled | None:
+    # as APIView.check_throttles: every throttle records the request, the longest wait is reported
+    waits = [
+        throttle.wait()
+        for throttle in (throttle_class() for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES)
+        if not throttle.allow_request(request, view)
+    ]
+    if not waits:
+        return None
+    known = [wait for wait in waits if wait is not None]
+    return Throttled(max(known) if known else None)
+
+
+class _AsyncAPIView(View):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # like DRF's APIView: the API authenticates without session cookies, so no CSRF check
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # resolved up front, so neither the throttles nor the handlers touch the session synchronously
+        request.user = await request.auser()
+        # the throttles keep their history in the cache, whose calls block
+        if throttled := await sync_to_async(_throttled, thread_sensitive=False)(request, self):
+            headers = {"Retry-After": str(throttled.wait)} if throttled.wait else None
+            return _response({"detail": throttled.detail}, throttled.status_code, headers)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return _error("Not found.", status.HTTP_404_NOT_FOUND)
+        except APIException as e:
+            # as DRF's exception handler renders them
+            return _response(e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}, e.status_code)
+
+
+def _encode_cursor(project: TravelProject) -> str:
+    return base64.urlsafe_b64encode(f"{project.created_at.isoformat()}|{project.pk}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if (position := parse_datetime(created_at)) is None:
+            raise ValueError(created_at)
+        return position, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise NotFound("Invalid cursor")
+
+
+class AsyncTravelProjectListView(_AsyncAPIView):
+    pagination = TravelProjectCursorPagination
+
+    def _page_size(self, request) -> int:
+        try:
+            size = int(request.GET[self.pagination.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.pagination.page_size
+        return min(size, self.pagination.max_page_size) if size > 0 else self.pagination.page_size
+
+    async def get(self, request):
+        filterset = TravelProjectFilter(request.GET, TravelProject.objects.all())
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        # the same keyset walk as TravelProjectCursorPagination, forward only
+        queryset = filterset.qs.order_by("-created_at", "-id")
+        if cursor := request.GET.get("cursor"):
+            created_at, pk = _decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+        expand = "places" in request.GET.get("expand", "").split(",")
+        if expand:
+            queryset = queryset.prefetch_related("places")
+        size = self._page_size(request)
+        projects = [project async for project in queryset[: size + 1]]
+
+        next_url = None
+        if len(projects) > size:
+            projects = projects[:size]
+            next_url = replace_query_param(request.build_absolute_uri(), "cursor", _encode_cursor(projects[-1]))
+        fields = [name.strip() for name in request.GET["fields"].split(",")] if request.GET.get("fields") else None
+        serializer_class = TravelProjectExpandedSerializer if expand else TravelProjectSummarySerializer
+        return _response({"next": next_url, "results": serializer_class(projects, many=True, fields=fields).data})
+
+    async def post(self, request):
+        serializer = TravelProjectCreateSerializer(data=_json_body(request), context={DEFER_LOOKUPS: True})
+        await _validated(serializer)
+        return _response(await sync_to_async(_save)(serializer), status.HTTP_201_CREATED)
+
+
+class AsyncTravelProjectDetailView(_AsyncAPIView):
+    async def get(self, request, pk):
+        async def build():
+            project = await aget_object_or_404(TravelProject.objects.prefetch_related("places"), pk=pk)
+            return TravelProjectSerializer(project).data
+
+        return await _versioned(request, pk, "detail", build)
+
+
+class AsyncProjectPlaceListView(_AsyncAPIView):
+    async def get(self, request, project_pk):
+        async def build():
+            places = [place async for place in ProjectPlace.objects.filter(project_id=project_pk)]
+            return ProjectPlaceSerializer(places, many=True).data
+
+        return await _versioned(request, project_pk, "places", build)
+
+    async def post(self, request, project_pk):
+        project = await aget_object_or_404(TravelProject, pk=project_pk)
+        serializer = AddPlaceSerializer(data=_json_body(request), context={"project": project, DEFER_LOOKUPS: True})
+        await _validated(serializer)
+        place = await sync_to_async(serializer.save)()
+        pending = place.enrichment_status == ProjectPlace.EnrichmentStatus.PENDING
+        return _response(
+            ProjectPlaceSerializer(place).data, status.HTTP_202_ACCEPTED if pending else status.HTTP_201_CREATED
+        )
+
+
+class AsyncProjectPlaceDetailView(_AsyncAPIView):
+    async def get(self, request, project_pk, external_id):
+        place = await aget_object_or_404(ProjectPlace, project_id=project_pk, external_id=external_id)
+        return _response(ProjectPlaceSerializer(place).data)
@@ -0,0 +1,135 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from services import APIError
+from services.artwork import get_artworks_many, is_artwork_id
+from services.tasks import task
+from travel_project.models import EnrichmentJob, ProjectPlace
+from travel_project.versioning import bump_project_version
+
+# "Accept then enrich": with ARTWORK_DEFERRED_ENRICHMENT on, new places are stored as pending and an
+# EnrichmentJob per external id is queued in the same transaction. drain_enrichment_queue claims due jobs in
+# batches, resolves each batch with one AIC lookup and fills in every pending place with those ids.
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+LEASE = timedelta(minutes=2)
+RETRY_DELAY = timedelta(seconds=15)
+MAX_RETRY_DELAY = timedelta(minutes=15)
+
+Status = ProjectPlace.EnrichmentStatus
+
+
+def deferred() -> bool:
+    return settings.ARTWORK_DEFERRED_ENRICHMENT
+
+
+def malformed(external_ids) -> dict[str, str]:
+    """Errors for ids that can never be AIC artworks, so they are refused up front rather than queued."""
+    return {eid: f"Artwork {eid} not found in AIC API" for eid in external_ids if not is_artwork_id(eid)}
+
+
+def enqueue(external_ids) -> None:
+    """Queue enrichment, inside the caller's transaction, and start a drain once it commits."""
+    external_ids = set(external_ids)
+    if invalid := set(malformed(external_ids)):
+        bump_project_version(*_settle(invalid, Status.INVALID))
+    if not (external_ids := external_ids - invalid):
+        return
+    EnrichmentJob.objects.bulk_create(
+        [EnrichmentJob(external_id=eid) for eid in external_ids],
+        # a job already queued for the id is reset rather than duplicated; one that a worker is processing
+        # loses its lease, so the place just added is picked up by the next drain instead of being missed
+        update_conflicts=True,
+        unique_fields=["external_id"],
+        update_fields=["attempts", "available_at", "lease", "locked_until"],
+    )
+    transaction.on_commit(drain_enrichment_queue.delay)
+
+
+def _claim(batch_size: int) -> tuple[str, list[EnrichmentJob]]:
+    now = timezone.now()
+    lease = uuid.uuid4().hex
+    due = EnrichmentJob.objects.filter(Q(locked_until__isnull=True) | Q(locked_until__lte=now), available_at__lte=now)
+    candidates = list(due.order_by("available_at").values_list("pk", flat=True)[:batch_size])
+    # the availability check is repeated in the UPDATE, so of two concurrent drains only one claims a job
+    due.filter(pk__in=candidates).update(lease=lease, locked_until=now + LEASE, attempts=F("attempts") + 1)
+    return lease, list(EnrichmentJob.objects.filter(pk__in=candidates, lease=lease))
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def _settle(external_ids, status: str, **fields) -> set[int]:
+    pending = ProjectPlace.objects.filter(external_id__in=external_ids, enrichment_status=Status.PENDING)
+    projects = set(pending.values_list("project_id", flat=True))
+    pending.update(enrichment_status=status, updated_at=timezone.now(), **fields)
+    return projects
+
+
+def _process(lease: str, jobs: list[EnrichmentJob]) -> None:
+    external_ids = [job.external_id for job in jobs]
+    try:
+        found = get_artworks_many(external_ids)
+    except APIError as e:
+        _retry(lease, jobs, e)
+        return
+    except Exception as e:
+        if len(jobs) > 1:
+            # look the ids up one by one, so whichever breaks the lookup does not hold up the rest
+            for job in jobs:
+                _process(lease, [job])
+            return
+        # still counted against MAX_ATTEMPTS, so a job that keeps failing ends up FAILED, not claimed forever
+        logger.exception("Enriching %s failed", external_ids)
+        _retry(lease, jobs, e)
+        return
+
+    with transaction.atomic():
+        projects = set()
+        for eid, artwork in found.items():
+            projects |= _settle([eid], Status.ENRICHED, title=artwork.title, artist=artwork.artist_display)
+        # ids AIC does not know (or that can never be AIC ids) are flagged for the user to remove
+        projects |= _settle([eid for eid in external_ids if eid not in found], Status.INVALID)
+        EnrichmentJob.objects.filter(pk__in=[job.pk for job in jobs], lease=lease).delete()
+        bump_project_version(*projects)
+
+
+def _retry(lease: str, jobs: list[EnrichmentJob], error: Exception) -> None:
+    given_up = [job for job in jobs if job.attempts >= MAX_ATTEMPTS]
+    with transaction.atomic():
+        for job in jobs:
+            if job in given_up:
+                continue
+            delay = _retry_delay(job.attempts)
+            EnrichmentJob.objects.filter(pk=job.pk, lease=lease).update(
+                available_at=timezone.now() + delay, lease="", locked_until=None, last_error=str(error)
+            )
+        if given_up:
+            logger.warning("Giving up enriching %s: %s", [job.external_id for job in given_up], error)
+            bump_project_version(*_settle([job.external_id for job in given_up], Status.FAILED))
+            EnrichmentJob.objects.filter(pk__in=[job.pk for job in given_up], lease=lease).delete()
+    if retried := [job.attempts for job in jobs if job not in given_up]:
+        # nothing else wakes a local worker up for the retry
+        drain_enrichment_queue.apply_async(countdown=_retry_delay(min(retried)).total_seconds())
+
+
+@task(name="travel_project.drain_enrichment_queue")
+def drain_enrichment_queue(batch_size: int = BATCH_SIZE) -> int:
+    """Process due jobs batch by batch until none are left; returns how many were handled."""
+    handled = 0
+    while True:
+        lease, jobs = _claim(batch_size)
+        if not jobs:
+            return handled
+        _process(lease, jobs)
+        handled += len(jobs)
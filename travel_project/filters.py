@@ -1,4 +1,5 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
 from travel_project.models import TravelProject
 
@@ -13,3 +14,13 @@ class TravelProjectFilter(filters.FilterSet):
         model = TravelProject
         fields = ["status", "name"]
 
+
+
+class TieBreakOrderingFilter(OrderingFilter):
+    """OrderingFilter that always ends on ``id``, so rows with equal keys keep one order across cursor pages."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering = [*ordering, "-id" if ordering[0].startswith("-") else "id"]
+        return ordering
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel_project.enrichment import BATCH_SIZE, drain_enrichment_queue
+
+
+class Command(BaseCommand):
+    help = "Drain the place enrichment queue: fill in title/artist of pending places from AIC"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--watch", type=float, metavar="SECONDS", help="Keep running, polling for due jobs every SECONDS"
+        )
+
+    def handle(self, *args, batch_size=BATCH_SIZE, watch=None, **options):
+        while True:
+            # called directly: this process is the worker, whatever TASK_BACKEND says
+            if handled := drain_enrichment_queue(batch_size):
+                self.stdout.write(f"Processed {handled} enrichment job(s)")
+            if watch is None:
+                break
+            time.sleep(watch)
+        self.stdout.write(self.style.SUCCESS("Enrichment queue drained"))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from travel_project.models import ProjectPlace, TravelProject
+from travel_project.versioning import bump_project_version
+
+
+def _actual_counts():
+    places = ProjectPlace.objects.filter(project=OuterRef("pk")).order_by().values("project")
+    return {
+        "places_count": Coalesce(Subquery(places.annotate(n=Count("pk")).values("n")), 0),
+        "visited_count": Coalesce(Subquery(places.annotate(n=Count("pk", filter=Q(visited=True))).values("n")), 0),
+    }
+
+
+class Command(BaseCommand):
+    help = "Re-derive TravelProject.places_count/visited_count from project_place and fix any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report drifted projects")
+
+    def handle(self, *args, dry_run=False, **options):
+        actual = _actual_counts()
+        drifted = (
+            TravelProject.objects.annotate(actual_places=actual["places_count"], actual_visited=actual["visited_count"])
+            .exclude(places_count=F("actual_places"), visited_count=F("actual_visited"))
+            .values_list("pk", "places_count", "visited_count", "actual_places", "actual_visited")
+        )
+
+        rows = list(drifted)
+        for pk, places, visited, actual_places, actual_visited in rows:
+            self.stdout.write(f"Project {pk}: places {places} -> {actual_places}, visited {visited} -> {actual_visited}")
+
+        if rows and not dry_run:
+            pks = [row[0] for row in rows]
+            with transaction.atomic():
+                # recomputed under the row locks, so writes that landed since the scan are not undone
+                list(TravelProject.objects.select_for_update().filter(pk__in=pks).values_list("pk"))
+                TravelProject.objects.filter(pk__in=pks).update(**_actual_counts())
+                TravelProject.sync_statuses(TravelProject.objects.filter(pk__in=pks))
+                bump_project_version(*pks)
+
+        verb = "Found" if dry_run else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(rows)} project(s) with drifted place counters"))
@@ -0,0 +1,90 @@
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from services.api.aic import MAX_PAGE_SIZE, aic_client
+from services.artwork import invalidate_artworks
+from travel_project.models import Artwork
+
+_UPDATE_FIELDS = ["title", "artist_display", "date_display", "image_id", "source_updated_at", "synced_at"]
+
+
+def _batches(records, size):
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _from_record(raw: dict) -> Artwork:
+    return Artwork(
+        id=raw["id"],
+        title=raw.get("title") or "",
+        artist_display=raw.get("artist_display") or "",
+        date_display=raw.get("date_display") or "",
+        image_id=raw.get("image_id"),
+        source_updated_at=parse_datetime(raw["updated_at"]) if raw.get("updated_at") else None,
+    )
+
+
+def _iter_api(since: str | None):
+    # keyset over (updated_at, id): ``offset`` only counts the records already seen at the boundary timestamp
+    offset = 0
+    while page := aic_client.get_artworks_updated_since(since, offset=offset, limit=MAX_PAGE_SIZE):
+        yield from page
+        last = page[-1].get("updated_at")
+        if last == since:
+            offset += len(page)
+        else:
+            since, offset = last, sum(1 for raw in page if raw.get("updated_at") == last)
+        if len(page) < MAX_PAGE_SIZE:
+            return
+
+
+def _iter_dump(path: Path):
+    # either the AIC data dump (a directory of one JSON file per artwork) or a JSON-lines file
+    if path.is_dir():
+        for file in sorted(path.rglob("*.json")):
+            yield json.loads(file.read_text())
+    else:
+        with path.open() as lines:
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = "Mirror the AIC collection into the local artwork table, incrementally by updated_at"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dump", type=Path, help="Read from an AIC data dump instead of the API")
+        parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and re-read everything")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, dump=None, full=False, batch_size=500, **options):
+        if dump is not None and not dump.exists():
+            raise CommandError(f"{dump} does not exist")
+
+        checkpoint = None if full else Artwork.objects.aggregate(latest=Max("source_updated_at"))["latest"]
+        records = _iter_dump(dump) if dump is not None else _iter_api(checkpoint.isoformat() if checkpoint else None)
+
+        synced = 0
+        for batch in _batches(records, batch_size):
+            artworks = [
+                artwork
+                for artwork in map(_from_record, (raw for raw in batch if raw.get("id") is not None))
+                if checkpoint is None or artwork.source_updated_at is None or artwork.source_updated_at >= checkpoint
+            ]
+            Artwork.objects.bulk_create(
+                artworks, update_conflicts=True, unique_fields=["id"], update_fields=_UPDATE_FIELDS
+            )
+            # cached copies, and 404s for artworks added since, are older than what was just mirrored
+            invalidate_artworks([str(artwork.id) for artwork in artworks])
+            synced += len(artworks)
+            self.stdout.write(f"Synced {synced} artworks", ending="\r")
+
+        since = f" updated since {checkpoint.isoformat()}" if checkpoint else ""
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} artworks{since}"))
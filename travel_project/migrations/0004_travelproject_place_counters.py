@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    TravelProject = apps.get_model('travel_project', 'TravelProject')
+    ProjectPlace = apps.get_model('travel_project', 'ProjectPlace')
+
+    counts = ProjectPlace.objects.filter(project=OuterRef('pk')).order_by().values('project')
+    TravelProject.objects.update(
+        places_count=Coalesce(Subquery(counts.annotate(n=Count('pk')).values('n')), 0),
+        visited_count=Coalesce(Subquery(counts.annotate(n=Count('pk', filter=Q(visited=True))).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0003_alter_projectplace_table_alter_travelproject_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelproject',
+            name='places_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='travelproject',
+            name='visited_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0004_travelproject_place_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['-created_at', '-id'], name='travel_project_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+# name__icontains compiles to UPPER("name"::text) LIKE UPPER(%s) on PostgreSQL, so the trigram index is built
+# on that expression. Other backends have no equivalent and keep the sequential scan.
+def create_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS travel_project_name_trgm_idx '
+        'ON travel_project USING gin (UPPER(name::text) gin_trgm_ops)'
+    )
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS travel_project_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0005_travelproject_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='travel_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['status', 'start_date'], name='travel_project_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['start_date'], name='travel_project_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['name'], name='travel_project_name_idx'),
+        ),
+        migrations.RunPython(create_name_trigram_index, drop_name_trigram_index),
+    ]
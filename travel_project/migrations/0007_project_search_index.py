@@ -0,0 +1,132 @@
+from django.db import migrations
+
+# One search document per project: its name and description plus the title, artist and notes of its places.
+# Triggers keep it current on every write path, including bulk_create/bulk_update and queryset updates.
+# SQLite rebuilds a table for most ALTERs and drops its triggers with it, so a later migration that alters
+# travel_project or project_place has to recreate them there; travel_project.search.restore_search_triggers
+# runs after every migrate as a safety net.
+
+_SQLITE_PLACES = (
+    "coalesce((SELECT group_concat(title || ' ' || artist || ' ' || notes, ' ') "
+    "FROM project_place WHERE project_id = {project}), '')"
+)
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE travel_project_search "
+    "USING fts5(name, description, places, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO travel_project_search (rowid, name, description, places) "
+    "SELECT p.id, p.name, coalesce(p.description, ''), " + _SQLITE_PLACES.format(project='p.id') + " "
+    "FROM travel_project p",
+    "CREATE TRIGGER travel_project_search_ai AFTER INSERT ON travel_project BEGIN "
+    "INSERT INTO travel_project_search (rowid, name, description, places) "
+    "VALUES (new.id, new.name, coalesce(new.description, ''), ''); END",
+    "CREATE TRIGGER travel_project_search_au AFTER UPDATE OF name, description ON travel_project BEGIN "
+    "UPDATE travel_project_search SET name = new.name, description = coalesce(new.description, '') "
+    "WHERE rowid = new.id; END",
+    "CREATE TRIGGER travel_project_search_ad AFTER DELETE ON travel_project BEGIN "
+    "DELETE FROM travel_project_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER project_place_search_ai AFTER INSERT ON project_place BEGIN "
+    "UPDATE travel_project_search SET places = " + _SQLITE_PLACES.format(project='new.project_id') + " "
+    "WHERE rowid = new.project_id; END",
+    "CREATE TRIGGER project_place_search_au AFTER UPDATE OF title, artist, notes, project_id ON project_place BEGIN "
+    "UPDATE travel_project_search SET places = " + _SQLITE_PLACES.format(project='old.project_id') + " "
+    "WHERE rowid = old.project_id; "
+    "UPDATE travel_project_search SET places = " + _SQLITE_PLACES.format(project='new.project_id') + " "
+    "WHERE rowid = new.project_id; END",
+    "CREATE TRIGGER project_place_search_ad AFTER DELETE ON project_place BEGIN "
+    "UPDATE travel_project_search SET places = " + _SQLITE_PLACES.format(project='old.project_id') + " "
+    "WHERE rowid = old.project_id; END",
+]
+
+SQLITE_REVERSE = [
+    *(
+        f"DROP TRIGGER IF EXISTS {name}"
+        for name in (
+            'travel_project_search_ai',
+            'travel_project_search_au',
+            'travel_project_search_ad',
+            'project_place_search_ai',
+            'project_place_search_au',
+            'project_place_search_ad',
+        )
+    ),
+    "DROP TABLE IF EXISTS travel_project_search",
+]
+
+POSTGRESQL_FORWARD = [
+    "CREATE TABLE travel_project_search ("
+    "project_id bigint PRIMARY KEY REFERENCES travel_project (id) ON DELETE CASCADE, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX travel_project_search_document_idx ON travel_project_search USING gin (document)",
+    """
+    CREATE FUNCTION travel_project_search_refresh(pid bigint) RETURNS void AS $$
+        INSERT INTO travel_project_search (project_id, document)
+        SELECT p.id,
+               setweight(to_tsvector('simple', p.name), 'A')
+               || setweight(to_tsvector('simple', coalesce(p.description, '')), 'B')
+               || setweight(to_tsvector('simple', coalesce((
+                   SELECT string_agg(concat_ws(' ', pp.title, pp.artist, pp.notes), ' ')
+                   FROM project_place pp WHERE pp.project_id = p.id
+               ), '')), 'C')
+        FROM travel_project p WHERE p.id = pid
+        ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE FUNCTION travel_project_search_project_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM travel_project_search_refresh(NEW.id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION travel_project_search_place_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM travel_project_search_refresh(OLD.project_id);
+        END IF;
+        IF TG_OP <> 'DELETE' AND (TG_OP = 'INSERT' OR NEW.project_id <> OLD.project_id) THEN
+            PERFORM travel_project_search_refresh(NEW.project_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER travel_project_search_project AFTER INSERT OR UPDATE OF name, description ON travel_project "
+    "FOR EACH ROW EXECUTE FUNCTION travel_project_search_project_trigger()",
+    "CREATE TRIGGER travel_project_search_place AFTER INSERT OR DELETE OR UPDATE OF title, artist, notes, project_id "
+    "ON project_place FOR EACH ROW EXECUTE FUNCTION travel_project_search_place_trigger()",
+    "SELECT travel_project_search_refresh(id) FROM travel_project",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP TRIGGER IF EXISTS travel_project_search_place ON project_place",
+    "DROP TRIGGER IF EXISTS travel_project_search_project ON travel_project",
+    "DROP FUNCTION IF EXISTS travel_project_search_place_trigger()",
+    "DROP FUNCTION IF EXISTS travel_project_search_project_trigger()",
+    "DROP FUNCTION IF EXISTS travel_project_search_refresh(bigint)",
+    "DROP TABLE IF EXISTS travel_project_search",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0006_travelproject_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0007_project_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artwork',
+            fields=[
+                ('id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('title', models.TextField(blank=True, default='')),
+                ('artist_display', models.TextField(blank=True, default='')),
+                ('date_display', models.TextField(blank=True, default='')),
+                ('image_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('source_updated_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'artwork',
+            },
+        ),
+    ]
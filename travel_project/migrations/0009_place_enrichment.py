@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+import importlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Adding/removing the column makes SQLite rebuild project_place, which drops the search triggers 0007 put on it
+_search_index = importlib.import_module('travel_project.migrations.0007_project_search_index')
+_PLACE_TRIGGERS = [sql for sql in _search_index.SQLITE_FORWARD if sql.startswith('CREATE TRIGGER project_place_')]
+
+
+def restore_place_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in _PLACE_TRIGGERS:
+        schema_editor.execute(sql.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1), params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0008_artwork'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrichmentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=100, unique=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('available_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('lease', models.CharField(blank=True, default='', max_length=32)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'enrichment_job',
+            },
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_place_search_triggers),
+        migrations.AddField(
+            model_name='projectplace',
+            name='enrichment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('enriched', 'Enriched'), ('invalid', 'Invalid'), ('failed', 'Failed')], default='enriched', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='projectplace',
+            index=models.Index(fields=['enrichment_status', 'external_id'], name='project_place_enrichment_idx'),
+        ),
+        migrations.RunPython(restore_place_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel_project', '0009_place_enrichment'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='travelproject',
+            name='travel_project_status_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='travelproject',
+            name='travel_project_start_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='travelproject',
+            name='travel_project_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['name', 'id'], name='travel_project_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelproject',
+            index=models.Index(fields=['status', 'name', 'id'], name='travel_project_status_name_idx'),
+        ),
+    ]
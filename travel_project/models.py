@@ -1,4 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.lookups import Exact, GreaterThan
+from django.utils import timezone
+
+from services.api.models import AICArtwork
+from travel_project.versioning import bump_all_project_versions, bump_project_version
 
 
 class TravelProject(models.Model):
@@ -10,33 +16,102 @@ class TravelProject(models.Model):
     description = models.TextField(null=True, blank=True)
     start_date = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    # denormalised from project_place, kept in step by ProjectPlace.save/delete and by the bulk paths that skip
+    # them (bulk place operations, the admin's bulk delete); repair_place_counters re-derives them
+    places_count = models.PositiveIntegerField(default=0, editable=False)
+    visited_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    MAX_PLACES = 10
+
     class Meta:
         db_table = "travel_project"
+        # one per ordering of TravelProjectViewSet, led by the status filter where it applies, so every list page
+        # is read in index order up to its LIMIT; name__icontains additionally gets a trigram index on PostgreSQL
+        # (migration 0006), since a plain btree cannot serve LIKE '%...%'. The start_date range is checked on the
+        # rows walked: an index led by start_date would be picked for it and then need a sort of every match.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="travel_project_created_id_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="travel_project_status_idx"),
+            models.Index(fields=["name", "id"], name="travel_project_name_idx"),
+            models.Index(fields=["status", "name", "id"], name="travel_project_status_name_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_project_version(self.pk, using=self._state.db)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        bump_project_version(pk, using=self._state.db)
+        return result
+
+    @classmethod
+    def _status_for(cls, places, visited):
+        # completed once every place is visited; the counters may be expressions over the pre-update values
+        return models.Case(
+            models.When(
+                Q(GreaterThan(places, 0)) & Q(Exact(visited, places)), then=models.Value(cls.Status.COMPLETED)
+            ),
+            default=models.Value(cls.Status.ACTIVE),
+        )
+
+    @classmethod
+    def adjust_counters(cls, pk, places: int = 0, visited: int = 0):
+        """Apply a place delta and recompute status in one UPDATE, inside the caller's transaction."""
+        if not (places or visited):
+            return
+        new_status = cls._status_for(F("places_count") + places, F("visited_count") + visited)
+        cls.objects.filter(pk=pk).update(
+            places_count=F("places_count") + places,
+            visited_count=F("visited_count") + visited,
+            status=new_status,
+            # SET expressions all read the old row, so this compares against the status being replaced
+            updated_at=models.Case(
+                models.When(Q(Exact(F("status"), new_status)), then=F("updated_at")),
+                default=models.Value(timezone.now(), output_field=models.DateTimeField()),
+            ),
+        )
+        bump_project_version(pk)
+
+    @classmethod
+    def sync_statuses(cls, queryset=None) -> int:
+        """Recompute status from the counters for many projects in one statement; returns the number changed."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        new_status = cls._status_for(F("places_count"), F("visited_count"))
+        changed = queryset.exclude(Q(Exact(F("status"), new_status))).update(status=new_status, updated_at=timezone.now())
+        if changed:
+            bump_all_project_versions(using=queryset.db)
+        return changed
+
     def sync_status(self):
-        if self.places.exists() and not self.places.filter(visited=False).exists():  # pyright: ignore[reportAttributeAccessIssue]
-            if self.status != self.Status.COMPLETED:
-                self.status = self.Status.COMPLETED
-                self.save(update_fields=["status"])
-        elif self.status == self.Status.COMPLETED:
-            self.status = self.Status.ACTIVE
-            self.save(update_fields=["status", "updated_at"])
+        # ProjectPlace writes already keep status in step; this is for rows whose counters were fixed up directly
+        self.sync_statuses(TravelProject.objects.filter(pk=self.pk))
 
     def has_visited_places(self):
-        return self.places.filter(visited=True).exists()  # pyright: ignore[reportAttributeAccessIssue]
+        return self.visited_count > 0
 
 
 class ProjectPlace(models.Model):
+    class EnrichmentStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        ENRICHED = "enriched", "Enriched"
+        INVALID = "invalid", "Invalid"
+        FAILED = "failed", "Failed"
+
     project = models.ForeignKey(TravelProject, on_delete=models.CASCADE, related_name="places")
     external_id = models.CharField(max_length=100)
     title = models.CharField(max_length=500, blank=True, default="")
     artist = models.CharField(max_length=500, blank=True, default="")
+    # pending while title/artist wait for the enrichment queue, see travel_project.enrichment
+    enrichment_status = models.CharField(
+        max_length=10, choices=EnrichmentStatus.choices, default=EnrichmentStatus.ENRICHED, editable=False
+    )
 
     notes = models.TextField(blank=True, default="")
     visited = models.BooleanField(default=False)
@@ -47,3 +122,78 @@ class ProjectPlace(models.Model):
     class Meta:
         db_table = "project_place"
         constraints = [models.UniqueConstraint(fields=["project", "external_id"], name="unique_place_per_project")]
+        indexes = [models.Index(fields=["enrichment_status", "external_id"], name="project_place_enrichment_idx")]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_visited = instance.__dict__.get("visited")
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        saved_visited = getattr(self, "_saved_visited", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                TravelProject.adjust_counters(self.project_id, places=1, visited=int(self.visited))  # pyright: ignore[reportAttributeAccessIssue]
+            elif saved_visited is not None and saved_visited != self.visited:
+                TravelProject.adjust_counters(self.project_id, visited=1 if self.visited else -1)  # pyright: ignore[reportAttributeAccessIssue]
+            bump_project_version(self.project_id, using=self._state.db)  # pyright: ignore[reportAttributeAccessIssue]
+        self._saved_visited = self.visited
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            visited = self.visited if getattr(self, "_saved_visited", None) is None else self._saved_visited
+            TravelProject.adjust_counters(self.project_id, places=-1, visited=-int(visited))  # pyright: ignore[reportAttributeAccessIssue]
+        return result
+
+
+class EnrichmentJob(models.Model):
+    """One queued AIC lookup per external id, shared by every pending place with that id."""
+
+    external_id = models.CharField(max_length=100, unique=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # set by the worker that claimed the job until locked_until; cleared when the job is enqueued again
+    lease = models.CharField(max_length=32, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "enrichment_job"
+
+    def __str__(self):
+        return f"{self.external_id} (attempt {self.attempts})"
+
+
+class Artwork(models.Model):
+    """Local mirror of the AIC collection, filled by the sync_artworks command."""
+
+    id = models.PositiveIntegerField(primary_key=True)  # the AIC id
+    title = models.TextField(blank=True, default="")
+    artist_display = models.TextField(blank=True, default="")
+    date_display = models.TextField(blank=True, default="")
+    image_id = models.CharField(max_length=64, null=True, blank=True)
+    # AIC's own modification time, the checkpoint for incremental syncs
+    source_updated_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "artwork"
+
+    def __str__(self):
+        return f"{self.id}: {self.title}"
+
+    def to_aic(self) -> AICArtwork:
+        return AICArtwork(self.id, self.title, self.artist_display, self.date_display, self.image_id)
+
+    @classmethod
+    def lookup(cls, ids: set[int]) -> dict[int, AICArtwork]:
+        return {pk: row.to_aic() for pk, row in cls.objects.in_bulk(ids).items()}
+
+    @classmethod
+    async def alookup(cls, ids: set[int]) -> dict[int, AICArtwork]:
+        return {pk: row.to_aic() for pk, row in (await cls.objects.ain_bulk(ids)).items()}
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TravelProjectCursorPagination(CursorPagination):
+    # keyset on the (created_at, id) index: every page is an index range scan, with no COUNT(*) or OFFSET
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 100
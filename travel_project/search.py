@@ -0,0 +1,130 @@
+import importlib
+import logging
+import re
+from abc import ABC, abstractmethod
+
+from django.db import connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+_TERM = re.compile(r"\w+")
+MAX_TERMS = 8
+
+
+def _terms(query: str) -> list[str]:
+    # only word characters reach the engine, so user input can never form FTS5/tsquery operators
+    return _TERM.findall(query)[:MAX_TERMS]
+
+
+class SearchBackend(ABC):
+    """Ranks projects matching every term of ``query`` (as prefixes) within ``queryset``."""
+
+    @abstractmethod
+    def ranked_ids(self, queryset, terms: list[str], limit: int) -> list[int]: ...
+
+    def search(self, queryset, query: str, limit: int) -> list:
+        if not (terms := _terms(query)):
+            return []
+        ids = self.ranked_ids(queryset.order_by(), terms, limit)
+        by_id = queryset.in_bulk(ids)
+        return [by_id[pk] for pk in ids if pk in by_id]
+
+
+class _IndexedSearchBackend(SearchBackend):
+    # ``{restrict}`` limits matches to a filtered queryset, so filters are applied before the LIMIT
+    sql: str
+    id_column: str
+
+    @abstractmethod
+    def match(self, terms: list[str]) -> str: ...
+
+    def ranked_ids(self, queryset, terms, limit):
+        restrict, params = "", ()
+        # unfiltered searches stay on the index alone instead of also listing every project id
+        if queryset.query.where:
+            projects, params = queryset.values("pk").query.sql_with_params()
+            restrict = f"AND {self.id_column} IN ({projects})"
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(self.sql.format(restrict=restrict), [self.match(terms), *params, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SQLiteSearchBackend(_IndexedSearchBackend):
+    # bm25 weights for name, description, places; lower is better
+    sql = (
+        "SELECT rowid FROM travel_project_search "
+        "WHERE travel_project_search MATCH %s {restrict} "
+        "ORDER BY bm25(travel_project_search, 10.0, 5.0, 1.0) LIMIT %s"
+    )
+    id_column = "rowid"
+
+    def match(self, terms):
+        return " ".join(f'"{term}"*' for term in terms)
+
+
+class PostgreSQLSearchBackend(_IndexedSearchBackend):
+    sql = (
+        "SELECT project_id FROM travel_project_search, to_tsquery('simple', %s) AS query "
+        "WHERE document @@ query {restrict} "
+        "ORDER BY ts_rank(document, query) DESC, project_id DESC LIMIT %s"
+    )
+    id_column = "project_id"
+
+    def match(self, terms):
+        return " & ".join(f"{term}:*" for term in terms)
+
+
+class LikeSearchBackend(SearchBackend):
+    """Unindexed fallback for backends without a search index: substring match, newest first."""
+
+    fields = ["name", "description", "places__title", "places__artist", "places__notes"]
+
+    def ranked_ids(self, queryset, terms, limit):
+        for term in terms:
+            queryset = queryset.filter(Q.create([(f"{field}__icontains", term) for field in self.fields], Q.OR))
+        return list(queryset.distinct().order_by("-created_at", "-id").values_list("pk", flat=True)[:limit])
+
+
+BACKENDS: dict[str, type[SearchBackend]] = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(using: str = "default") -> SearchBackend:
+    return BACKENDS.get(connections[using].vendor, LikeSearchBackend)()
+
+
+def _sqlite_search_sql() -> tuple[str, dict[str, str]]:
+    # the migration that created the index stays the one definition of it
+    migration = importlib.import_module("travel_project.migrations.0007_project_search_index")
+    backfill = next(sql for sql in migration.SQLITE_FORWARD if sql.startswith("INSERT INTO"))
+    triggers = {sql.split()[2]: sql for sql in migration.SQLITE_FORWARD if sql.startswith("CREATE TRIGGER")}
+    return backfill, triggers
+
+
+def restore_search_triggers(using: str = "default") -> list[str]:
+    """Recreate the SQLite search triggers a table rebuild dropped and refill the index; returns their names.
+
+    SQLite rebuilds a table for most ALTERs and drops its triggers with it, so any migration touching
+    travel_project or project_place would otherwise leave the index silently going stale.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return []
+    backfill, triggers = _sqlite_search_sql()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {(kind, name) for kind, name in cursor.fetchall()}
+        if ("table", "travel_project_search") not in existing:
+            return []
+        missing = [name for name in triggers if ("trigger", name) not in existing]
+        if missing:
+            for name in missing:
+                cursor.execute(triggers[name])
+            # whatever was written while they were gone never reached the index
+            cursor.execute("DELETE FROM travel_project_search")
+            cursor.execute(backfill)
+            logger.warning("Recreated search triggers %s and rebuilt the search index", ", ".join(missing))
+    return missing
@@ -1,50 +1,82 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from services.artwork import (
+    ArtworkValidationError,
+    ArtworkValidationTimeout,
+    avalidate_artwork_exists,
+    avalidate_artworks_many,
+    validate_artwork_exists,
+    validate_artworks_many,
+)
+from services.artwork_search import MAX_RESULTS
+from travel_project import enrichment
+from travel_project.models import ProjectPlace, TravelProject
+from travel_project.versioning import bump_project_version
 
-from django.db import transaction
-from rest_framework import serializers
 
-from services.artwork import ArtworkValidationError, validate_artwork_exists
-from travel_project.models import ProjectPlace, TravelProject
+# Context flag of the async views: the artwork and database lookups are left out of is_valid() and
+# awaited afterwards through the serializer's ``avalidate``.
+DEFER_LOOKUPS = "defer_lookups"
+
+Enrichment = ProjectPlace.EnrichmentStatus
+
+
+class ValidationTimedOut(APIException):
+    """Artwork validation ran into the request deadline: a 504 carrying the errors found up to then."""
+
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = "Artwork validation ran out of time, try again later."
+    default_code = "validation_timeout"
+
+    def __init__(self, errors: dict):
+        super().__init__({"detail": self.default_detail, **errors})
 
 
 def _validate_artworks_batch(external_ids: list[str]) -> tuple[dict[str, object], dict[str, str]]:
-    results = {}
-    errors = {}
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(validate_artwork_exists, eid): eid for eid in external_ids}
-        for future in as_completed(futures):
-            eid = futures[future]
-            try:
-                results[eid] = future.result()
-            except ArtworkValidationError as e:
-                errors[eid] = str(e)
-            except Exception as e:
-                errors[eid] = f"Unexpected error: {e}"
-    return results, errors
+    return validate_artworks_many(external_ids)
 
 
 def _build_place(project: TravelProject, external_id: str, artwork, notes: str = "") -> ProjectPlace:
+    # without an artwork the place waits for the enrichment queue to fill it in
     return ProjectPlace(
         project=project,
         external_id=external_id,
         title=getattr(artwork, "title", ""),
         artist=getattr(artwork, "artist_display", ""),
         notes=notes,
+        enrichment_status=Enrichment.PENDING if artwork is None else Enrichment.ENRICHED,
     )
 
 
+def _enqueue_pending(places) -> None:
+    enrichment.enqueue(place.external_id for place in places if place.enrichment_status == Enrichment.PENDING)
+
+
 class ProjectPlaceSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectPlace
-        fields = ["id", "external_id", "title", "artist", "notes", "visited", "created_at", "updated_at"]
-        read_only_fields = ["id", "title", "artist", "created_at", "updated_at"]
+        fields = [
+            "id",
+            "external_id",
+            "title",
+            "artist",
+            "enrichment_status",
+            "notes",
+            "visited",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "title", "artist", "enrichment_status", "created_at", "updated_at"]
 
 
 class ProjectPlaceUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectPlace
-        fields = ["id", "external_id", "title", "artist", "notes", "visited", "created_at", "updated_at"]
-        read_only_fields = ["id", "external_id", "title", "artist", "created_at", "updated_at"]
+        fields = ProjectPlaceSerializer.Meta.fields
+        read_only_fields = ["id", "external_id", "title", "artist", "enrichment_status", "created_at", "updated_at"]
 
 
 class TravelProjectSerializer(serializers.ModelSerializer):
@@ -56,6 +88,55 @@ class TravelProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "status", "created_at", "updated_at"]
 
 
+class _DynamicFieldsMixin:
+    """Accepts ``fields=[...]`` to serialise only a subset of the declared fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TravelProjectSummarySerializer(_DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = TravelProject
+        fields = ["id", "name", "description", "start_date", "status", "places_count", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class ProjectSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class ArtworkSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    artist_display = serializers.CharField()
+    date_display = serializers.CharField()
+    image_id = serializers.CharField(allow_null=True)
+
+
+class ArtworkSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    page = serializers.IntegerField(min_value=1, default=1)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        if attrs["page"] * attrs["limit"] > MAX_RESULTS:
+            raise serializers.ValidationError(f"Only the first {MAX_RESULTS} results can be paged through.")
+        return attrs
+
+
+class TravelProjectExpandedSerializer(TravelProjectSummarySerializer):
+    places = ProjectPlaceSerializer(many=True, read_only=True)
+
+    class Meta(TravelProjectSummarySerializer.Meta):
+        fields = [*TravelProjectSummarySerializer.Meta.fields, "places"]
+        read_only_fields = fields
+
+
 class _RepresentAsDetailMixin:
     def to_representation(self, instance):
         return TravelProjectSerializer(instance).data
@@ -66,7 +147,7 @@ class TravelProjectCreateSerializer(_RepresentAsDetailMixin, serializers.ModelSe
         child=serializers.DictField(),
         required=True,
         min_length=1,
-        max_length=10,
+        max_length=TravelProject.MAX_PLACES,
     )
 
     class Meta:
@@ -78,26 +159,54 @@ class TravelProjectCreateSerializer(_RepresentAsDetailMixin, serializers.ModelSe
         for item in value:
             if "external_id" not in item:
                 raise serializers.ValidationError("Each place must include 'external_id'.")
+            if not isinstance(item["external_id"], (str, int)) or isinstance(item["external_id"], bool):
+                raise serializers.ValidationError("Each 'external_id' must be a string.")
+            item["external_id"] = str(item["external_id"])
 
         external_ids = [p["external_id"] for p in value]
         if len(external_ids) != len(set(external_ids)):
             raise serializers.ValidationError("Duplicate external_id values in request.")
 
-        artworks, errors = _validate_artworks_batch(external_ids)
+        if enrichment.deferred():
+            if errors := enrichment.malformed(external_ids):
+                raise serializers.ValidationError(errors)
+            for p in value:
+                p["_artwork"] = None
+        elif not self.context.get(DEFER_LOOKUPS):
+            try:
+                self._attach_artworks(value, *_validate_artworks_batch(external_ids))
+            except ArtworkValidationTimeout as e:
+                raise ValidationTimedOut({"places": e.errors})
+        return value
+
+    async def avalidate(self, attrs):
+        if enrichment.deferred():
+            return attrs
+        try:
+            artworks, errors = await avalidate_artworks_many([p["external_id"] for p in attrs["places"]])
+        except ArtworkValidationTimeout as e:
+            raise ValidationTimedOut({"places": e.errors})
+        try:
+            self._attach_artworks(attrs["places"], artworks, errors)
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({"places": e.detail})
+        return attrs
+
+    def _attach_artworks(self, places, artworks, errors):
         if errors:
             raise serializers.ValidationError(errors)
-
-        for p in value:
+        for p in places:
             p["_artwork"] = artworks[p["external_id"]]
 
-        return value
-
     def create(self, validated_data):
         places_data = validated_data.pop("places", [])
-        project = TravelProject.objects.create(**validated_data)
-        ProjectPlace.objects.bulk_create(
-            [_build_place(project, p["external_id"], p.pop("_artwork"), p.get("notes", "")) for p in places_data]
-        )
+        with transaction.atomic():
+            # bulk_create skips ProjectPlace.save, so the counter is set up front
+            project = TravelProject.objects.create(**validated_data, places_count=len(places_data))
+            places = ProjectPlace.objects.bulk_create(
+                [_build_place(project, p["external_id"], p.pop("_artwork"), p.get("notes", "")) for p in places_data]
+            )
+            _enqueue_pending(places)
         return project
 
 
@@ -112,19 +221,53 @@ class AddPlaceSerializer(serializers.Serializer):
     external_id = serializers.CharField(max_length=100)
     notes = serializers.CharField(required=False, default="", allow_blank=True)
 
-    def validate(self, attrs):
+    def _check_capacity(self):
         project = self.context["project"]
-
-        if project.places.count() >= 10:
-            raise serializers.ValidationError({"external_id": "Project already has the maximum of 10 places."})
-
-        if project.places.filter(external_id=attrs["external_id"]).exists():
+        if project.places_count >= project.MAX_PLACES:
             raise serializers.ValidationError(
-                {"external_id": f"Place {attrs['external_id']} already exists in this project."}
+                {"external_id": f"Project already has the maximum of {project.MAX_PLACES} places."}
             )
 
+    def _duplicate(self, external_id):
+        return serializers.ValidationError({"external_id": f"Place {external_id} already exists in this project."})
+
+    def _accept_deferred(self, attrs):
+        if errors := enrichment.malformed([attrs["external_id"]]):
+            raise serializers.ValidationError({"external_id": list(errors.values())})
+        attrs["artwork"] = None
+        return attrs
+
+    def validate(self, attrs):
+        if self.context.get(DEFER_LOOKUPS):
+            return attrs
+        self._check_capacity()
+
+        if self.context["project"].places.filter(external_id=attrs["external_id"]).exists():
+            raise self._duplicate(attrs["external_id"])
+
+        if enrichment.deferred():
+            return self._accept_deferred(attrs)
         try:
             attrs["artwork"] = validate_artwork_exists(attrs["external_id"])
+        except ArtworkValidationTimeout as e:
+            raise ValidationTimedOut({"external_id": list(e.errors.values())})
+        except ArtworkValidationError as e:
+            raise serializers.ValidationError({"external_id": str(e)})
+
+        return attrs
+
+    async def avalidate(self, attrs):
+        self._check_capacity()
+
+        if await self.context["project"].places.filter(external_id=attrs["external_id"]).aexists():
+            raise self._duplicate(attrs["external_id"])
+
+        if enrichment.deferred():
+            return self._accept_deferred(attrs)
+        try:
+            attrs["artwork"] = await avalidate_artwork_exists(attrs["external_id"])
+        except ArtworkValidationTimeout as e:
+            raise ValidationTimedOut({"external_id": list(e.errors.values())})
         except ArtworkValidationError as e:
             raise serializers.ValidationError({"external_id": str(e)})
 
@@ -135,16 +278,11 @@ class AddPlaceSerializer(serializers.Serializer):
         project = self.context["project"]
 
         with transaction.atomic():
-            TravelProject.objects.select_for_update().get(pk=project.pk)
+            locked = TravelProject.objects.select_for_update().only("places_count").get(pk=project.pk)
 
-            if project.places.count() >= 10:
+            if locked.places_count >= project.MAX_PLACES:
                 raise serializers.ValidationError(
-                    {"external_id": "Project already has the maximum of 10 places."}
-                )
-
-            if project.places.filter(external_id=validated_data["external_id"]).exists():
-                raise serializers.ValidationError(
-                    {"external_id": f"Place {validated_data['external_id']} already exists in this project."}
+                    {"external_id": f"Project already has the maximum of {project.MAX_PLACES} places."}
                 )
 
             place = _build_place(
@@ -153,6 +291,134 @@ class AddPlaceSerializer(serializers.Serializer):
                 artwork,
                 validated_data.get("notes", ""),
             )
-            place.save()
+            # a concurrent add of the same id is caught by unique_place_per_project
+            try:
+                place.save()
+            except IntegrityError:
+                raise self._duplicate(validated_data["external_id"])
+            _enqueue_pending([place])
 
         return place
+
+
+class PlaceOp(models.TextChoices):
+    ADD = "add"
+    UPDATE = "update"
+    REMOVE = "remove"
+
+
+class BulkPlaceOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=PlaceOp.choices)
+    external_id = serializers.CharField(max_length=100)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    visited = serializers.BooleanField(required=False)
+
+
+class BulkPlaceOperationsSerializer(serializers.Serializer):
+    operations = BulkPlaceOperationSerializer(many=True, allow_empty=False)
+
+    @staticmethod
+    def _errors_by_op(operations, errors: dict[str, str]) -> list[dict]:
+        return [
+            {"external_id": [errors[op["external_id"]]]} if op["external_id"] in errors else {} for op in operations
+        ]
+
+    def validate_operations(self, value):
+        if len(value) > 2 * TravelProject.MAX_PLACES:
+            raise serializers.ValidationError(f"At most {2 * TravelProject.MAX_PLACES} operations per request.")
+
+        external_ids = [op["external_id"] for op in value]
+        if len(external_ids) != len(set(external_ids)):
+            raise serializers.ValidationError("Each external_id may appear in only one operation.")
+
+        adds = [op for op in value if op["op"] == PlaceOp.ADD]
+        if adds and enrichment.deferred():
+            if errors := enrichment.malformed(op["external_id"] for op in adds):
+                raise serializers.ValidationError(self._errors_by_op(value, errors))
+            for op in adds:
+                op["_artwork"] = None
+        elif adds:
+            # one batched lookup for every added artwork, before any row is locked
+            try:
+                artworks, errors = _validate_artworks_batch([op["external_id"] for op in adds])
+            except ArtworkValidationTimeout as e:
+                raise ValidationTimedOut({"operations": self._errors_by_op(value, e.errors)})
+            if errors:
+                raise serializers.ValidationError(self._errors_by_op(value, errors))
+            for op in adds:
+                op["_artwork"] = artworks[op["external_id"]]
+
+        return value
+
+    def _check_against(self, project: TravelProject, operations, existing: dict[str, ProjectPlace]):
+        errors = []
+        for op in operations:
+            if op["op"] == PlaceOp.ADD and op["external_id"] in existing:
+                errors.append({"external_id": [f"Place {op['external_id']} already exists in this project."]})
+            elif op["op"] != PlaceOp.ADD and op["external_id"] not in existing:
+                errors.append({"external_id": [f"Place {op['external_id']} is not in this project."]})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError({"operations": errors})
+
+        delta = sum(1 if op["op"] == PlaceOp.ADD else -1 if op["op"] == PlaceOp.REMOVE else 0 for op in operations)
+        if project.places_count + delta > project.MAX_PLACES:
+            raise serializers.ValidationError(f"Project cannot have more than {project.MAX_PLACES} places.")
+        if project.places_count + delta < 1:
+            raise serializers.ValidationError("Cannot remove the last place from a project.")
+
+    def create(self, validated_data):
+        operations = validated_data["operations"]
+        project = self.context["project"]
+
+        with transaction.atomic():
+            locked = TravelProject.objects.select_for_update().only("places_count").get(pk=project.pk)
+            existing = {
+                place.external_id: place
+                for place in ProjectPlace.objects.filter(
+                    project_id=project.pk, external_id__in=[op["external_id"] for op in operations]
+                )
+            }
+            self._check_against(locked, operations, existing)
+
+            now = timezone.now()
+            added, updated, removed = [], [], []
+            visited_delta = 0
+            for op in operations:
+                if op["op"] == PlaceOp.ADD:
+                    place = _build_place(project, op["external_id"], op.pop("_artwork"), op.get("notes", ""))
+                    place.visited = op.get("visited", False)
+                    visited_delta += int(place.visited)
+                    added.append(place)
+                elif op["op"] == PlaceOp.UPDATE:
+                    place = existing[op["external_id"]]
+                    visited_delta += int(op.get("visited", place.visited)) - int(place.visited)
+                    place.notes = op.get("notes", place.notes)
+                    place.visited = op.get("visited", place.visited)
+                    place.updated_at = now
+                    updated.append(place)
+                else:
+                    place = existing[op["external_id"]]
+                    visited_delta -= int(place.visited)
+                    removed.append(place.pk)
+                op["_place"] = place
+
+            # bulk writes skip ProjectPlace.save/delete, so the counters and status are applied once here
+            ProjectPlace.objects.bulk_create(added)
+            _enqueue_pending(added)
+            ProjectPlace.objects.bulk_update(updated, ["notes", "visited", "updated_at"])
+            ProjectPlace.objects.filter(pk__in=removed).delete()
+            TravelProject.adjust_counters(project.pk, places=len(added) - len(removed), visited=visited_delta)
+            bump_project_version(project.pk)
+
+        return operations
+
+    def to_representation(self, instance):
+        results = []
+        for op in instance:
+            result = {"op": op["op"], "external_id": op["external_id"]}
+            if op["op"] != PlaceOp.REMOVE:
+                result["place"] = ProjectPlaceSerializer(op["_place"]).data
+            results.append(result)
+        return {"results": results}
@@ -1,12 +1,34 @@
+import datetime
+import json
+import tempfile
 from concurrent.futures import ThreadPoolExecutor
-from unittest.mock import patch
-
-from django.test import TestCase, TransactionTestCase
+from io import StringIO
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework.throttling import AnonRateThrottle
 
+from services.api.base_client import APIError, DeadlineExceededError
 from services.api.models import AICArtwork
-from travel_project.models import ProjectPlace, TravelProject
+from services.artwork import ArtworkValidationTimeout, CacheEntry, artwork_cache
+from services.artwork_search import ArtworkSearchResult
+from services.testing import FETCH_MANY_PATH, FETCH_ONE_PATH, clear_artwork_caches, make_artwork
+from travel_project.filters import TravelProjectFilter
+from travel_project import enrichment
+from travel_project.enrichment import drain_enrichment_queue
+from travel_project.models import Artwork, EnrichmentJob, ProjectPlace, TravelProject
+from travel_project.search import restore_search_triggers
+from travel_project.serializers import _validate_artworks_batch
 
 
 def _mock_validate(external_id):
@@ -15,13 +37,18 @@ def _mock_validate(external_id):
         title=f"Artwork {external_id}",
         artist_display=f"Artist {external_id}",
         date_display="2000",
-        thumbnail=None,
         image_id=None,
     )
 
 
 VALIDATE_PATH = "travel_project.serializers.validate_artwork_exists"
 BATCH_PATH = "travel_project.serializers._validate_artworks_batch"
+AVALIDATE_PATH = "travel_project.serializers.avalidate_artwork_exists"
+AVALIDATE_MANY_PATH = "travel_project.serializers.avalidate_artworks_many"
+ENRICH_FETCH_PATH = "travel_project.enrichment.get_artworks_many"
+
+# how SQLite and PostgreSQL report a sort that the chosen index could not satisfy
+_SORT_MARKERS = ("USE TEMP B-TREE FOR ORDER BY", "Sort  (")
 
 
 class TravelProjectTests(TestCase):
@@ -57,6 +84,230 @@ class TravelProjectTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(TravelProject.objects.filter(pk=project.pk).exists())
 
+    @patch(FETCH_ONE_PATH)
+    @patch(FETCH_MANY_PATH)
+    def test_non_ascii_digits_are_rejected_without_a_lookup(self, mock_fetch_many, mock_fetch_one):
+        project = TravelProject.objects.create(name="P")
+
+        places = [{"external_id": "²"}]
+        created = self.client.post("/api/projects/", {"name": "Trip", "places": places}, format="json")
+        added = self.client.post(f"/api/projects/{project.pk}/places/", {"external_id": "٣"}, format="json")
+
+        self.assertEqual(created.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("not found", created.json()["places"]["²"])
+        self.assertEqual(added.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_fetch_many.assert_not_called()
+        mock_fetch_one.assert_not_called()
+
+    @patch(FETCH_ONE_PATH)
+    @patch(FETCH_MANY_PATH)
+    def test_ids_beyond_the_catalogue_column_are_rejected(self, mock_fetch_many, mock_fetch_one):
+        project = TravelProject.objects.create(name="P")
+        too_large = ["99999999999999999999999", str(2**31), "1" * 5000]
+
+        created = self.client.post(
+            "/api/projects/", {"name": "Trip", "places": [{"external_id": eid} for eid in too_large]}, format="json"
+        )
+        added = self.client.post(f"/api/projects/{project.pk}/places/", {"external_id": too_large[0]}, format="json")
+
+        self.assertEqual(created.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(created.json()["places"]), set(too_large))
+        self.assertEqual(added.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_fetch_many.assert_not_called()
+        mock_fetch_one.assert_not_called()
+
+
+class TravelProjectListTests(TestCase):
+    def setUp(self):
+        self.client: APIClient = APIClient()
+        for i in range(5):
+            project = TravelProject.objects.create(name=f"P{i}")
+            ProjectPlace.objects.create(project=project, external_id=str(i))
+
+    def test_list_returns_summary_rows(self):
+        response = self.client.get("/api/projects/")
+        row = response.data["results"][0]
+        self.assertEqual(row["name"], "P4")
+        self.assertEqual(row["places_count"], 1)
+        self.assertNotIn("places", row)
+        self.assertNotIn("count", response.data)
+
+    def test_expand_and_fields(self):
+        expanded = self.client.get("/api/projects/?expand=places").data["results"][0]
+        self.assertEqual([p["external_id"] for p in expanded["places"]], ["4"])
+
+        trimmed = self.client.get("/api/projects/?fields=id,name").data["results"][0]
+        self.assertEqual(set(trimmed), {"id", "name"})
+
+    def test_cursor_pages_walk_every_project_once_at_constant_cost(self):
+        names, url = [], "/api/projects/?page_size=2"
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            self.assertNotIn("OFFSET", ctx.captured_queries[0]["sql"].upper())
+            names += [row["name"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(names, ["P4", "P3", "P2", "P1", "P0"])
+
+    def test_cursor_pages_any_ordering_across_null_start_dates(self):
+        TravelProject.objects.filter(name__in=["P1", "P3"]).update(start_date=datetime.date(2025, 1, 1))
+        TravelProject.objects.create(name="P1")
+
+        for ordering, expected in [
+            ("start_date", ["P1", "P4", "P3", "P2", "P1", "P0"]),
+            ("name", ["P0", "P1", "P1", "P2", "P3", "P4"]),
+        ]:
+            names, ids, url = [], [], f"/api/projects/?ordering={ordering}&page_size=2"
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                names += [row["name"] for row in response.data["results"]]
+                ids += [row["id"] for row in response.data["results"]]
+                url = response.data["next"]
+            self.assertEqual(names, expected)
+            self.assertEqual(len(set(ids)), 6)
+
+class ProjectSearchTests(TestCase):
+    def setUp(self):
+        self.client: APIClient = APIClient()
+        self.paris = TravelProject.objects.create(name="Paris museums", description="Louvre and Orsay")
+        ProjectPlace.objects.create(project=self.paris, external_id="1", title="Water Lilies", artist="Claude Monet")
+        self.chicago = TravelProject.objects.create(name="Chicago weekend", description="Art Institute, then Paris cafe")
+        ProjectPlace.objects.create(project=self.chicago, external_id="2", title="Nighthawks", artist="Edward Hopper")
+
+    def _search(self, query, **params):
+        response = self.client.get("/api/projects/search/", {"q": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["name"] for row in response.data["results"]]
+
+    def test_ranks_name_matches_above_description_matches(self):
+        self.assertEqual(self._search("paris"), ["Paris museums", "Chicago weekend"])
+
+    def test_matches_place_fields_and_prefixes(self):
+        self.assertEqual(self._search("monet"), ["Paris museums"])
+        self.assertEqual(self._search("nighth"), ["Chicago weekend"])
+        self.assertEqual(self._search("hopper nighthawks"), ["Chicago weekend"])
+
+    def test_index_follows_writes(self):
+        place = self.chicago.places.get()
+        place.notes = "Bring binoculars"
+        place.save()
+        ProjectPlace.objects.filter(pk=place.pk).update(title="Gothic")
+        TravelProject.objects.filter(pk=self.paris.pk).update(name="Lyon")
+
+        self.assertEqual(self._search("binoculars gothic"), ["Chicago weekend"])
+        self.assertEqual(self._search("nighthawks"), [])
+        self.assertEqual(self._search("lyon"), ["Lyon"])
+
+        self.chicago.delete()
+        self.assertEqual(self._search("binoculars"), [])
+
+    def test_migrations_leave_every_search_trigger_in_place(self):
+        self.assertEqual(restore_search_triggers(), [])
+
+    def test_triggers_dropped_by_a_table_rebuild_are_restored(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("only SQLite drops triggers when it rebuilds a table")
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER project_place_search_ai")
+        ProjectPlace.objects.create(project=self.paris, external_id="3", title="Olympia", artist="Manet")
+        self.assertEqual(self._search("olympia"), [])
+
+        self.assertEqual(restore_search_triggers(), ["project_place_search_ai"])
+        self.assertEqual(self._search("olympia"), ["Paris museums"])
+
+    def test_list_filters_apply(self):
+        TravelProject.objects.filter(pk=self.chicago.pk).update(status="completed")
+        self.assertEqual(self._search("paris", status="active"), ["Paris museums"])
+
+    def test_operators_in_query_are_treated_as_words(self):
+        self.assertEqual(self._search('paris" OR NEAR(*'), [])
+        self.assertEqual(self._search("***"), [])
+        response = self.client.get("/api/projects/search/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ArtworkSearchEndpointTests(TestCase):
+    def setUp(self):
+        self.client: APIClient = APIClient()
+        clear_artwork_caches()
+
+    @patch("travel_project.views.search_artworks")
+    def test_returns_page_of_results(self, mock_search):
+        mock_search.return_value = ArtworkSearchResult([make_artwork(1)], True)
+        response = self.client.get("/api/artworks/search/", {"q": "monet", "limit": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], 1)
+        self.assertTrue(response.data["has_next"])
+        mock_search.assert_called_once_with("monet", page=1, limit=1)
+
+    @patch("travel_project.views.search_artworks", side_effect=APIError("down"))
+    def test_upstream_failure_is_503(self, _):
+        response = self.client.get("/api/artworks/search/", {"q": "monet"})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def _plan(sql: str, params=None) -> str:
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # near-empty test tables make a sequential scan cheapest; rule it out to check the index is usable at all
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+        else:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+class QueryPlanTests(TestCase):
+    """Plans of the query each project list page actually runs: filters, ordering, tie-break and cursor."""
+
+    def setUp(self):
+        for name in ("Rome", "Paris"):
+            TravelProject.objects.create(name=name, start_date=datetime.date(2024, 6, 1))
+
+    def _list_plan(self, url, **params) -> str:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [sql] = [query["sql"] for query in ctx.captured_queries if 'FROM "travel_project"' in query["sql"]]
+        return _plan(sql)
+
+    def assertListUsesIndex(self, index, **params):
+        plan = self._list_plan("/api/projects/", **params)
+        self.assertIn(index, plan)
+        self.assertFalse(any(marker in plan for marker in _SORT_MARKERS), plan)
+
+    def test_default_list_ordering(self):
+        self.assertListUsesIndex("travel_project_created_id_idx")
+        self.assertListUsesIndex("travel_project_created_id_idx", ordering="created_at")
+
+    def test_status_filter_with_default_ordering(self):
+        self.assertListUsesIndex("travel_project_status_idx", status="active")
+
+    def test_status_and_start_date_range(self):
+        dates = {"start_date_from": "2024-01-01", "start_date_to": "2024-12-31"}
+        self.assertListUsesIndex("travel_project_status_idx", status="active", **dates)
+
+        first = self.client.get("/api/projects/", {"status": "active", "page_size": 1, **dates}).json()
+        plan = self._list_plan(first["next"])
+        self.assertIn("travel_project_status_idx", plan)
+        self.assertFalse(any(marker in plan for marker in _SORT_MARKERS), plan)
+
+    def test_start_date_range(self):
+        dates = {"start_date_from": "2024-01-01", "start_date_to": "2024-12-31"}
+        self.assertListUsesIndex("travel_project_created_id_idx", **dates)
+
+    def test_name_ordering(self):
+        self.assertListUsesIndex("travel_project_name_idx", ordering="name")
+        self.assertListUsesIndex("travel_project_name_idx", ordering="-name")
+        self.assertListUsesIndex("travel_project_status_name_idx", ordering="name", status="active")
+
+    def test_name_search_uses_trigram_index_on_postgresql(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("trigram index is PostgreSQL only")
+        queryset = TravelProjectFilter({"name": "rome"}, TravelProject.objects.all()).qs
+        self.assertIn("travel_project_name_trgm_idx", _plan(*queryset.query.sql_with_params()))
 
 class ProjectPlaceTests(TestCase):
     def setUp(self):
@@ -118,6 +369,40 @@ class StatusSyncTests(TestCase):
         self.project.refresh_from_db()
         self.assertEqual(self.project.status, "active")
 
+    def test_status_follows_place_writes_without_explicit_sync(self):
+        self.place.visited = True
+        self.place.save()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, "completed")
+
+        ProjectPlace.objects.create(project=self.project, external_id="2")
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, "active")
+
+    def test_updated_at_only_moves_when_status_changes(self):
+        self.project.refresh_from_db()
+        before = self.project.updated_at
+        self.place.notes = "no status change"
+        self.place.save()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.updated_at, before)
+
+        self.place.visited = True
+        self.place.save()
+        self.project.refresh_from_db()
+        self.assertGreater(self.project.updated_at, before)
+
+    def test_bulk_sync_recomputes_many_projects_in_one_query(self):
+        other = TravelProject.objects.create(name="Other", places_count=2, visited_count=2)
+        TravelProject.objects.filter(pk=self.project.pk).update(status="completed")
+
+        with self.assertNumQueries(1):
+            changed = TravelProject.sync_statuses()
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(TravelProject.objects.get(pk=self.project.pk).status, "active")
+        self.assertEqual(TravelProject.objects.get(pk=other.pk).status, "completed")
+
 
 class PlaceCountBoundaryTests(TestCase):
     def setUp(self):
@@ -185,6 +470,519 @@ class PlaceCountBoundaryTests(TestCase):
         self.assertEqual(project.places.count(), 1)
 
 
+class PlaceCounterTests(TestCase):
+    def setUp(self):
+        self.client: APIClient = APIClient()
+        self.project = TravelProject.objects.create(name="Counters")
+        ProjectPlace.objects.create(project=self.project, external_id="a")
+
+    def _counters(self):
+        self.project.refresh_from_db()
+        return self.project.places_count, self.project.visited_count
+
+    @patch(VALIDATE_PATH, side_effect=_mock_validate)
+    def test_counters_follow_add_visit_and_remove(self, _):
+        self.client.post(f"/api/projects/{self.project.pk}/places/", {"external_id": "b"}, format="json")
+        self.assertEqual(self._counters(), (2, 0))
+
+        self.client.patch(f"/api/projects/{self.project.pk}/places/b/", {"visited": True}, format="json")
+        self.client.patch(f"/api/projects/{self.project.pk}/places/b/", {"notes": "again"}, format="json")
+        self.assertEqual(self._counters(), (2, 1))
+
+        self.client.delete(f"/api/projects/{self.project.pk}/places/b/")
+        self.assertEqual(self._counters(), (1, 0))
+
+    @patch(BATCH_PATH)
+    def test_create_project_sets_places_count(self, mock_batch):
+        mock_batch.return_value = ({"1": _mock_validate("1"), "2": _mock_validate("2")}, {})
+        response = self.client.post(
+            "/api/projects/", {"name": "Trip", "places": [{"external_id": "1"}, {"external_id": "2"}]}, format="json"
+        )
+        project = TravelProject.objects.get(pk=response.data["id"])
+        self.assertEqual((project.places_count, project.visited_count), (2, 0))
+
+    @patch(VALIDATE_PATH, side_effect=_mock_validate)
+    def test_add_place_does_not_count_rows(self, _):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(f"/api/projects/{self.project.pk}/places/", {"external_id": "b"}, format="json")
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()])
+
+    def test_repair_command_fixes_drift(self):
+        TravelProject.objects.filter(pk=self.project.pk).update(places_count=7, visited_count=3)
+        out = StringIO()
+        call_command("repair_place_counters", stdout=out)
+        self.assertEqual(self._counters(), (1, 0))
+        self.assertIn("Repaired 1 project", out.getvalue())
+
+
+class BulkPlaceOperationsTests(TestCase):
+    def setUp(self):
+        self.client: APIClient = APIClient()
+        self.project = TravelProject.objects.create(name="Bulk")
+        for eid in ("a", "b", "c"):
+            ProjectPlace.objects.create(project=self.project, external_id=eid)
+        self.url = f"/api/projects/{self.project.pk}/places/bulk/"
+
+    @patch(BATCH_PATH)
+    def test_applies_mixed_operations_in_one_request(self, mock_batch):
+        mock_batch.return_value = ({"d": _mock_validate("d")}, {})
+        response = self.client.post(
+            self.url,
+            {
+                "operations": [
+                    {"op": "add", "external_id": "d", "notes": "new"},
+                    {"op": "update", "external_id": "a", "visited": True},
+                    {"op": "remove", "external_id": "b"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_batch.assert_called_once_with(["d"])
+        self.assertEqual([r["op"] for r in response.data["results"]], ["add", "update", "remove"])
+        self.assertEqual(response.data["results"][0]["place"]["title"], "Artwork d")
+        self.project.refresh_from_db()
+        self.assertEqual(sorted(self.project.places.values_list("external_id", flat=True)), ["a", "c", "d"])
+        self.assertEqual((self.project.places_count, self.project.visited_count), (3, 1))
+
+    def test_marking_every_place_visited_completes_project(self):
+        operations = [{"op": "update", "external_id": eid, "visited": True} for eid in ("a", "b", "c")]
+        # project, lock, places, one bulk UPDATE, one counter/status UPDATE, plus the savepoint pair
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, {"operations": operations}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, "completed")
+
+    def test_any_failing_operation_rolls_back_all(self):
+        response = self.client.post(
+            self.url,
+            {
+                "operations": [
+                    {"op": "update", "external_id": "a", "visited": True},
+                    {"op": "remove", "external_id": "missing"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["operations"][0], {})
+        self.assertIn("external_id", response.data["operations"][1])
+        self.assertFalse(self.project.places.filter(visited=True).exists())
+
+    def test_cannot_remove_every_place(self):
+        operations = [{"op": "remove", "external_id": eid} for eid in ("a", "b", "c")]
+        response = self.client.post(self.url, {"operations": operations}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.project.places.count(), 3)
+
+    @patch(BATCH_PATH)
+    def test_unknown_artworks_reported_per_item(self, mock_batch):
+        mock_batch.return_value = ({}, {"x": "Artwork x not found in AIC API"})
+        response = self.client.post(
+            self.url,
+            {"operations": [{"op": "update", "external_id": "a", "notes": "n"}, {"op": "add", "external_id": "x"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["operations"][1]["external_id"], ["Artwork x not found in AIC API"])
+
+def _record(artwork_id, updated_at, title=None):
+    return {
+        "id": artwork_id,
+        "title": title or f"Artwork {artwork_id}",
+        "artist_display": "Artist",
+        "date_display": "1900",
+        "image_id": None,
+        "updated_at": updated_at,
+    }
+
+
+class ConditionalProjectResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client: APIClient = APIClient()
+        self.project = TravelProject.objects.create(name="Polled")
+        ProjectPlace.objects.create(project=self.project, external_id="a")
+        self.detail = f"/api/projects/{self.project.pk}/"
+        self.places = f"/api/projects/{self.project.pk}/places/"
+
+    def test_matching_etag_gets_304_without_touching_the_database(self):
+        for url in (self.detail, self.places):
+            etag = self.client.get(url)["ETag"]
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response["ETag"], etag)
+        # weak comparison, as for an ETag a compressing proxy has weakened
+        response = self.client.get(self.places, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_every_write_path_changes_the_etag(self):
+        def etags():
+            return self.client.get(self.detail)["ETag"], self.client.get(self.places)["ETag"]
+
+        seen = [etags()]
+        self.client.patch(self.detail, {"name": "Renamed"}, format="json")
+        seen.append(etags())
+        self.client.patch(f"{self.places}a/", {"visited": True}, format="json")
+        seen.append(etags())
+        self.client.post(
+            f"{self.places}bulk/", {"operations": [{"op": "update", "external_id": "a", "notes": "n"}]}, format="json"
+        )
+        seen.append(etags())
+        self.assertEqual(len(set(seen)), len(seen))
+
+        response = self.client.get(self.places, HTTP_IF_NONE_MATCH=seen[0][1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["notes"], "n")
+
+    def test_serialized_response_is_cached_per_version(self):
+        first = self.client.get(self.detail)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail)
+        self.assertEqual(second.data, first.data)
+
+        ProjectPlace.objects.create(project=self.project, external_id="b")
+        self.assertEqual(len(self.client.get(self.detail).data["places"]), 2)
+
+        with self.settings(PROJECT_RESPONSE_CACHE_TTL=0), self.assertNumQueries(2):
+            self.client.get(self.detail)
+
+    def test_admin_bulk_deletes_invalidate_and_keep_counters(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        ProjectPlace.objects.create(project=self.project, external_id="b", visited=True)
+        etag = self.client.get(self.detail)["ETag"]
+
+        place = ProjectPlace.objects.get(external_id="b")
+        self.client.post(
+            "/admin/travel_project/projectplace/",
+            {"action": "delete_selected", "_selected_action": [place.pk], "post": "yes"},
+        )
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.places_count, self.project.visited_count), (1, 0))
+        self.assertEqual(self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        self.client.post(
+            "/admin/travel_project/travelproject/",
+            {"action": "delete_selected", "_selected_action": [self.project.pk], "post": "yes"},
+        )
+        self.assertEqual(self.client.get(self.detail).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_version_is_only_replaced_after_commit(self):
+        etag = self.client.get(self.detail)["ETag"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.project.save()
+                # a request seeing the pre-commit rows caches them under a fresh version...
+                stale = self.client.get(self.detail)["ETag"]
+        self.assertNotEqual(stale, etag)
+        for callback in callbacks:
+            callback()
+        # ...which the commit invalidates again
+        self.assertNotIn(self.client.get(self.detail)["ETag"], (etag, stale))
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_create_project_awaits_batch_validation(self):
+        artworks = {"100": _mock_validate("100"), "200": _mock_validate("200")}
+        with patch(AVALIDATE_MANY_PATH, AsyncMock(return_value=(artworks, {}))) as validate:
+            response = await self.async_client.post(
+                "/api/async/projects/",
+                {"name": "Trip", "places": [{"external_id": "100"}, {"external_id": 200}]},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        validate.assert_awaited_once_with(["100", "200"])
+        body = response.json()
+        self.assertEqual([p["title"] for p in body["places"]], ["Artwork 100", "Artwork 200"])
+        project = await TravelProject.objects.aget(pk=body["id"])
+        self.assertEqual(project.places_count, 2)
+
+    async def test_throttled_requests_get_429_with_retry_after(self):
+        with patch.object(AnonRateThrottle, "rate", "1/min", create=True):
+            first = await self.async_client.get("/api/async/projects/")
+            second = await self.async_client.get("/api/async/projects/")
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(0 < int(second["Retry-After"]) <= 60)
+        self.assertIn("Expected available in", second.json()["detail"])
+
+    async def test_create_project_reports_invalid_artworks(self):
+        errors = {"999": "Artwork 999 not found in AIC API"}
+        with patch(AVALIDATE_MANY_PATH, AsyncMock(return_value=({}, errors))):
+            response = await self.async_client.post(
+                "/api/async/projects/",
+                {"name": "Trip", "places": [{"external_id": "999"}]},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"places": errors})
+        self.assertFalse(await TravelProject.objects.aexists())
+
+    async def test_add_place_then_duplicate(self):
+        project = await TravelProject.objects.acreate(name="P")
+        url = f"/api/async/projects/{project.pk}/places/"
+        with patch(AVALIDATE_PATH, AsyncMock(side_effect=_mock_validate)):
+            created = await self.async_client.post(url, {"external_id": "7"}, content_type="application/json")
+            duplicate = await self.async_client.post(url, {"external_id": "7"}, content_type="application/json")
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(created.json()["title"], "Artwork 7")
+        self.assertEqual(duplicate.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("already exists", duplicate.json()["external_id"][0])
+
+        place = await self.async_client.get(f"{url}7/")
+        self.assertEqual(place.json()["external_id"], "7")
+        self.assertEqual((await self.async_client.get(f"{url}8/")).status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_list_walks_the_same_keyset_as_the_sync_endpoint(self):
+        for i in range(5):
+            await TravelProject.objects.acreate(name=f"P{i}")
+
+        names, url = [], "/api/async/projects/?page_size=2"
+        while url:
+            body = (await self.async_client.get(url)).json()
+            names += [row["name"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(names, ["P4", "P3", "P2", "P1", "P0"])
+
+        response = await self.async_client.get("/api/async/projects/?cursor=bogus")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_detail_shares_etag_and_body_with_sync_endpoint(self):
+        project = await TravelProject.objects.acreate(name="P")
+        await ProjectPlace.objects.acreate(project=project, external_id="1")
+
+        sync = await sync_to_async(APIClient().get)(f"/api/projects/{project.pk}/", HTTP_ACCEPT="application/json")
+        response = await self.async_client.get(f"/api/async/projects/{project.pk}/")
+        self.assertEqual(response["ETag"], sync["ETag"])
+        self.assertEqual(response.content, sync.content)
+
+        response = await self.async_client.get(
+            f"/api/async/projects/{project.pk}/places/", headers={"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        response = await self.async_client.get(
+            f"/api/async/projects/{project.pk}/places/", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_rejects_non_json_bodies(self):
+        response = await self.async_client.post("/api/async/projects/", {"name": "P"})
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+@override_settings(ARTWORK_DEFERRED_ENRICHMENT=True, TASK_BACKEND="eager")
+class DeferredEnrichmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client: APIClient = APIClient()
+        self.projects = [TravelProject.objects.create(name=f"P{i}") for i in range(2)]
+
+    def _add(self, project, external_id):
+        return self.client.post(f"/api/projects/{project.pk}/places/", {"external_id": external_id}, format="json")
+
+    @patch(VALIDATE_PATH)
+    def test_place_is_accepted_then_enriched_after_commit(self, mock_validate):
+        with patch(ENRICH_FETCH_PATH, return_value={"7": _mock_validate("7")}) as fetch:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._add(self.projects[0], "7")
+                self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+                self.assertEqual(response.data["enrichment_status"], "pending")
+                fetch.assert_not_called()
+
+        mock_validate.assert_not_called()
+        fetch.assert_called_once_with(["7"])
+        place = ProjectPlace.objects.get(external_id="7")
+        self.assertEqual((place.title, place.enrichment_status), ("Artwork 7", "enriched"))
+        self.assertFalse(EnrichmentJob.objects.exists())
+
+    def test_jobs_are_deduplicated_and_drained_in_one_batch(self):
+        for project in self.projects:
+            self._add(project, "7")
+        self._add(self.projects[0], "8")
+        self._add(self.projects[1], "9")
+        self.assertEqual(EnrichmentJob.objects.count(), 3)
+
+        with patch(ENRICH_FETCH_PATH, return_value={"7": _mock_validate("7"), "8": _mock_validate("8")}) as fetch:
+            self.assertEqual(drain_enrichment_queue(), 3)
+
+        fetch.assert_called_once()
+        self.assertEqual(sorted(fetch.call_args.args[0]), ["7", "8", "9"])
+        statuses = dict(ProjectPlace.objects.values_list("external_id", "enrichment_status").distinct())
+        self.assertEqual(statuses, {"7": "enriched", "8": "enriched", "9": "invalid"})
+        self.assertEqual(ProjectPlace.objects.filter(title="Artwork 7").count(), 2)
+
+    def test_failed_lookups_are_retried_with_backoff_then_given_up(self):
+        self._add(self.projects[0], "7")
+
+        with patch(ENRICH_FETCH_PATH, side_effect=APIError("AIC down", retryable=True)):
+            drain_enrichment_queue()
+            job = EnrichmentJob.objects.get()
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.available_at, job.created_at)
+            self.assertEqual(drain_enrichment_queue(), 0)  # not due yet
+
+            for _ in range(enrichment.MAX_ATTEMPTS - 1):
+                EnrichmentJob.objects.update(available_at=job.created_at)
+                drain_enrichment_queue()
+
+        self.assertFalse(EnrichmentJob.objects.exists())
+        self.assertEqual(ProjectPlace.objects.get().enrichment_status, "failed")
+
+    def test_malformed_ids_are_refused_instead_of_queued(self):
+        response = self._add(self.projects[0], "not-an-id")
+        created = self.client.post("/api/projects/", {"name": "T", "places": [{"external_id": "²"}]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(created.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(EnrichmentJob.objects.exists())
+
+    def test_unexpected_error_does_not_hold_up_the_batch_or_loop_forever(self):
+        self._add(self.projects[0], "7")
+        self._add(self.projects[0], "9")
+
+        def fetch(external_ids):
+            if "9" in external_ids:
+                raise ValueError("broken record")
+            return {"7": _mock_validate("7")}
+
+        with patch(ENRICH_FETCH_PATH, side_effect=fetch):
+            drain_enrichment_queue()
+            self.assertEqual(ProjectPlace.objects.get(external_id="7").enrichment_status, "enriched")
+            self.assertEqual(EnrichmentJob.objects.get().attempts, 1)
+            for _ in range(enrichment.MAX_ATTEMPTS - 1):
+                EnrichmentJob.objects.update(available_at=timezone.now())
+                drain_enrichment_queue()
+
+        self.assertFalse(EnrichmentJob.objects.exists())
+        self.assertEqual(ProjectPlace.objects.get(external_id="9").enrichment_status, "failed")
+
+    def test_create_project_returns_pending_places(self):
+        with patch(BATCH_PATH) as mock_batch:
+            response = self.client.post(
+                "/api/projects/", {"name": "Trip", "places": [{"external_id": "1"}, {"external_id": "2"}]}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_batch.assert_not_called()
+        self.assertEqual({p["enrichment_status"] for p in response.data["places"]}, {"pending"})
+        self.assertEqual(set(EnrichmentJob.objects.values_list("external_id", flat=True)), {"1", "2"})
+
+
+class DeadlineResponseTests(TestCase):
+    def setUp(self):
+        clear_artwork_caches()
+        self.client: APIClient = APIClient()
+
+    @patch(FETCH_MANY_PATH)
+    def test_batch_validation_past_the_deadline_is_504_with_partial_errors(self, mock_fetch):
+        mock_fetch.return_value = [make_artwork(1)]
+        _validate_artworks_batch(["1", "2"])  # 1 and the 404 for 2 are cached now
+        mock_fetch.side_effect = DeadlineExceededError("too slow")
+
+        response = self.client.post(
+            "/api/projects/",
+            {"name": "Trip", "places": [{"external_id": "1"}, {"external_id": "2"}, {"external_id": "3"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(
+            response.json()["places"],
+            {"2": "Artwork 2 not found in AIC API", "3": "Could not validate artwork 3 in time, try again later"},
+        )
+        self.assertFalse(TravelProject.objects.exists())
+
+    def test_deadline_error_reaching_the_middleware_is_504(self):
+        project = TravelProject.objects.create(name="P")
+        with patch(VALIDATE_PATH, side_effect=DeadlineExceededError("too slow")):
+            response = self.client.post(f"/api/projects/{project.pk}/places/", {"external_id": "7"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+
+    async def test_async_create_past_the_deadline_is_504(self):
+        timeout = ArtworkValidationTimeout({"2": "Could not validate artwork 2 in time, try again later"})
+        with patch(AVALIDATE_MANY_PATH, AsyncMock(side_effect=timeout)):
+            response = await self.async_client.post(
+                "/api/async/projects/",
+                {"name": "Trip", "places": [{"external_id": "2"}]},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(response.json()["places"], timeout.errors)
+
+
+class SyncArtworksCommandTests(TestCase):
+    SYNC_PATH = "travel_project.management.commands.sync_artworks.aic_client.get_artworks_updated_since"
+
+    def setUp(self):
+        clear_artwork_caches()
+        self.client: APIClient = APIClient()
+
+    def _sync_dump(self, records, *args):
+        with tempfile.TemporaryDirectory() as tmp:
+            dump = Path(tmp) / "artworks.jsonl"
+            dump.write_text("\n".join(json.dumps(r) for r in records))
+            call_command("sync_artworks", "--dump", str(dump), "--batch-size", "2", *args, stdout=StringIO())
+
+    def test_dump_sync_is_incremental(self):
+        self._sync_dump([_record(1, "2024-01-01T00:00:00Z"), _record(2, "2024-02-01T00:00:00Z"), _record(3, None)])
+        self.assertEqual(Artwork.objects.count(), 3)
+
+        self._sync_dump(
+            [_record(1, "2024-01-01T00:00:00Z", "Stale copy"), _record(2, "2024-03-01T00:00:00Z", "Renamed")]
+        )
+        self.assertEqual(Artwork.objects.get(pk=1).title, "Artwork 1")
+        self.assertEqual(Artwork.objects.get(pk=2).title, "Renamed")
+
+        self._sync_dump([_record(1, "2024-01-01T00:00:00Z", "Stale copy")], "--full")
+        self.assertEqual(Artwork.objects.get(pk=1).title, "Stale copy")
+
+    def test_sync_drops_cached_copies_of_what_it_mirrored(self):
+        artwork_cache.set_many({"1": CacheEntry(None, 0.0), "2": CacheEntry(make_artwork(2), 0.0)})
+
+        self._sync_dump([_record(1, "2024-01-01T00:00:00Z")])
+
+        self.assertEqual(artwork_cache.get_many(["1", "2"]).misses, ["1"])
+
+    @patch("travel_project.management.commands.sync_artworks.MAX_PAGE_SIZE", 2)
+    def test_api_sync_pages_by_updated_at(self):
+        pages = {
+            (None, 0): [_record(1, "2024-01-01T00:00:00Z"), _record(2, "2024-01-02T00:00:00Z")],
+            ("2024-01-02T00:00:00Z", 1): [_record(3, "2024-01-02T00:00:00Z"), _record(4, "2024-01-03T00:00:00Z")],
+            ("2024-01-03T00:00:00Z", 1): [],
+        }
+        with patch(self.SYNC_PATH, side_effect=lambda since, offset, limit: pages[since, offset]) as mock_fetch:
+            call_command("sync_artworks", stdout=StringIO())
+
+        self.assertEqual(mock_fetch.call_count, 3)
+        self.assertEqual(sorted(Artwork.objects.values_list("pk", flat=True)), [1, 2, 3, 4])
+
+    @patch(FETCH_MANY_PATH)
+    def test_places_resolve_from_the_synced_catalogue(self, mock_fetch):
+        self._sync_dump([_record(1, "2024-01-01T00:00:00Z", "Synced")])
+
+        places = [{"external_id": "1"}]
+        response = self.client.post("/api/projects/", {"name": "Trip", "places": places}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["places"][0]["title"], "Synced")
+        mock_fetch.assert_not_called()
+
+
 class PlaceCountRaceConditionTests(TransactionTestCase):
     def setUp(self):
         self.client: APIClient = APIClient()
@@ -1,16 +1,22 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from travel_project.views import ProjectPlaceViewSet, TravelProjectViewSet
+from travel_project.views import ArtworkSearchView, ProjectPlaceViewSet, TravelProjectViewSet
 
 router = DefaultRouter()
 router.register(r"projects", TravelProjectViewSet, basename="project")
 
 urlpatterns = [
+    path("artworks/search/", ArtworkSearchView.as_view(), name="artwork-search"),
     path(
         "projects/<int:project_pk>/places/",
         ProjectPlaceViewSet.as_view({"get": "list", "post": "create"}),
         name="project-place-list",
     ),
+    path(
+        "projects/<int:project_pk>/places/bulk/",
+        ProjectPlaceViewSet.as_view({"post": "bulk"}),
+        name="project-place-bulk",
+    ),
     path(
         "projects/<int:project_pk>/places/<str:external_id>/",
         ProjectPlaceViewSet.as_view({"get": "retrieve", "patch": "partial_update", "delete": "destroy"}),
@@ -0,0 +1,97 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+
+# Versions are random tokens rather than counters: a counter lost to eviction would start over and could
+# hand out an ETag that a client still holds for older content. Losing a version only costs one full response.
+VERSION_TTL = 60 * 60 * 24
+# bumped by writes that touch projects wholesale, instead of deleting every project's key
+_EPOCH_KEY = "project:version-epoch"
+
+
+def _version_key(pk) -> str:
+    return f"project:{pk}:version"
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def project_version(pk) -> str | None:
+    """The current cache version of a project, or None when the cache is unavailable."""
+    keys = [_EPOCH_KEY, _version_key(pk)]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        for key in keys:
+            if key not in found:
+                cache.add(key, _new_version(), VERSION_TTL)
+        # re-read, another request may have won the add
+        found = cache.get_many(keys)
+        if len(found) < len(keys):
+            return None
+    return ".".join(found[key] for key in keys)
+
+
+async def aproject_version(pk) -> str | None:
+    keys = [_EPOCH_KEY, _version_key(pk)]
+    found = await cache.aget_many(keys)
+    if len(found) < len(keys):
+        for key in keys:
+            if key not in found:
+                await cache.aadd(key, _new_version(), VERSION_TTL)
+        found = await cache.aget_many(keys)
+        if len(found) < len(keys):
+            return None
+    return ".".join(found[key] for key in keys)
+
+
+def project_etag(pk, version: str, variant: str, renderer_format: str) -> str:
+    # the body differs per renderer (JSON vs browsable API), so the ETag does too
+    return quote_etag(f"{pk}-{version}-{variant}-{renderer_format}")
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    # If-None-Match uses the weak comparison
+    sent = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+    return etag in sent or "*" in sent
+
+
+def _invalidate(keys, using):
+    cache.delete_many(keys)
+    # and again once committed: a request that read the old rows meanwhile may have cached them under a
+    # version issued after the first delete
+    transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+def bump_project_version(*pks, using=None):
+    """Invalidate the ETags and cached responses of the given projects; call on every write to them."""
+    if keys := [_version_key(pk) for pk in pks if pk is not None]:
+        _invalidate(keys, using)
+
+
+def bump_all_project_versions(using=None):
+    _invalidate([_EPOCH_KEY], using)
+
+
+def cached_response_data(pk, variant: str, version: str, build):
+    """Serialized data for one representation of a project, cached under its version."""
+    if not (ttl := settings.PROJECT_RESPONSE_CACHE_TTL):
+        return build()
+    key = f"project:{pk}:{variant}:{version}"
+    if (data := cache.get(key)) is None:
+        data = build()
+        cache.set(key, data, ttl)
+    return data
+
+
+async def acached_response_data(pk, variant: str, version: str, abuild):
+    if not (ttl := settings.PROJECT_RESPONSE_CACHE_TTL):
+        return await abuild()
+    key = f"project:{pk}:{variant}:{version}"
+    if (data := await cache.aget(key)) is None:
+        data = await abuild()
+        await cache.aset(key, data, ttl)
+    return data
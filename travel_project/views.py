@@ -1,37 +1,73 @@
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import OpenApiResponse, extend_schema, extend_schema_view
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, extend_schema_view
 from rest_framework import filters, status
+from rest_framework.decorators import action
 from rest_framework.mixins import CreateModelMixin, DestroyModelMixin, ListModelMixin, RetrieveModelMixin, UpdateModelMixin
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from travel_project.filters import TravelProjectFilter
+from services import APIError
+from services.artwork_search import search_artworks
+
+from travel_project.filters import TieBreakOrderingFilter, TravelProjectFilter
 from travel_project.models import ProjectPlace, TravelProject
+from travel_project.pagination import TravelProjectCursorPagination
+from travel_project.search import get_search_backend
 from travel_project.serializers import (
     AddPlaceSerializer,
+    ArtworkSearchQuerySerializer,
+    ArtworkSerializer,
+    BulkPlaceOperationsSerializer,
+    ProjectSearchQuerySerializer,
     ProjectPlaceSerializer,
     ProjectPlaceUpdateSerializer,
     TravelProjectCreateSerializer,
+    TravelProjectExpandedSerializer,
     TravelProjectSerializer,
+    TravelProjectSummarySerializer,
     TravelProjectUpdateSerializer,
 )
+from travel_project.versioning import cached_response_data, etag_matches, project_etag, project_version
+
+NOT_MODIFIED = OpenApiResponse(description="Unchanged since the ETag sent in If-None-Match")
+TIMED_OUT = OpenApiResponse(description="Artwork validation ran out of time; the errors found up to then")
+
+
+class _ProjectVersionedMixin:
+    """Conditional GETs keyed by the project's cache version, so an unchanged project costs one cache read."""
+
+    def versioned_response(self, request, project_pk, variant: str, build):
+        if (version := project_version(project_pk)) is None:
+            return Response(build())
+        etag = project_etag(project_pk, version, variant, request.accepted_renderer.format)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(etag, request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(cached_response_data(project_pk, variant, version, build), headers=headers)
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="List travel projects",
-        responses=TravelProjectSerializer(many=True),
+        description="Summary rows with a places count; pass `expand=places` to nest the places.",
+        parameters=[
+            OpenApiParameter("expand", str, enum=["places"], description="Include the nested places"),
+            OpenApiParameter("fields", str, description="Comma-separated subset of fields to return"),
+        ],
+        responses=TravelProjectSummarySerializer(many=True),
     ),
     retrieve=extend_schema(
         summary="Retrieve a travel project",
-        responses=TravelProjectSerializer,
+        description="Sends an ETag; repeat it in If-None-Match to get a 304 while the project is unchanged.",
+        responses={200: TravelProjectSerializer, 304: NOT_MODIFIED},
     ),
     create=extend_schema(
         summary="Create a travel project",
         request=TravelProjectCreateSerializer,
-        responses={201: TravelProjectSerializer},
+        responses={201: TravelProjectSerializer, 504: TIMED_OUT},
     ),
     partial_update=extend_schema(
         summary="Update a travel project",
@@ -51,22 +87,68 @@ from travel_project.serializers import (
         },
     ),
 )
-class TravelProjectViewSet(ModelViewSet):
-    queryset = TravelProject.objects.prefetch_related("places")
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+class TravelProjectViewSet(_ProjectVersionedMixin, ModelViewSet):
+    queryset = TravelProject.objects.all()
+    pagination_class = TravelProjectCursorPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, TieBreakOrderingFilter]
     filterset_class = TravelProjectFilter
     search_fields = ["name", "description"]
-    ordering_fields = ["name", "created_at", "start_date"]
-    ordering = ["-created_at"]
+    # the cursor is positioned on the first ordering field alone, so it has to be non-null: a nullable one
+    # such as start_date would put None in the cursor
+    ordering_fields = ["name", "created_at"]
+    ordering = ["-created_at", "-id"]
+
+    def _expand_places(self) -> bool:
+        return "places" in self.request.query_params.get("expand", "").split(",")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "search") or self._expand_places():
+            queryset = queryset.prefetch_related("places")
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "search") and (fields := self.request.query_params.get("fields")):
+            kwargs["fields"] = [name.strip() for name in fields.split(",")]
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
-        if self.action == "create":
+        if self.action in ("list", "search"):
+            return TravelProjectExpandedSerializer if self._expand_places() else TravelProjectSummarySerializer
+        elif self.action == "create":
             return TravelProjectCreateSerializer
         elif self.action in ("update", "partial_update"):
             return TravelProjectUpdateSerializer
         else:
             return TravelProjectSerializer
 
+    @extend_schema(
+        summary="Full-text search over projects and their places",
+        description=(
+            "Ranks projects whose name, description or place title/artist/notes match every word of `q` "
+            "(prefix match). The list filters, `expand` and `fields` apply as on the list endpoint."
+        ),
+        parameters=[
+            ProjectSearchQuerySerializer,
+            OpenApiParameter("expand", str, enum=["places"], description="Include the nested places"),
+            OpenApiParameter("fields", str, description="Comma-separated subset of fields to return"),
+        ],
+        responses=TravelProjectSummarySerializer(many=True),
+    )
+    @action(detail=False, pagination_class=None)
+    def search(self, request, *args, **kwargs):
+        params = ProjectSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        query, limit = params.validated_data["q"], params.validated_data["limit"]
+        projects = get_search_backend(queryset.db).search(queryset, query, limit)
+        return Response({"results": self.get_serializer(projects, many=True).data})
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned_response(
+            request, self.kwargs["pk"], "detail", lambda: self.get_serializer(self.get_object()).data
+        )
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.has_visited_places():
@@ -81,7 +163,8 @@ class TravelProjectViewSet(ModelViewSet):
 @extend_schema_view(
     list=extend_schema(
         summary="List places in a project",
-        responses=ProjectPlaceSerializer(many=True),
+        description="Sends an ETag; repeat it in If-None-Match to get a 304 while the project is unchanged.",
+        responses={200: ProjectPlaceSerializer(many=True), 304: NOT_MODIFIED},
     ),
     retrieve=extend_schema(
         summary="Retrieve a place by external ID",
@@ -90,7 +173,11 @@ class TravelProjectViewSet(ModelViewSet):
     create=extend_schema(
         summary="Add a place to a project",
         request=AddPlaceSerializer,
-        responses={201: ProjectPlaceSerializer},
+        responses={
+            201: ProjectPlaceSerializer,
+            202: OpenApiResponse(ProjectPlaceSerializer, description="Stored, artwork details still pending"),
+            504: TIMED_OUT,
+        },
     ),
     partial_update=extend_schema(
         summary="Update a place",
@@ -106,7 +193,13 @@ class TravelProjectViewSet(ModelViewSet):
     ),
 )
 class ProjectPlaceViewSet(
-    ListModelMixin, RetrieveModelMixin, CreateModelMixin, UpdateModelMixin, DestroyModelMixin, GenericViewSet
+    _ProjectVersionedMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+    CreateModelMixin,
+    UpdateModelMixin,
+    DestroyModelMixin,
+    GenericViewSet,
 ):
     pagination_class = None
     lookup_field = "external_id"
@@ -121,6 +214,8 @@ class ProjectPlaceViewSet(
         match self.action:
             case "create":
                 return AddPlaceSerializer
+            case "bulk":
+                return BulkPlaceOperationsSerializer
             case "partial_update":
                 return ProjectPlaceUpdateSerializer
             case _:
@@ -128,25 +223,48 @@ class ProjectPlaceViewSet(
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        if self.action == "create":
+        if self.action in ("create", "bulk"):
             context["project"] = self.get_project()
         return context
 
+    def list(self, request, *args, **kwargs):
+        return self.versioned_response(
+            request, self.kwargs["project_pk"], "places", lambda: self.get_serializer(self.get_queryset(), many=True).data
+        )
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         place = serializer.save()
-        place.project.sync_status()
-        return Response(ProjectPlaceSerializer(place).data, status=status.HTTP_201_CREATED)
+        # accepted but not yet enriched when ARTWORK_DEFERRED_ENRICHMENT is on
+        pending = place.enrichment_status == ProjectPlace.EnrichmentStatus.PENDING
+        return Response(
+            ProjectPlaceSerializer(place).data, status=status.HTTP_202_ACCEPTED if pending else status.HTTP_201_CREATED
+        )
+
+    @extend_schema(
+        summary="Add, update and remove several places at once",
+        description="All operations are applied in one transaction; if any of them fails nothing is written.",
+        request=BulkPlaceOperationsSerializer,
+        responses={
+            200: BulkPlaceOperationsSerializer,
+            400: OpenApiResponse(description="Per-operation errors, nothing was applied"),
+            504: TIMED_OUT,
+        },
+    )
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         place = self.get_object()
-        project = place.project
 
         with transaction.atomic():
-            TravelProject.objects.select_for_update().get(pk=project.pk)
+            locked = TravelProject.objects.select_for_update().only("places_count").get(pk=place.project_id)
 
-            if project.places.count() <= 1:
+            if locked.places_count <= 1:
                 return Response(
                     {"detail": "Cannot remove the last place from a project."},
                     status=status.HTTP_409_CONFLICT,
@@ -154,9 +272,35 @@ class ProjectPlaceViewSet(
 
             place.delete()
 
-        project.sync_status()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def perform_update(self, serializer):
-        serializer.save()
-        serializer.instance.project.sync_status()
+
+class ArtworkSearchView(APIView):
+    @extend_schema(
+        summary="Search the AIC collection",
+        description="Cached per normalised query for a few minutes, so repeated and paged searches stay local.",
+        parameters=[ArtworkSearchQuerySerializer],
+        responses={
+            200: ArtworkSerializer(many=True),
+            503: OpenApiResponse(description="The AIC API is unavailable"),
+        },
+    )
+    def get(self, request, *args, **kwargs):
+        params = ArtworkSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        page, limit = params.validated_data["page"], params.validated_data["limit"]
+        try:
+            result = search_artworks(params.validated_data["q"], page=page, limit=limit)
+        except APIError:
+            return Response(
+                {"detail": "Artwork search is unavailable, try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(
+            {
+                "results": ArtworkSerializer(result.artworks, many=True).data,
+                "page": page,
+                "limit": limit,
+                "has_next": result.has_next,
+            }
+        )